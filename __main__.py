@@ -0,0 +1,9 @@
+"""`python -m bots …` (or `python . …` in this directory) – see cli.py."""
+import os, sys
+
+# the bot modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main  # noqa: E402
+
+sys.exit(main())
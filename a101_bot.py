@@ -1,16 +1,25 @@
 import asyncio
-import json
-import httpx
 import os
 import re
-from datetime import datetime
-from pathlib import Path
+import time
 from playwright.async_api import async_playwright
 
-API_ENDPOINT = "http://localhost:8000/api/discounts"
-DATA_FILE = "discounts.json"
-IMAGE_DIR = Path("../discount-frontend/public/images/a101")
+from browser_profile import first_page, launch_context
+from debug_capture import debug_capture
+from engine import StoreAdapter, UnitResult, WorkUnit, run_store
+from listing_cache import ListingCache, Plan
+from metrics import metrics
+from product_index import index as product_index, product_id
+from ratelimit import governed_goto
+
 STORE_NAME = "A101"
+CARD_SELECTOR = "div[class*=product-card], div.w-full.border.cursor-pointer"
+TITLE_SELECTOR = "div.h-\\[120px\\].flex.pt-1.flex-col.justify-between"
+PRICE_SELECTOR = "div.text-\\[\\#EA242A\\]"
+ORIGINAL_SELECTOR = "div.line-through"
+CONSENT_SELECTOR = "button:has-text('KABUL ET')"
+TABS = int(os.getenv("A101_TABS", "3"))                 # listings loaded side by side
+READY_TIMEOUT = 30000                                   # ms for the first card to appear
 
 A101_URLS = [
     "https://www.a101.com.tr/kapida/haftanin-yildizlari/",
@@ -18,106 +27,149 @@ A101_URLS = [
     "https://www.a101.com.tr/kapida/cok-al-az-ode/"
 ]
 
-IMAGE_DIR.mkdir(parents=True, exist_ok=True)
-
 def slugify(name):
     return re.sub(r'[^a-z0-9\-]', '', re.sub(r'\s+', '-', name.lower())).strip("-")
 
-async def download_image(url, filename):
-    filepath = IMAGE_DIR / filename
-    if filepath.exists():
-        return
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=15)
-            if response.status_code == 200:
-                with open(filepath, "wb") as f:
-                    f.write(response.content)
-                print(f"📸 Downloaded image → {filename}")
-            else:
-                print(f"⚠️ Failed to download image: {url}")
-    except Exception as e:
-        print(f"❌ Error downloading image: {e}")
-
-async def parse_products_smooth_scroll(page):
+# one round trip for every card on the page: the texts the fingerprint and the row need
+_READ_CARDS = """(cards, [title, price, original]) => cards.map(card => {
+    const text = selector => { const el = card.querySelector(selector); return el ? el.innerText : ""; };
+    const link = card.querySelector("a");
+    return {title: text(title), href: link ? link.getAttribute("href") || "" : "",
+            price: text(price), original: text(original)};
+})"""
+
+def _card_id(card):
+    return card["href"] or card["title"]
+
+async def read_cards(page):
+    """Title, link and price texts of every card on the page, in one DOM read."""
+    cards = await page.eval_on_selector_all(CARD_SELECTOR, _READ_CARDS,
+                                            [TITLE_SELECTOR, PRICE_SELECTOR, ORIGINAL_SELECTOR])
+    for card in cards:
+        card["id"] = _card_id(card)
+        card["sig"] = "|".join(card[k].strip() for k in ("title", "original", "price"))
+    return cards
+
+async def card_handles(page):
+    """Element handle of every card on the page by card id.
+
+    The ids are read from the very handles returned, so a listing that
+    re-rendered or re-ordered since read_cards() never pairs a card with
+    another card's element."""
+    handles = await page.query_selector_all(CARD_SELECTOR)
+    texts = await page.evaluate(f"([cards, selectors]) => ({_READ_CARDS})(cards, selectors)",
+                                [handles, [TITLE_SELECTOR, PRICE_SELECTOR, ORIGINAL_SELECTOR]])
+    return {_card_id(card): handle for card, handle in zip(texts, handles)}
+
+async def extract_card(page, item, card):
+    """The per-card work (lazy image, row) for one card read by read_cards."""
+    title = card["title"]
+    # the title block also holds the two price lines
+    name = title.strip().split("\n")[0].strip()
+    discounted_price, original_price = card["price"], card["original"]
+
+    await item.scroll_into_view_if_needed()
+    await page.wait_for_timeout(200)
+
+    imgs = await item.query_selector_all("img")
+    image_url = ""
+    for img in imgs:
+        alt = await img.get_attribute("alt") or ""
+        src = await img.get_attribute("src") or ""
+        if not src.strip():
+            src = await img.get_attribute("data-src") or ""
+        if alt.strip().lower() in title.strip().lower() and (
+            ".jpg" in src or ".jpeg" in src or ".webp" in src or ".png" in src
+        ):
+            image_url = src
+            break
+
+    if image_url and not image_url.startswith("http"):
+        image_url = f"https://www.a101.com.tr/{image_url.lstrip('/')}"
+    if not image_url:
+        metrics.inc("images_missing", store=STORE_NAME)
+        print(f"🚫 Skipped image for: {name}")
+        await debug_capture.card(STORE_NAME, "missing_image", item,
+                                 title=name, listing=page.url)
+
+    url = f"https://www.a101.com.tr{card['href']}"
+
+    if discounted_price and name:
+        metrics.inc("cards_parsed", store=STORE_NAME)
+        print(f"✅ {name} - {discounted_price.strip()}")
+        return {
+            "name": name,
+            "url": url,
+            "image_url": image_url,
+            "original_price": original_price,
+            "price": discounted_price,
+        }
+    return None
+
+async def parse_products_smooth_scroll(page, plan=None):
+    """Scrolls the listing; returns (raw rows, cards seen, row per card id).
+
+    Cards the listing cache knows unchanged (`plan`), or the product index
+    has recently extracted with the same price texts (on another listing,
+    this run or an earlier one), keep their stored row; only new or
+    re-priced cards get the per-card extraction."""
+    plan = plan or Plan()
     seen = set()
-    results = []
+    cards, rows_by_id, results = [], {}, []
+    indexed = []
     previous_count = 0
     scroll_attempts = 0
 
     while True:
-        product_cards = await page.query_selector_all("div[class*=product-card], div.w-full.border.cursor-pointer")
-
-        for item in product_cards:
+        batch = await read_cards(page)
+        handles = None
+
+        for card in batch:
+            if card["id"] in seen:          # read again after a scroll
+                continue
+            seen.add(card["id"])
+            metrics.inc("cards_seen", store=STORE_NAME)
+            card_started = time.perf_counter()
             try:
-                title_block = await item.query_selector("div.h-\\[120px\\].flex.pt-1.flex-col.justify-between")
-                title = await title_block.inner_text() if title_block else ""
-                if not title or title in seen:
+                if not card["title"]:
+                    metrics.inc("cards_skipped", store=STORE_NAME)
                     continue
-                seen.add(title)
-
-                discounted_price_el = await item.query_selector("div.text-\\[\\#EA242A\\]")
-                discounted_price = await discounted_price_el.inner_text() if discounted_price_el else ""
-
-                original_price_el = await item.query_selector("div.line-through")
-                original_price = await original_price_el.inner_text() if original_price_el else ""
-
-                await item.scroll_into_view_if_needed()
-                await page.wait_for_timeout(200)
-
-                imgs = await item.query_selector_all("img")
-                image_url = ""
-                for img in imgs:
-                    alt = await img.get_attribute("alt") or ""
-                    src = await img.get_attribute("src") or ""
-                    if not src.strip():
-                        src = await img.get_attribute("data-src") or ""
-                    if alt.strip().lower() in title.strip().lower() and (
-                        ".jpg" in src or ".jpeg" in src or ".webp" in src or ".png" in src
-                    ):
-                        image_url = src
-                        break
-
-                image_slug = slugify(title)
-                image_filename = f"{image_slug}.jpg"
-                local_image_path = ""
-
-                if image_url:
-                    if not image_url.startswith("http"):
-                        image_url = f"https://www.a101.com.tr/{image_url.lstrip('/')}"
-                    await download_image(image_url, image_filename)
-                    local_image_path = f"/images/a101/{image_filename}"
+                cards.append(card)
+                pid = product_id(card["href"]) or card["title"]
+                known, row = product_index.reuse(STORE_NAME, pid, card["sig"])
+                if plan.known(card):
+                    metrics.inc("cards_reused", store=STORE_NAME)
+                    row = plan.row(card)
+                elif known:
+                    metrics.inc("cards_indexed", store=STORE_NAME)
                 else:
-                    print(f"🚫 Skipped image for: {title}")
-                    inner_html = await item.inner_html()
-                    with open("debug_missing_image.html", "w", encoding="utf-8") as f:
-                        f.write(inner_html)
-
-                url = await item.query_selector("a")
-                url = await url.get_attribute("href") if url else ""
-                url = f"https://www.a101.com.tr{url}"
-
-                if discounted_price and title:
-                    product = {
-                        "name": title.strip(),
-                        "url": url,
-                        "image": local_image_path,
-                        "original_price": original_price.strip().replace("₺", "").replace(",", "."),
-                        "price": discounted_price.strip().replace("₺", "").replace(",", "."),
-                        "store": STORE_NAME,
-                        "source": STORE_NAME,
-                        "category": "Market",
-                        "discountPercentage": calculate_discount(original_price, discounted_price),
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    results.append(product)
-                    print(f"✅ {title.strip()} - {product['price']}₺")
+                    if handles is None:
+                        handles = await card_handles(page)
+                    if card["id"] not in handles:
+                        raise LookupError("card left the page before its extraction")
+                    row = await extract_card(page, handles[card["id"]], card)
+                    indexed.append((pid, card["sig"], row))
+                rows_by_id[card["id"]] = row
+                if row:
+                    results.append(row)
 
             except Exception as e:
+                metrics.inc("cards_failed", store=STORE_NAME)
                 print("❌ Error parsing item:", e)
+                if handles and card["id"] in handles:
+                    await debug_capture.card(STORE_NAME, "parse_error", handles[card["id"]],
+                                             error=str(e), listing=page.url)
+            finally:
+                metrics.observe("stage_seconds", time.perf_counter() - card_started,
+                                stage="card_extract", store=STORE_NAME)
+
+        # recorded per batch, so the next listing's copy of a card is skipped too
+        await asyncio.to_thread(product_index.put, STORE_NAME, indexed)
+        indexed = []
 
-        await page.evaluate("window.scrollBy(0, 400)")
-        await page.wait_for_timeout(1000)
+        with metrics.timer("scroll", store=STORE_NAME):
+            await page.evaluate("window.scrollBy(0, 400)")
+            await page.wait_for_timeout(1000)
 
         if len(seen) == previous_count:
             scroll_attempts += 1
@@ -129,108 +181,107 @@ async def parse_products_smooth_scroll(page):
             break
 
     print(f"🎯 Total parsed products: {len(results)}")
-    return results
-
-def calculate_discount(original, discounted):
-    try:
-        o = float(original.strip().replace("₺", "").replace(",", "."))
-        d = float(discounted.strip().replace("₺", "").replace(",", "."))
-        return round(100 * (o - d) / o)
-    except:
-        return None
-
-async def save_json(new_data):
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing = []
-
-    updated = [item for item in existing if item["store"] != STORE_NAME]
-    updated.extend(new_data)
-
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(updated, f, ensure_ascii=False, indent=2)
-
-    print(f"📁 Saved {len(new_data)} new {STORE_NAME} items. Total in file: {len(updated)}")
-
-async def post_to_backend(data):
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(API_ENDPOINT, json=data)
-            if response.status_code == 200:
-                print("🚀 Data posted to backend successfully")
-            else:
-                print("⚠️ Backend error:", response.text)
-    except Exception as e:
-        print("❌ POST request failed:", e)
-
-async def scrape_a101():
-    print("🛒 A101 Bot Started")
-    all_products = []
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=False,
-            args=[
-                "--use-fake-ui-for-media-stream",
-                "--disable-geolocation",
-                "--disable-notifications",
-                "--disable-popup-blocking"
-            ]
-        )
-
-        context = await browser.new_context(
+    return results, cards, rows_by_id
+
+class A101Adapter(StoreAdapter):
+    """One warmed browser context; each campaign listing URL is a work unit,
+    loaded in its own tab, up to A101_TABS at a time.
+
+    Every listing is ready when its first product card is attached (after
+    DOMContentLoaded, never networkidle, which the campaign pages' trackers
+    can hold off for a long time).  The consent banner is waited for once
+    per context; the persistent profile keeps the cookie, later tabs only
+    click it if it is already there."""
+
+    name = STORE_NAME
+    image_subdir = "a101"
+    consent_timeout = 5000          # ms to wait for the "KABUL ET" banner once, 0 = skip
+    concurrency = TABS
+
+    def __init__(self, urls=None):
+        self.urls = list(urls or A101_URLS)
+        self.listings = ListingCache(STORE_NAME)
+        self._playwright = self.context = self.page = None
+        self._idle_tabs = []
+        self._consent_lock = asyncio.Lock()
+        self._consent_checked = False
+
+    async def open(self):
+        self._playwright = await async_playwright().start()
+        self.context = await launch_context(
+            self._playwright, STORE_NAME,
+            extra_args=["--disable-geolocation", "--disable-popup-blocking"],
             permissions=[],
             geolocation=None,
             locale="en-US",
             user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         )
-
         # ✅ Explicitly deny permissions for the domain
-        await context.grant_permissions([], origin="https://www.a101.com.tr")
-
-        page = await context.new_page()
-
-        for url in A101_URLS:
-            print(f"🌐 Visiting: {url}")
-            try:
-                if "aldin-aldin" in url:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                    print("⏱️ Loaded with DOMContentLoaded to avoid timeout.")
-                else:
-                    await page.goto(url, timeout=60000)
-                    await page.wait_for_load_state("networkidle")
-                    print("✅ Loaded with NetworkIdle.")
-
+        await self.context.grant_permissions([], origin="https://www.a101.com.tr")
+        self.page = await first_page(self.context)
+        self._idle_tabs = [self.page]
+
+    async def close(self):
+        if self.context is not None:
+            await self.context.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    async def discover(self):
+        return [WorkUnit(url) for url in self.urls]
+
+    async def _tab(self):
+        return self._idle_tabs.pop() if self._idle_tabs else await self.context.new_page()
+
+    async def _dismiss_consent(self, page):
+        async with self._consent_lock:
+            first, self._consent_checked = not self._consent_checked, True
+            if first and self.consent_timeout:
                 try:
-                    await page.wait_for_selector("button:has-text('KABUL ET')", timeout=5000)
-                    await page.click("button:has-text('KABUL ET')")
+                    await page.wait_for_selector(CONSENT_SELECTOR, timeout=self.consent_timeout)
+                    await page.click(CONSENT_SELECTOR)
                     print("🍪 Cookie consent dismissed.")
-                except:
+                except Exception:
                     print("🍪 Cookie popup not found.")
+                return
+        button = await page.query_selector(CONSENT_SELECTOR)
+        if button is not None:
+            await button.click()
+
+    async def extract(self, unit):
+        url = unit.key
+        page = await self._tab()
+        try:
+            print(f"🌐 Visiting: {url}")
+            with metrics.timer("navigation", store=STORE_NAME):
+                await governed_goto(page, url, wait_until="domcontentloaded", timeout=60000)
+                await self._dismiss_consent(page)
+                await page.wait_for_selector(CARD_SELECTOR, timeout=READY_TIMEOUT)
+
+            # the whole listing is always scrolled; unchanged cards skip extraction
+            plan = self.listings.plan(url)
+            with metrics.timer("listing", store=STORE_NAME):
+                rows, cards, rows_by_id = await parse_products_smooth_scroll(page, plan)
+
+            if not rows:
+                # a campaign listing is never empty: fail the unit so it stays pending
+                await debug_capture.page(STORE_NAME, "empty_listing", page)
+                print("🧪 No products found — captured debug page.")
+                raise RuntimeError(f"no products parsed from {url}")
+            await asyncio.to_thread(self.listings.save, url, cards, rows_by_id)
+            print(f"✅ Parsed {len(rows)} products from page")
+            return UnitResult(rows)
+        finally:
+            self._idle_tabs.append(page)
+
+    def image_filename(self, item):
+        return f"{slugify(item['name'])}.jpg"
 
-                await page.wait_for_selector("div[class*=product-card], div.w-full.border.cursor-pointer", timeout=10000)
-
-                products = await parse_products_smooth_scroll(page)
-
-                if len(products) == 0:
-                    await page.screenshot(path="debug_a101_screenshot.png", full_page=True)
-                    html = await page.content()
-                    with open("debug_a101.html", "w", encoding="utf-8") as f:
-                        f.write(html)
-                    print("🧪 No products found — saved debug files.")
-                else:
-                    print(f"✅ Parsed {len(products)} products from page")
-                    all_products.extend(products)
-
-            except Exception as e:
-                print(f"❌ Failed on {url}:", e)
-
-        await browser.close()
-
-    await save_json(all_products)
-    await post_to_backend(all_products)
+async def scrape_a101():
+    print("🛒 A101 Bot Started")
+    return await run_store(A101Adapter())
 
 if __name__ == "__main__":
-    asyncio.run(scrape_a101())
+    import sys
+    from cli import main
+    sys.exit(main(["run", "--store", "a101", *sys.argv[1:]]))
@@ -0,0 +1,84 @@
+"""
+api.py  –  read-only HTTP service over the scraped discounts (catalog.py).
+
+    python cli.py serve                          # http://127.0.0.1:8001
+    python cli.py serve --host 0.0.0.0 --port 9000
+
+    GET /discounts?q=süt&store=Migros&min_price=10&max_price=50&sort=price&page=2
+    GET /discounts/top?store=A101&category=Market&limit=20
+    GET /stores
+    GET /health
+
+sort is "discount" (default, biggest first), "price" or "-price"; per_page
+is capped at MAX_PER_PAGE.  Every response carries an ETag built from the
+feed version and the query, so a client repeating a request with
+If-None-Match gets a bodiless 304 until a run commits new data.
+"""
+import hashlib, os
+from pathlib import Path
+
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse
+
+import sinks
+from catalog import CatalogSource
+
+API_HOST     = os.getenv("API_HOST", "127.0.0.1")
+API_PORT     = int(os.getenv("API_PORT", "8001"))      # 8000 is the ingesting backend
+MAX_PER_PAGE = 100
+
+
+def _respond(request: Request, version: str, body) -> Response:
+    tag = '"' + hashlib.sha1(f"{version}|{request.url.path}?{request.url.query}".encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if tag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
+def create_app(directory: Path | str | None = None) -> FastAPI:
+    """The app serving the shards in `directory` (default sinks.feed_dir())."""
+    source = CatalogSource(directory or sinks.feed_dir())
+    app = FastAPI(title="discount-bots", docs_url="/docs", redoc_url=None)
+
+    @app.get("/discounts")
+    def discounts(request: Request,
+                  q: str = "",
+                  store: str | None = None,
+                  category: str | None = None,
+                  min_price: float | None = Query(None, ge=0),
+                  max_price: float | None = Query(None, ge=0),
+                  min_discount: int | None = Query(None, ge=0, le=100),
+                  sort: str = Query("discount", pattern="^(discount|price|-price)$"),
+                  page: int = Query(1, ge=1),
+                  per_page: int = Query(50, ge=1, le=MAX_PER_PAGE)):
+        catalog = source.current()
+        total, items = catalog.query(q, store, category, min_price, max_price,
+                                     min_discount, sort, page, per_page)
+        return _respond(request, catalog.version, {
+            "total": total, "page": page, "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page, "items": items,
+        })
+
+    @app.get("/discounts/top")
+    def top(request: Request, store: str | None = None, category: str | None = None,
+            limit: int = Query(20, ge=1, le=MAX_PER_PAGE)):
+        catalog = source.current()
+        return _respond(request, catalog.version, {"items": catalog.top(store, category, limit)})
+
+    @app.get("/stores")
+    def stores(request: Request):
+        catalog = source.current()
+        return _respond(request, catalog.version, {"stores": list(catalog.stores.values())})
+
+    @app.get("/health")
+    def health():
+        catalog = source.current()
+        return {"version": catalog.version, "items": len(catalog.items)}
+
+    return app
+
+
+def serve(host: str = API_HOST, port: int = API_PORT, directory: Path | str | None = None) -> None:
+    import uvicorn
+    uvicorn.run(create_app(directory), host=host, port=port)
@@ -0,0 +1,261 @@
+"""
+benchmarks/fixtures.py  –  recorded listing pages / API responses and a local
+stand-in server that serves them, so extractors can run with no network.
+
+Fixtures are built from what the repo already captured:
+
+    A101, Migros   tmpfln1ul3i                   (discounts.json snapshot)
+    CarrefourSA    a101_discounted_products.json (CarrefourSA rows, misnamed)
+    Şok            sok_debug.html                (listing page, 20 cards, tiled)
+
+Each set is rendered back into the markup / JSON shape the store's extractor
+reads (same selectors and price formats as the live sites).
+"""
+import html, json, re, threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+SNAPSHOT_A101_MIGROS = ROOT / "tmpfln1ul3i"
+SNAPSHOT_CARREFOUR   = ROOT / "a101_discounted_products.json"
+SNAPSHOT_SOK         = ROOT / "sok_debug.html"
+
+MIGROS_PAGE_SIZE     = 30
+SOK_PAGE_SIZE        = 20
+SOK_PAGES            = 10      # the capture has one page; it is tiled this often
+CARREFOUR_CATEGORIES = 4
+
+# smallest valid JPEG – every /img/ request gets it
+PLACEHOLDER_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c"
+    "140d0c0b0b0c1912130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27"
+    "393d38323c2e333432ffc0000b080001000101011100ffc4001f0000010501010101010100000000"
+    "000000000102030405060708090a0bffc400b5100002010303020403050504040000017d010203"
+    "00041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718"
+    "191a25262728292a3435363738393a434445464748494a535455565758595a636465666768696a"
+    "737475767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6"
+    "b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7"
+    "f8f9faffda0008010100003f00fbd3ffd9"
+)
+
+
+def _tr_price(value: str | float) -> str:
+    """154.95 -> '154,95' (the sites' display format)."""
+    return f"{float(value):.2f}".replace(".", ",")
+
+
+def _page(body: str) -> str:
+    return f"<!doctype html><html><head><meta charset='utf-8'></head><body>{body}</body></html>"
+
+
+# --------------------------------------------------------------------------- #
+#  Builders
+# --------------------------------------------------------------------------- #
+def load_rows(limit: int | None = None) -> dict[str, list[dict]]:
+    """Snapshot rows per store, optionally capped at `limit` each."""
+    combined = json.loads(SNAPSHOT_A101_MIGROS.read_text("utf-8"))
+    rows = {
+        "a101"       : [r for r in combined if r.get("store") == "A101"],
+        "migros"     : [r for r in combined if r.get("store") == "Migros"],
+        "carrefoursa": json.loads(SNAPSHOT_CARREFOUR.read_text("utf-8")),
+        "sok"        : _tile(_sok_rows(SNAPSHOT_SOK.read_text("utf-8")), SOK_PAGES),
+    }
+    if limit:
+        rows = {k: v[:limit] for k, v in rows.items()}
+    return rows
+
+
+def _tile(rows: list[dict], times: int) -> list[dict]:
+    """Repeats captured rows with unique paths so pagination has several pages."""
+    return [dict(r, path=f"{r['path']}-{n}" if n else r["path"])
+            for n in range(times) for r in rows]
+
+
+_SOK_CARD = re.compile(r'<a href="(?P<href>/[^"]+)"><div class="CProductCard-module_productCardWrapper')
+_SOK_IMG = re.compile(r'<img src="([^"]+)"')
+_SOK_NAME = re.compile(r'CProductCard-module_title[^"]*">([^<]+)</h2>')
+_SOK_PRICES = re.compile(r'>([\d.,]+)₺</span>')
+
+
+def _sok_rows(page_html: str) -> list[dict]:
+    """One row per product card; cards without a struck price keep original == price."""
+    def num(text):
+        return float(text.replace(".", "").replace(",", "."))
+
+    starts = list(_SOK_CARD.finditer(page_html))
+    rows = []
+    for m, nxt in zip(starts, starts[1:] + [None]):
+        card = page_html[m.start(): nxt.start() if nxt else None]
+        img, name = _SOK_IMG.search(card), _SOK_NAME.search(card)
+        prices = [num(p) for p in _SOK_PRICES.findall(card)]
+        if not (img and name and prices):
+            continue
+        rows.append({
+            "name"          : html.unescape(name[1]).strip(),
+            "path"          : m["href"].lstrip("/"),
+            "image"         : img[1].rsplit("/", 1)[-1],
+            "original_price": prices[0],
+            "price"         : prices[-1],
+        })
+    return rows
+
+
+def a101_listing(rows: list[dict], base: str) -> str:
+    cards = []
+    for r in rows:
+        name = html.escape(r["name"].split("\n")[0].strip())
+        href = html.escape(urlsplit(r["url"]).path)
+        pid = re.sub(r"\W", "", href.rsplit("_p-", 1)[-1]) or str(len(cards))
+        cards.append(
+            f'<div class="w-full border cursor-pointer">'
+            f'<a href="{href}"><img alt="{name}" src="{base}/img/a101/{pid}.png"></a>'
+            f'<div class="h-[120px] flex pt-1 flex-col justify-between">'
+            f'<div>{name}</div>'
+            f'<div class="line-through">₺{_tr_price(r["original_price"])}</div>'
+            f'<div class="text-[#EA242A]">₺{_tr_price(r["price"])}</div>'
+            f'</div></div>'
+        )
+    return _page("".join(cards))
+
+
+def migros_listing(rows: list[dict], base: str) -> str:
+    cards = []
+    for i, r in enumerate(rows):
+        name = html.escape(r.get("title") or r.get("name", ""))
+        href = html.escape(urlsplit(r["url"]).path)
+        cards.append(
+            f'<mat-card style="display:block;height:240px">'
+            f'<div class="money-discount">%{r["discountPercentage"]}</div>'
+            f'<a id="product-name" href="{href}">{name}</a>'
+            f'<img class="product-image" data-src="{base}/img/migros/{i}.jpg" src="data:image/gif;base64,R0lGOD">'
+            f'<span class="single-price-amount">{_tr_price(r["original_price"])} TL</span>'
+            f'<span class="sale-price">{_tr_price(r["price"])} TL</span>'
+            f'</mat-card>'
+        )
+    return _page("".join(cards))
+
+
+def carrefour_listing(rows: list[dict], base: str) -> str:
+    cards = []
+    for i, r in enumerate(rows):
+        cards.append(
+            f'<div class="hover-box">'
+            f'<a href="{html.escape(r["url"])}"><img src="{base}/img/carrefoursa/{i}.jpg"></a>'
+            f'<span class="item-name">{html.escape(r["name"])}</span>'
+            f'<span class="priceLineThrough">{_tr_price(r["original_price"])} TL</span>'
+            f'<span class="item-price">{_tr_price(r["price"])} TL</span>'
+            f'</div>'
+        )
+    return _page("".join(cards))
+
+
+def sok_api_page(rows: list[dict], base: str) -> dict:
+    return {"results": [
+        {
+            "product": {
+                "name"  : r["name"],
+                "path"  : r["path"],
+                "images": [{"host": f"{base}/img/sok", "path": r["image"]}],
+            },
+            "prices": {
+                "original"  : {"value": r["original_price"]},
+                "discounted": {"value": r["price"]},
+            },
+        }
+        for r in rows
+    ]}
+
+
+# --------------------------------------------------------------------------- #
+#  Stand-in server
+# --------------------------------------------------------------------------- #
+class FixtureServer:
+    """
+    Routes
+        /a101/listing                 A101 campaign listing
+        /migros?sayfa=N               Migros paginated listing (empty past the end)
+        /carrefoursa/c/<i>            CarrefourSA category i
+        /sok/api/v1/search?page=N     Şok search API JSON
+        /img/<store>/<file>           placeholder image
+        POST /api/discounts           backend stand-in, always 200
+    """
+
+    def __init__(self, limit: int | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.rows = load_rows(limit)
+        self.requests: Counter = Counter()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.base = f"http://{host}:{self._httpd.server_address[1]}"
+        self._cache: dict[str, bytes] = {}
+
+    # -- routing ----------------------------------------------------------- #
+    def _route(self, path: str, query: dict) -> tuple[int, str, bytes]:
+        parts = path.strip("/").split("/")
+        store = parts[0] if parts else ""
+        if store == "img":
+            return 200, "image/jpeg", PLACEHOLDER_JPEG
+        if path == "/a101/listing":
+            return self._html("a101", lambda: a101_listing(self.rows["a101"], self.base))
+        if path == "/migros":
+            page = int(query.get("sayfa", ["1"])[0])
+            chunk = self.rows["migros"][(page - 1) * MIGROS_PAGE_SIZE: page * MIGROS_PAGE_SIZE]
+            return 200, "text/html; charset=utf-8", migros_listing(chunk, self.base).encode()
+        if store == "carrefoursa" and len(parts) == 3:
+            i, rows = int(parts[2]), self.rows["carrefoursa"]
+            per = -(-len(rows) // CARREFOUR_CATEGORIES)
+            return 200, "text/html; charset=utf-8", \
+                carrefour_listing(rows[i * per:(i + 1) * per], self.base).encode()
+        if path == "/sok/api/v1/search":
+            page = int(query.get("page", ["1"])[0])
+            chunk = self.rows["sok"][(page - 1) * SOK_PAGE_SIZE: page * SOK_PAGE_SIZE]
+            return 200, "application/json", json.dumps(sok_api_page(chunk, self.base)).encode()
+        return 404, "text/plain", b"not found"
+
+    def _html(self, key: str, build) -> tuple[int, str, bytes]:
+        if key not in self._cache:
+            self._cache[key] = build().encode()
+        return 200, "text/html; charset=utf-8", self._cache[key]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, ctype, body):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                server.requests[url.path.strip("/").split("/")[0] or "/"] += 1
+                self._send(*server._route(url.path, parse_qs(url.query)))
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                server.requests["api"] += 1
+                self._send(200, "application/json", b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    # -- lifecycle --------------------------------------------------------- #
+    def start(self) -> "FixtureServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
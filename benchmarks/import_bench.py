@@ -0,0 +1,129 @@
+"""
+benchmarks/import_bench.py  –  import time and import side effects per module.
+
+    python -m benchmarks.import_bench                  # 5 rounds per target
+    python -m benchmarks.import_bench --rounds 20 --json imports.json
+
+Every round imports one target in a fresh interpreter, in an empty working
+directory.  Reported: median import time, modules loaded, which heavy
+libraries came along, and anything the import created on disk.  The CLI
+targets time the whole `cli.py list` / `cli.py --help` process.
+
+Exits 1 if an import creates files, or if a target loads a browser library
+it does not need (cli / engine / stores must load none; each bot only its
+own; only api loads FastAPI).
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+from benchmarks.fixtures import ROOT
+
+HEAVY = ("playwright", "selenium", "bs4", "httpx", "fastapi")
+
+# target → heavy libraries it is allowed to load
+TARGETS = {
+    "stores"         : (),
+    "cli"            : (),
+    "engine"         : ("httpx",),
+    "a101_bot"       : ("httpx", "playwright"),
+    "migros_bot"     : ("httpx", "playwright"),
+    "sok_bot_api"    : ("httpx", "playwright"),
+    "carrefoursa_bot": ("httpx", "selenium"),
+    "api"            : ("httpx", "fastapi"),
+}
+COMMANDS = {
+    "cli list"  : ["cli.py", "list"],
+    "cli --help": ["cli.py", "--help"],
+}
+
+_PROBE = """
+import importlib, json, sys, time
+before = set(sys.modules)
+started = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - started
+loaded = set(sys.modules) - before
+print(json.dumps({{"s": elapsed, "modules": len(loaded),
+                  "heavy": sorted({{m.split(".")[0] for m in loaded}} & {heavy!r})}}))
+"""
+
+
+def _env() -> dict:
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.getenv("PYTHONPATH")])))
+
+
+def _created(tmp: Path) -> list[str]:
+    return sorted(str(p.relative_to(tmp)) for p in tmp.rglob("*") if "__pycache__" not in p.parts)
+
+
+def measure_import(module: str, rounds: int) -> dict:
+    samples, created = [], set()
+    for _ in range(rounds):
+        with tempfile.TemporaryDirectory(prefix="import-bench-") as tmp:
+            proc = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=set(HEAVY))],
+                                  cwd=tmp, env=_env(), capture_output=True, text=True)
+            if proc.returncode != 0:
+                return {"target": module, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+            samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            created.update(_created(Path(tmp)))
+    heavy = samples[-1]["heavy"]
+    return {
+        "target"       : module,
+        "import_ms"    : round(statistics.median(s["s"] for s in samples) * 1000, 1),
+        "modules"      : samples[-1]["modules"],
+        "heavy"        : heavy,
+        "unexpected"   : sorted(set(heavy) - set(TARGETS[module])),
+        "side_effects" : sorted(created),
+    }
+
+
+def measure_command(name: str, args: list[str], rounds: int) -> dict:
+    walls, created = [], set()
+    for _ in range(rounds):
+        with tempfile.TemporaryDirectory(prefix="import-bench-") as tmp:
+            started = time.perf_counter()
+            proc = subprocess.run([sys.executable, str(ROOT / args[0]), *args[1:]],
+                                  cwd=tmp, env=_env(), capture_output=True, text=True)
+            walls.append(time.perf_counter() - started)
+            if proc.returncode != 0:
+                return {"target": name, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+            created.update(_created(Path(tmp)))
+    return {"target": name, "wall_ms": round(statistics.median(walls) * 1000, 1),
+            "unexpected": [], "side_effects": sorted(created)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", choices=[*TARGETS, *COMMANDS], action="append", help="repeatable; default all")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--json", type=Path)
+    args = ap.parse_args(argv)
+
+    results = []
+    for target in args.target or [*TARGETS, *COMMANDS]:
+        if target in COMMANDS:
+            results.append(measure_command(target, COMMANDS[target], args.rounds))
+        else:
+            results.append(measure_import(target, args.rounds))
+
+    print(f"{'target':>16}  {'ms':>8}  {'modules':>7}  heavy / side effects")
+    for r in results:
+        if "error" in r:
+            print(f"{r['target']:>16}  ERROR: {r['error'][0]}")
+            continue
+        ms = r.get("import_ms", r.get("wall_ms"))
+        notes = ", ".join(r.get("heavy", [])) or "-"
+        if r["unexpected"]:
+            notes += f"  ❌ unexpected: {', '.join(r['unexpected'])}"
+        if r["side_effects"]:
+            notes += f"  ❌ created: {', '.join(r['side_effects'])}"
+        print(f"{r['target']:>16}  {ms:>8}  {str(r.get('modules', '')):>7}  {notes}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    bad = [r for r in results if "error" in r or r["unexpected"] or r["side_effects"]]
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+benchmarks/launch_bench.py  –  browser startup time and memory per launch profile.
+
+    python -m benchmarks.launch_bench               # 5 rounds per profile
+    python -m benchmarks.launch_bench --rounds 10 --json launch.json
+
+Profiles
+    default       chromium.launch(headless=True) + new_context()   (old Migros / Şok)
+    a101-legacy   headful launch with the old A101 args             (needs $DISPLAY)
+    light         browser_profile.launch_context(), persistent dir
+    light-fresh   browser_profile.launch_context(persistent=False)
+
+Each round launches, opens the recorded A101 listing from the local fixture
+server and closes.  Reported: median launch time, median time to the listing
+being ready, and the peak RSS of the browser process tree (Linux /proc).
+"""
+import argparse, asyncio, json, os, statistics, sys, tempfile, time
+from pathlib import Path
+
+from benchmarks.fixtures import FixtureServer
+
+PROFILES = ("default", "a101-legacy", "light", "light-fresh")
+
+
+def tree_rss_mb(root_pid: int | None = None) -> float | None:
+    """Sum of VmRSS over all descendants of root_pid (default: this process)."""
+    proc = Path("/proc")
+    if not proc.exists():
+        return None
+    root_pid = root_pid or os.getpid()
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            status = (entry / "status").read_text()
+        except OSError:
+            continue
+        fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+        pid, ppid = int(entry.name), int(fields.get("PPid", "0").strip())
+        children.setdefault(ppid, []).append(pid)
+        rss[pid] = int(fields.get("VmRSS", "0 kB").split()[0] or 0)
+    total, stack = 0, list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return round(total / 1024, 1)
+
+
+async def _open(p, profile: str, profile_root: Path):
+    import browser_profile
+    if profile == "default":
+        browser = await p.chromium.launch(headless=True)
+        return await browser.new_context(), browser
+    if profile == "a101-legacy":
+        browser = await p.chromium.launch(headless=False, args=[
+            "--use-fake-ui-for-media-stream", "--disable-geolocation",
+            "--disable-notifications", "--disable-popup-blocking"])
+        return await browser.new_context(locale="en-US"), browser
+    browser_profile.PROFILE_DIR = profile_root
+    context = await browser_profile.launch_context(p, "bench", persistent=(profile == "light"))
+    return context, None
+
+
+async def one_round(profile: str, url: str, profile_root: Path) -> dict:
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        started = time.perf_counter()
+        context, browser = await _open(p, profile, profile_root)
+        launched = time.perf_counter()
+        page = context.pages[0] if context.pages else await context.new_page()
+        await page.goto(url, wait_until="domcontentloaded")
+        await page.wait_for_selector("div.w-full.border.cursor-pointer")
+        ready = time.perf_counter()
+        rss = tree_rss_mb()
+        await context.close()
+        if browser is not None:
+            await browser.close()
+    return {"launch_s": launched - started, "ready_s": ready - started, "rss_mb": rss}
+
+
+async def bench(profiles, rounds: int, url: str) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="launch-bench-") as tmp:
+        for profile in profiles:
+            if profile == "a101-legacy" and not os.getenv("DISPLAY"):
+                results.append({"profile": profile, "skipped": "no $DISPLAY"})
+                continue
+            samples = [await one_round(profile, url, Path(tmp)) for _ in range(rounds)]
+            rss = [s["rss_mb"] for s in samples if s["rss_mb"] is not None]
+            results.append({
+                "profile"    : profile,
+                "rounds"     : rounds,
+                "launch_s"   : round(statistics.median(s["launch_s"] for s in samples), 3),
+                "ready_s"    : round(statistics.median(s["ready_s"] for s in samples), 3),
+                "peak_rss_mb": max(rss) if rss else None,
+            })
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--profile", choices=PROFILES, action="append", help="repeatable; default all")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--json", type=Path)
+    args = ap.parse_args(argv)
+
+    with FixtureServer(limit=50) as server:
+        results = asyncio.run(bench(args.profile or PROFILES, args.rounds, f"{server.base}/a101/listing"))
+
+    print(f"{'profile':>12}  {'launch_s':>9}  {'ready_s':>9}  {'peak_rss_mb':>11}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['profile']:>12}  skipped ({r['skipped']})")
+        else:
+            print(f"{r['profile']:>12}  {r['launch_s']:>9}  {r['ready_s']:>9}  {str(r['peak_rss_mb']):>11}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
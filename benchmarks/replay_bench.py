@@ -0,0 +1,214 @@
+"""
+benchmarks/replay_bench.py  –  offline extractor benchmark.
+
+Serves the recorded fixtures (benchmarks/fixtures.py) from a local stand-in
+server and runs every store's adapter through the shared engine (engine.collect)
+against it, headless, one
+subprocess per store so peak RSS is per store:
+
+    python -m benchmarks.replay_bench                       # all stores
+    python -m benchmarks.replay_bench --store a101 --limit 50
+    python -m benchmarks.replay_bench --json bench.json
+    python -m benchmarks.replay_bench --compare bench.json  # exit 1 on regression
+
+Reported per store: items, wall time, items/sec, browser protocol round trips
+(Playwright driver messages or WebDriver commands), HTTP requests seen by the
+stand-in server, peak RSS of the Python process and of its largest child
+(browser / driver).  No network access is needed.
+"""
+import argparse, asyncio, json, os, subprocess, sys, tempfile, time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:                                       # Windows
+    resource = None
+
+from benchmarks.fixtures import CARREFOUR_CATEGORIES, ROOT, FixtureServer
+
+STORES = ("a101", "migros", "sok", "carrefoursa")
+
+
+# --------------------------------------------------------------------------- #
+#  Worker side (runs inside the per-store subprocess)
+# --------------------------------------------------------------------------- #
+def _count_protocol_calls() -> dict:
+    """Wraps the Playwright / Selenium transports to count round trips."""
+    counts = {"calls": 0}
+
+    def wrap(cls, name):
+        original = getattr(cls, name)
+
+        def counted(self, *args, **kwargs):
+            counts["calls"] += 1
+            return original(self, *args, **kwargs)
+        setattr(cls, name, counted)
+
+    try:
+        from playwright._impl._connection import Connection
+        wrap(Connection, "_send_message_to_server")
+    except (ImportError, AttributeError):
+        pass
+    try:
+        from selenium.webdriver.remote.remote_connection import RemoteConnection
+        wrap(RemoteConnection, "execute")
+    except (ImportError, AttributeError):
+        pass
+    return counts
+
+
+def _unthrottle_local() -> None:
+    from ratelimit import HOST_LIMITS, HostLimit
+    HOST_LIMITS["127.0.0.1"] = HostLimit(rate=1e9, burst=10**9, concurrency=10**6)
+
+
+async def _collect(adapter, workdir: Path) -> list[dict]:
+    """Discover → extract → normalise → images through the shared engine, no publishing."""
+    from checkpoint import Checkpoint, CheckpointStore
+    from engine import collect
+    return await collect(adapter, CheckpointStore(workdir / "checkpoints"), Checkpoint(store=adapter.name))
+
+
+async def _run_a101(base: str, workdir: Path) -> list[dict]:
+    from a101_bot import A101Adapter
+    adapter = A101Adapter(urls=[f"{base}/a101/listing"])
+    adapter.consent_timeout = 0
+    return await _collect(adapter, workdir)
+
+
+async def _run_migros(base: str, workdir: Path) -> list[dict]:
+    from migros_bot import MigrosAdapter
+    return await _collect(MigrosAdapter(base_url=f"{base}/migros"), workdir)
+
+
+async def _run_sok(base: str, workdir: Path) -> list[dict]:
+    from sok_bot_api import SokAdapter
+    return await _collect(SokAdapter(api_url=f"{base}/sok/api/v1/search", bootstrap=False), workdir)
+
+
+async def _run_carrefoursa(base: str, workdir: Path) -> list[dict]:
+    from carrefoursa_bot import CarrefourSAAdapter
+    categories = [f"{base}/carrefoursa/c/{i}" for i in range(CARREFOUR_CATEGORIES)]
+    return await _collect(CarrefourSAAdapter(categories=categories), workdir)
+
+
+def _peak_rss_mb(who) -> float | None:
+    if resource is None:
+        return None
+    kb = resource.getrusage(who).ru_maxrss
+    return round(kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def worker(store: str, base: str, workdir: Path) -> dict:
+    counts = _count_protocol_calls()
+    _unthrottle_local()
+    from metrics import metrics
+
+    runner = globals()[f"_run_{store}"]
+    started = time.perf_counter()
+    items = asyncio.run(runner(base, workdir))
+    wall = time.perf_counter() - started
+
+    summary = metrics.summary()["stores"]
+    failed = next(iter(summary.values()), {}).get("counters", {}).get("units_failed")
+    if failed:
+        raise SystemExit(f"{failed} work unit(s) failed")
+    return {
+        "store"           : store,
+        "items"           : len(items),
+        "wall_s"          : round(wall, 3),
+        "items_per_s"     : round(len(items) / wall, 2) if wall else 0,
+        "protocol_calls"  : counts["calls"],
+        "peak_rss_mb"     : _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "child_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        "stages"          : next(iter(summary.values()), {}).get("stages", {}),
+    }
+
+
+# --------------------------------------------------------------------------- #
+#  Harness side
+# --------------------------------------------------------------------------- #
+def run_store(store: str, server: FixtureServer) -> dict:
+    before = dict(server.requests)
+    with tempfile.TemporaryDirectory(prefix=f"bench-{store}-") as tmp:
+        env = dict(os.environ,
+                   PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.getenv("PYTHONPATH")])),
+                   CHECKPOINT_DIR=str(Path(tmp) / "checkpoints"),
+                   LISTING_CACHE_DIR=str(Path(tmp) / "listings"),
+                   PRICE_HISTORY_DB=str(Path(tmp) / "history" / "prices.db"),
+                   PRODUCT_INDEX_DB=str(Path(tmp) / "history" / "products.db"),
+                   QUARANTINE_DIR=str(Path(tmp) / "quarantine"),
+                   FRONTEND_IMAGE_DIR=str(Path(tmp) / "images"),
+                   METRICS_DIR=str(Path(tmp) / "metrics"))
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.replay_bench", "--worker", store,
+             "--base", server.base, "--workdir", tmp],
+            cwd=tmp, env=env, capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        return {"store": store, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["http_requests"] = sum(server.requests.values()) - sum(before.values())
+    return result
+
+
+def _print_table(results: list[dict]) -> None:
+    cols = ("store", "items", "wall_s", "items_per_s", "protocol_calls",
+            "http_requests", "peak_rss_mb", "child_peak_rss_mb")
+    print("  ".join(f"{c:>16}" for c in cols))
+    for r in results:
+        if "error" in r:
+            print(f"{r['store']:>16}  ERROR: {r['error'][0]}")
+            continue
+        print("  ".join(f"{str(r.get(c, '')):>16}" for c in cols))
+
+
+def _regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    base = {r["store"]: r for r in baseline if "error" not in r}
+    problems = []
+    for r in results:
+        old = base.get(r["store"])
+        if old is None or "error" in r:
+            continue
+        if r["items"] < old["items"]:
+            problems.append(f"{r['store']}: items {old['items']} → {r['items']}")
+        if r["items_per_s"] < old["items_per_s"] * (1 - tolerance):
+            problems.append(f"{r['store']}: items/s {old['items_per_s']} → {r['items_per_s']}")
+        for key in ("protocol_calls", "peak_rss_mb"):
+            if old.get(key) and r.get(key) and r[key] > old[key] * (1 + tolerance):
+                problems.append(f"{r['store']}: {key} {old[key]} → {r[key]}")
+    return problems
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--store", choices=STORES, action="append", help="repeatable; default all")
+    ap.add_argument("--limit", type=int, default=100, help="max fixture rows per store")
+    ap.add_argument("--json", type=Path, help="write results here")
+    ap.add_argument("--compare", type=Path, help="baseline JSON; exit 1 on regression")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("--worker", choices=STORES, help=argparse.SUPPRESS)
+    ap.add_argument("--base", help=argparse.SUPPRESS)
+    ap.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.base, args.workdir)))
+        return 0
+
+    with FixtureServer(limit=args.limit) as server:
+        results = [run_store(store, server) for store in (args.store or STORES)]
+    _print_table(results)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.compare:
+        problems = _regressions(results, json.loads(args.compare.read_text("utf-8")), args.tolerance)
+        for p in problems:
+            print(f"❌ regression – {p}")
+        return 1 if problems else 0
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+browser_profile.py  –  the one Chromium launch profile every Playwright bot uses.
+
+Headless by default (Playwright ≥1.49 runs the lightweight chromium-headless-
+shell build for headless=True), GPU / extensions / background networking /
+sync off, small viewport, service workers blocked, and a persistent user-data
+dir per store so consent cookies (A101 "KABUL ET") survive between runs.
+
+    context = await launch_context(p, "A101", locale="en-US")
+    page    = await first_page(context)
+    ...
+    await context.close()
+
+HEADLESS=0 shows the window for debugging; BROWSER_PROFILE_DIR moves the
+profiles.  Chromium locks a profile directory, so a second context for the
+same store in this process (queue workers, distributed.py) gets "<store>-1",
+"<store>-2" …; separate processes on one host need their own
+BROWSER_PROFILE_DIR.
+"""
+import os
+from pathlib import Path
+
+import profiling
+import recorder
+
+HEADLESS    = os.getenv("HEADLESS", "1") != "0"
+PROFILE_DIR = Path(os.getenv("BROWSER_PROFILE_DIR", ".browser-profiles"))
+VIEWPORT    = {"width": 1280, "height": 720}
+
+LIGHT_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--disable-dev-shm-usage",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--use-fake-ui-for-media-stream",
+    "--disable-notifications",
+]
+
+
+_in_use: set[Path] = set()
+
+
+def profile_dir(store: str) -> Path:
+    """The store's profile directory, or a numbered sibling if it is in use here."""
+    base = PROFILE_DIR / recorder.store_slug(store)
+    path, n = base, 0
+    while path in _in_use:
+        n += 1
+        path = base.with_name(f"{base.name}-{n}")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def launch_options(**overrides) -> dict:
+    """Options shared by launch() and launch_persistent_context()."""
+    options = {"headless": HEADLESS, "args": list(LIGHT_ARGS)}
+    extra_args = overrides.pop("extra_args", ())
+    options["args"] += list(extra_args)
+    options.update(overrides)
+    return options
+
+
+async def launch_context(p, store: str, persistent: bool = True, extra_args=(), **context_kwargs):
+    """Launches Chromium with the light profile and returns a ready context.
+
+    Record / replay (recorder.py) is applied to the context.  Closing the
+    context also closes the browser."""
+    context_kwargs = {"viewport": VIEWPORT, "service_workers": "block",
+                      **context_kwargs, **recorder.context_options(store)}
+    if persistent:
+        path = profile_dir(store)
+        _in_use.add(path)
+        profiling.label(store, path=path)
+        try:
+            context = await p.chromium.launch_persistent_context(
+                str(path), **launch_options(extra_args=extra_args), **context_kwargs)
+        except BaseException:
+            _in_use.discard(path)
+            raise
+        context.on("close", lambda _: _in_use.discard(path))
+    else:
+        browser = await p.chromium.launch(**launch_options(extra_args=extra_args))
+        context = await browser.new_context(**context_kwargs)
+
+        async def close_browser(_):
+            await browser.close()
+        context.on("close", close_browser)
+    await recorder.prepare_context(context, store)
+    return context
+
+
+async def first_page(context):
+    """Persistent contexts open with a blank tab – reuse it instead of adding one."""
+    return context.pages[0] if context.pages else await context.new_page()
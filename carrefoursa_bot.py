@@ -1,19 +1,20 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import requests
+import asyncio
 import time
-import json
 import os
 
-CHROMEDRIVER_PATH = "C:\\Users\\main0\\chromedriver.exe"
+import profiling
+import recorder
+from debug_capture import debug_capture
+from engine import StoreAdapter, UnitResult, WorkUnit, run_store
+from listing_cache import ListingCache
+from metrics import metrics
+from ratelimit import governor
+
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "C:\\Users\\main0\\chromedriver.exe")
 BASE_URL = "https://www.carrefoursa.com"
-API_URL = "http://localhost:8000/api/discounts"
-DATA_FILE = DATA_FILE = "discounts.json"
 STORE_NAME = "CarrefourSA"
 
 CATEGORIES = [
@@ -36,13 +37,13 @@ CATEGORIES = [
     "https://www.carrefoursa.com/ev-yasam/c/2188",
 ]
 
-options = Options()
-options.add_argument("--headless=new")
-options.add_argument("--window-size=1920,1080")
-driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
-wait = WebDriverWait(driver, 10)
+def new_driver():
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    return webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
 
-def scroll_to_bottom():
+def scroll_to_bottom(driver):
     last_height = driver.execute_script("return document.body.scrollHeight")
     while True:
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
@@ -52,100 +53,124 @@ def scroll_to_bottom():
             break
         last_height = new_height
 
-def extract_price_from_outerhtml(html):
-    soup = BeautifulSoup(html, "html.parser")
-
-    try:
-        orig = soup.select_one(".priceLineThrough")
-        original = orig.get_text(strip=True).replace("TL", "") if orig else None
-        original = original.replace(",", ".") if original else None
-    except:
-        original = None
-
-    try:
-        disc = soup.select_one(".item-price")
-        discounted = disc.get_text(strip=True).replace("TL", "") if disc else None
-        discounted = discounted.replace(",", ".") if discounted else None
-    except:
-        discounted = None
-
-    return original, discounted
-
-def merge_and_save(new_products):
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing = []
-
-    updated = [item for item in existing if item.get("store") != STORE_NAME]
-    updated.extend(new_products)
-
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(updated, f, ensure_ascii=False, indent=2)
-
-    print(f"📁 Saved {len(new_products)} new CarrefourSA items. Total in file: {len(updated)}")
-    return updated
+# one WebDriver round trip for every card: what the row and the fingerprint need.
+# Price texts are joined like BeautifulSoup's get_text(strip=True).
+_READ_CARDS = """
+const text = el => {
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    let out = "";
+    while (walker.nextNode()) out += walker.currentNode.nodeValue.trim();
+    return out;
+};
+return Array.from(document.getElementsByClassName("hover-box")).map(card => {
+    const name = card.querySelector(".item-name"), link = card.querySelector("a"),
+          img = card.querySelector("img"), original = card.querySelector(".priceLineThrough"),
+          price = card.querySelector(".item-price");
+    return {name: name ? name.innerText.trim() : null, url: link ? link.href : null,
+            image_url: img ? img.src : null,
+            original_price: original ? text(original) || null : null,
+            price: price ? text(price) || null : null,
+            html: name && link && img ? null : card.outerHTML};
+});
+"""
+
+def read_cards(driver):
+    """Every card on the page in one DOM read, with its fingerprint id / sig."""
+    cards = driver.execute_script(_READ_CARDS)
+    for card in cards:
+        card["id"] = card["url"] or card["name"] or ""
+        card["sig"] = f"{card['name']}|{card['original_price']}|{card['price']}"
+    return cards
+
+def scrape_category(driver, category, listings=None):
+    """Raw rows of one category page; with a ListingCache only the cards
+    that changed since the last run are rebuilt."""
+    listings = listings or ListingCache(STORE_NAME, max_age_hours=0)
+    replay = recorder.mode() == "replay"
+    if replay:
+        driver.get(recorder.page_file(STORE_NAME, category).as_uri())
+    else:
+        with metrics.timer("navigation", store=STORE_NAME), governor.slot_sync(category):
+            driver.get(category)
+
+    plan = listings.plan(category)
+    if not replay:
+        with metrics.timer("scroll", store=STORE_NAME):
+            scroll_to_bottom(driver)
+            time.sleep(2)
+        if recorder.mode() == "record":
+            recorder.save_page(STORE_NAME, category, driver.page_source)
+
+    cards = read_cards(driver)
+    print(f"📦 Found {len(cards)} discounted products")
+    metrics.inc("cards_seen", len(cards), store=STORE_NAME)
+    category_products, rows_by_id = [], {}
+
+    for card in cards:
+        card_started = time.perf_counter()
+        try:
+            if plan.known(card):
+                metrics.inc("cards_reused", store=STORE_NAME)
+                row = plan.row(card)
+            elif card["html"] is not None:
+                raise ValueError("card without name, link or image")
+            elif card["original_price"] and card["price"]:
+                row = {key: card[key] for key in ("name", "url", "image_url", "original_price", "price")}
+                metrics.inc("cards_parsed", store=STORE_NAME)
+                print(f"🧾 {row['name']} | {row['original_price']} → {row['price']}")
+            else:
+                row = None
+                metrics.inc("cards_skipped", store=STORE_NAME)
+            rows_by_id[card["id"]] = row
+            if row:
+                category_products.append(row)
+        except Exception as e:
+            metrics.inc("cards_failed", store=STORE_NAME)
+            if debug_capture.should_sample(STORE_NAME, "parse_error"):
+                debug_capture.record(STORE_NAME, "parse_error", card.get("html") or "",
+                                     error=str(e), listing=category)
+            continue
+        finally:
+            metrics.observe("stage_seconds", time.perf_counter() - card_started,
+                            stage="card_extract", store=STORE_NAME)
+
+    listings.save(category, cards, rows_by_id)
+    return category_products
+
+class CarrefourSAAdapter(StoreAdapter):
+    """Selenium in a worker thread; each category URL is a work unit.
+
+    Items keep CarrefourSA's own image URLs (no local copies)."""
+
+    name = STORE_NAME
+
+    def __init__(self, categories=None):
+        self.categories = list(categories or CATEGORIES)
+        self.listings = ListingCache(STORE_NAME)
+        self.driver = None              # created on the first unit, in the worker thread
+
+    async def close(self):
+        if self.driver is not None:
+            await asyncio.to_thread(self.driver.quit)
+            self.driver = None
+
+    async def discover(self):
+        return [WorkUnit(category) for category in self.categories]
+
+    async def extract(self, unit):
+        print(f"🔎 Scanning category: {unit.key}")
+        return UnitResult(await asyncio.to_thread(self._scrape, unit.key))
+
+    def _scrape(self, category):
+        if self.driver is None:
+            self.driver = new_driver()
+            profiling.label(STORE_NAME, pid=self.driver.service.process.pid)
+        return scrape_category(self.driver, category, self.listings)
 
 def run_scraper():
-    all_products = []
-
-    for category in CATEGORIES:
-        print(f"🔎 Scanning category: {category}")
-        driver.get(category)
-        scroll_to_bottom()
-        time.sleep(2)
-
-        products = driver.find_elements(By.CLASS_NAME, "hover-box")
-        print(f"📦 Found {len(products)} discounted products")
-
-        for product in products:
-            try:
-                name = product.find_element(By.CLASS_NAME, "item-name").text.strip()
-                url = product.find_element(By.TAG_NAME, "a").get_attribute("href")
-                img = product.find_element(By.TAG_NAME, "img").get_attribute("src")
-
-                html = product.get_attribute("outerHTML")
-                original_price, discounted_price = extract_price_from_outerhtml(html)
-
-                try:
-                    op = float(original_price)
-                    dp = float(discounted_price)
-                    discount = round(((op - dp) / op) * 100)
-                except:
-                    discount = None
-
-                if discount:
-                    all_products.append({
-                        "name": name,
-                        "url": url,
-                        "image": img,
-                        "store": STORE_NAME,
-                        "source": STORE_NAME,
-                        "category": "Market",
-                        "original_price": original_price,
-                        "price": discounted_price,
-                        "discountPercentage": discount
-                    })
-
-                    print(f"🧾 {name} | {original_price} → {discounted_price} | %{discount}")
-            except Exception as e:
-                continue
-
-    print(f"\n📝 Merging {len(all_products)} items and posting to backend...")
-    updated = merge_and_save(all_products)
-
-    try:
-        res = requests.post(API_URL, json=updated, timeout=60)
-        if res.status_code == 200:
-            print("✅ Successfully posted merged data to backend")
-        else:
-            print(f"❌ Failed to post to backend: {res.status_code}")
-    except Exception as e:
-        print("❌ Error posting to backend:", e)
-
-    return updated
+    return asyncio.run(run_store(CarrefourSAAdapter()))
 
 if __name__ == "__main__":
-    run_scraper()
-    driver.quit()
+    import sys
+    from cli import main
+    sys.exit(main(["run", "--store", "carrefoursa", *sys.argv[1:]]))
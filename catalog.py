@@ -0,0 +1,182 @@
+"""
+catalog.py  –  read-side indexes over the local feed shards (feeds.py).
+
+    source  = CatalogSource("feeds")
+    catalog = source.current()                  # rebuilt only after a new save
+    total, items = catalog.query(q="sut", store="Migros", max_price=50, page=1)
+    items = catalog.top(store="A101", category="Market", limit=20)
+
+A Catalog is built once per feed version and never changes afterwards, so
+its indexes and its query cache need no invalidation of their own: when a
+run commits (sinks.save_local rewrites a shard and then index.json), the
+next current() sees the new index.json and builds a fresh Catalog,
+dropping the old one with its cache.
+
+Indexes: items by discount for every store / category / store+category,
+items by price (for ranges), and name tokens → items for full-text search.
+Names and queries are normalised the Turkish way ("İ" → "i", "I" → "ı")
+and then folded to ASCII, so "SÜT", "süt" and "sut" all match.
+"""
+import bisect, hashlib, json, logging, re, threading
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+import feeds
+from pricing import parse_price
+
+QUERY_CACHE = 512               # cached query results per catalog version
+
+_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Turkish-aware lower case folded to ASCII: "IŞIKLI Süt" → "isikli sut"."""
+    return text.replace("İ", "i").replace("I", "ı").lower().translate(_FOLD)
+
+
+def tokens(text: str) -> list[str]:
+    return _TOKEN.findall(normalize_text(text))
+
+
+def _key(value: str | None) -> str | None:
+    return normalize_text(value).strip() if value else None
+
+
+class Catalog:
+    """Immutable snapshot of every shard plus its indexes."""
+
+    def __init__(self, items: list[dict], version: str = ""):
+        self.items = items
+        self.version = version
+        self.price = [parse_price(i.get("price")) or 0.0 for i in items]
+        self.discount = [int(i.get("discountPercentage") or 0) for i in items]
+        self.stores: dict[str, dict] = {}               # key → {"store", "items", "categories"}
+
+        self._store_of = [_key(i.get("store")) for i in items]
+        self._category_of = [_key(i.get("category")) for i in items]
+        self._top: dict[tuple, list[int]] = defaultdict(list)
+        for n in sorted(range(len(items)), key=lambda n: (-self.discount[n], self.price[n])):
+            s, c = self._store_of[n], self._category_of[n]
+            for combo in ((None, None), (s, None), (None, c), (s, c)):
+                self._top[combo].append(n)
+            store, category = items[n].get("store") or "", items[n].get("category") or ""
+            entry = self.stores.setdefault(s, {"store": store, "items": 0, "categories": {}})
+            entry["items"] += 1
+            entry["categories"][category] = entry["categories"].get(category, 0) + 1
+
+        self._by_price = sorted(range(len(items)), key=lambda n: self.price[n])
+        self._prices = [self.price[n] for n in self._by_price]
+
+        postings = defaultdict(set)
+        for n, item in enumerate(items):
+            for token in tokens(item.get("name") or item.get("title") or ""):
+                postings[token].add(n)
+        self._postings = dict(postings)
+        self._vocabulary = sorted(postings)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory: Path | str) -> "Catalog":
+        index = feeds.read_index(directory)
+        version = hashlib.sha1(json.dumps(
+            sorted((k, v.get("sha256")) for k, v in index.get("stores", {}).items())).encode()).hexdigest()[:16]
+        items = [item for shard in feeds.shards(directory)
+                 for item in feeds.read_shard(directory, shard.stem)]
+        return cls(items, version)
+
+    # ---- search --------------------------------------------------------- #
+    def _matching(self, q: str) -> set[int] | None:
+        """Items whose name has every query word (as a word prefix)."""
+        words = tokens(q)
+        if not words:
+            return None
+        found = None
+        for word in words:
+            start = bisect.bisect_left(self._vocabulary, word)
+            hits = set()
+            for token in self._vocabulary[start:]:
+                if not token.startswith(word):
+                    break
+                hits |= self._postings[token]
+            found = hits if found is None else found & hits
+            if not found:
+                return set()
+        return found
+
+    def query(self, q: str = "", store: str | None = None, category: str | None = None,
+              min_price: float | None = None, max_price: float | None = None,
+              min_discount: int | None = None, sort: str = "discount",
+              page: int = 1, per_page: int = 50) -> tuple[int, list[dict]]:
+        """Returns (total matches, the requested page of items)."""
+        key = (q, _key(store), _key(category), min_price, max_price, min_discount, sort, page, per_page)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = self._query(*key)
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > QUERY_CACHE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _query(self, q, store, category, min_price, max_price, min_discount, sort, page, per_page):
+        matching = self._matching(q)
+        if sort == "discount":
+            ordered = self._top.get((store, category), [])
+            store = category = None                     # already applied by the index
+        else:
+            lo = 0 if min_price is None else bisect.bisect_left(self._prices, min_price)
+            hi = len(self._prices) if max_price is None else bisect.bisect_right(self._prices, max_price)
+            ordered = self._by_price[lo:hi]
+            if sort == "-price":
+                ordered = ordered[::-1]
+            min_price = max_price = None                # already applied by the range
+
+        hits = [n for n in ordered
+                if (matching is None or n in matching)
+                and (store is None or self._store_of[n] == store)
+                and (category is None or self._category_of[n] == category)
+                and (min_price is None or self.price[n] >= min_price)
+                and (max_price is None or self.price[n] <= max_price)
+                and (min_discount is None or self.discount[n] >= min_discount)]
+        start = (page - 1) * per_page
+        return len(hits), [self.items[n] for n in hits[start:start + per_page]]
+
+    def top(self, store: str | None = None, category: str | None = None, limit: int = 20) -> list[dict]:
+        """The biggest discounts, straight from the precomputed index."""
+        return [self.items[n] for n in self._top.get((_key(store), _key(category)), [])[:limit]]
+
+
+class CatalogSource:
+    """Hands out the Catalog for the current feed version.
+
+    Every call stats index.json; a changed file (a run committed) means a
+    rebuild on the next call, everything else is served from memory."""
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self._catalog: Catalog | None = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _current_stamp(self):
+        try:
+            st = (self.directory / feeds.INDEX_FILE).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def current(self) -> Catalog:
+        stamp = self._current_stamp()
+        if self._catalog is not None and stamp == self._stamp:
+            return self._catalog
+        with self._lock:
+            if self._catalog is None or stamp != self._stamp:
+                self._catalog = Catalog.load(self.directory)
+                self._stamp = stamp
+                logging.info(f"📚  Catalog {self._catalog.version}: {len(self._catalog.items)} items "
+                             f"from {self.directory}")
+        return self._catalog
@@ -0,0 +1,102 @@
+"""
+checkpoint.py  –  per-store run checkpoints so an interrupted scrape resumes
+where it stopped instead of starting from page 1 / category 1.
+
+A checkpoint records which work units (pages, categories, listing URLs) are
+finished, the products collected so far and how many of them were already
+posted to the backend.  It is removed once a run finishes cleanly.
+"""
+import json, logging, os, time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import fileio
+
+CHECKPOINT_DIR = Path(os.getenv("CHECKPOINT_DIR", ".checkpoints"))
+MAX_AGE_HOURS  = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "12"))   # older ones are stale prices
+
+
+@dataclass
+class Checkpoint:
+    store: str
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    done: list[str] = field(default_factory=list)     # finished unit keys
+    cursor: dict = field(default_factory=dict)        # store specific cursor
+    items: list[dict] = field(default_factory=list)   # products collected so far
+    posted: int = 0                                   # items[:posted] are on every target
+    posted_to: dict = field(default_factory=dict)     # target → items[:n] it has
+
+    def is_done(self, key: str) -> bool:
+        return key in self.done
+
+    def scraped(self) -> bool:
+        """Every unit finished; only posting can be left."""
+        return bool(self.done) and not self.cursor.get("pending")
+
+    def sent(self, targets: list[str]) -> dict[str, int]:
+        """target → how many items it already has."""
+        return {t: self.posted_to.get(t, self.posted) for t in targets}
+
+    def unposted(self, targets: list[str] | None = None) -> list[dict]:
+        """Items some target (of `targets`, default all recorded) is still missing."""
+        sent = self.sent(targets) if targets is not None else self.posted_to
+        return self.items[min(sent.values(), default=self.posted):]
+
+
+class CheckpointStore:
+    """JSON file per store under CHECKPOINT_DIR."""
+
+    def __init__(self, directory: Path | str = CHECKPOINT_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, store: str) -> Path:
+        safe = "".join(c if c.isalnum() else "_" for c in store.lower())
+        return self.directory / f"{safe}.json"
+
+    def load(self, store: str) -> Checkpoint:
+        """Returns the stored checkpoint, or a fresh one if there is none."""
+        path = self._path(store)
+        try:
+            data = json.loads(path.read_text("utf-8"))
+            cp = Checkpoint(**data)
+            # judged by when the scrape began: posting retries save the file
+            # again, but never make its prices any fresher
+            if time.time() - cp.started_at > MAX_AGE_HOURS * 3600:
+                logging.info(f"⌛  Checkpoint for {store} is older than {MAX_AGE_HOURS:g}h – starting fresh")
+                return Checkpoint(store=store)
+            logging.info(f"♻️  Resuming {store}: {len(cp.done)} units done, "
+                         f"{len(cp.items)} items restored")
+            return cp
+        except FileNotFoundError:
+            return Checkpoint(store=store)
+        except (json.JSONDecodeError, TypeError) as e:
+            logging.warning(f"⚠️  Checkpoint for {store} unreadable ({e}) – starting fresh")
+            return Checkpoint(store=store)
+
+    def save(self, cp: Checkpoint) -> None:
+        cp.updated_at = time.time()
+        fileio.atomic_write(self._path(cp.store), json.dumps(asdict(cp), ensure_ascii=False))
+
+    def complete_unit(self, cp: Checkpoint, key: str, items: list[dict],
+                      **cursor) -> None:
+        """Marks one unit finished, appends its items and persists."""
+        if key not in cp.done:
+            cp.done.append(key)
+            cp.items.extend(items)
+        cp.cursor.update(cursor)
+        self.save(cp)
+
+    def mark_posted(self, cp: Checkpoint, sent: dict[str, int] | None = None) -> None:
+        """All items posted everywhere, or per-target counts from sinks.publish()."""
+        if sent is None:
+            cp.posted_to = dict.fromkeys(cp.posted_to, len(cp.items))
+            cp.posted = len(cp.items)
+        else:
+            cp.posted_to.update({t: min(n, len(cp.items)) for t, n in sent.items()})
+            cp.posted = min(cp.posted_to[t] for t in sent) if sent else cp.posted
+        self.save(cp)
+
+    def clear(self, store: str) -> None:
+        """Called after a run finished cleanly."""
+        self._path(store).unlink(missing_ok=True)
@@ -0,0 +1,216 @@
+"""
+cli.py  –  one entry point for every store.
+
+    python -m bots run --store migros               # from the directory above
+    python cli.py run --store a101 --store sok      # from this directory
+    python cli.py run --all --no-publish
+    python cli.py run --store migros --replay --recordings /tmp/rec
+    python cli.py run --all --workers 4             # in-process work queue
+    python cli.py run --all --profile               # resource timeline + flamegraph (profiling.py)
+    python cli.py list
+    python cli.py serve --port 8001                 # read API over the feeds (api.py)
+
+Distributed runs (distributed.py) share a queue given by --queue / WORK_QUEUE
+(sqlite:///path.db or redis://host:6379/0):
+
+    python cli.py coordinate --all [--wait]         # queue a run (and finish it)
+    python cli.py work                              # on each node, as many as wanted
+    python cli.py finish [--run RUN_ID]             # merge + publish
+    python cli.py status
+
+Only the chosen stores' modules are imported (see stores.py): a Migros run
+never loads Selenium or BeautifulSoup, and `list` loads no browser library
+at all.  Drivers, browsers and output directories are created when a run
+needs them, never on import.
+"""
+import argparse, asyncio, logging, os, sys
+from pathlib import Path
+
+import stores
+
+
+def _store(name: str) -> str:
+    try:
+        return stores.resolve(name)
+    except KeyError as e:
+        raise argparse.ArgumentTypeError(e.args[0])
+
+
+def _add_stores(parser, required=True) -> None:
+    which = parser.add_mutually_exclusive_group(required=required)
+    which.add_argument("--store", type=_store, action="append", help="repeatable")
+    which.add_argument("--all", action="store_true", help="every registered store")
+
+
+def _selected(args) -> list[str]:
+    return stores.names() if args.all else list(dict.fromkeys(args.store or []))
+
+
+def _parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="bots", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--log-level", default="INFO")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="scrape one or more stores")
+    _add_stores(run)
+    run.add_argument("--sequential", action="store_true", help="one store after the other")
+    run.add_argument("--workers", type=int, default=0,
+                     help="run through an in-process work queue with N workers")
+    run.add_argument("--no-publish", action="store_true", help="skip the backend POST")
+    run.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    net = run.add_mutually_exclusive_group()
+    net.add_argument("--record", action="store_true", help="save all traffic (recorder.py)")
+    net.add_argument("--replay", action="store_true", help="serve recorded traffic, no network")
+    run.add_argument("--recordings", type=Path)
+    run.add_argument("--profile", nargs="?", const="sample", default=os.getenv("RUN_PROFILE") or None,
+                     choices=["sample", "cprofile", "pyinstrument", "resources"],
+                     help="profile the run; files go next to run_summary.json (default: sample)")
+
+    sub.add_parser("list", help="show the registered stores")
+
+    serve = sub.add_parser("serve", help="serve the scraped discounts over HTTP (api.py)")
+    serve.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    serve.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8001")))
+    serve.add_argument("--feeds", type=Path, help="shard directory (default: feeds/ next to discounts.json)")
+
+    queue = argparse.ArgumentParser(add_help=False)
+    queue.add_argument("--queue", default=os.getenv("WORK_QUEUE"),
+                       help="sqlite:///path.db or redis://… (default $WORK_QUEUE)")
+    coordinate = sub.add_parser("coordinate", parents=[queue], help="queue a distributed run")
+    _add_stores(coordinate)
+    coordinate.add_argument("--wait", action="store_true", help="wait for the workers, then finish")
+    coordinate.add_argument("--no-publish", action="store_true")
+    work = sub.add_parser("work", parents=[queue], help="lease and run queued units")
+    _add_stores(work, required=False)
+    work.add_argument("--id", help="worker id (default host-pid)")
+    work.add_argument("--visibility", type=float, help="lease seconds (default $WORK_VISIBILITY_SECONDS)")
+    work.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    finish = sub.add_parser("finish", parents=[queue], help="merge and publish a run")
+    finish.add_argument("--run", help="run id (default: the latest run)")
+    finish.add_argument("--no-publish", action="store_true")
+    sub.add_parser("status", parents=[queue], help="unit counts per run and store")
+    return ap
+
+
+async def _run_stores(names: list[str], sequential: bool, **options) -> dict[str, object]:
+    from engine import run_store
+    if sequential:
+        results = {}
+        for name in names:
+            try:
+                results[name] = await run_store(name, **options)
+            except Exception as e:
+                results[name] = e
+        return results
+    outcomes = await asyncio.gather(*(run_store(name, **options) for name in names),
+                                    return_exceptions=True)
+    return dict(zip(names, outcomes))
+
+
+def cmd_run(args) -> int:
+    if args.record or args.replay or args.recordings:
+        import recorder
+        mode = "record" if args.record else "replay" if args.replay else recorder.mode()
+        recorder.set_mode(mode, args.recordings)
+
+    names = _selected(args)
+    if args.workers:
+        from distributed import run_local
+        run = lambda: run_local(names, args.workers, publish=not args.no_publish)
+    else:
+        run = lambda: _run_stores(names, args.sequential, publish=not args.no_publish, resume=not args.fresh)
+    if args.profile:
+        import profiling
+        with profiling.session(None if args.profile == "resources" else args.profile):
+            results = asyncio.run(run())
+    else:
+        results = asyncio.run(run())
+    failed = 0
+    for name, result in results.items():
+        if isinstance(result, BaseException):
+            failed += 1
+            logging.error(f"❌  {name} failed: {result}")
+        else:
+            logging.info(f"✅  {name}: {len(result)} items")
+    return 1 if failed else 0
+
+
+def cmd_list(args) -> int:
+    for name, target in stores.ADAPTERS.items():
+        print(f"{name:<12} {target}")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    from api import serve
+    serve(args.host, args.port, args.feeds)
+    return 0
+
+
+def _queue(args):
+    from workqueue import open_queue
+    if not args.queue or args.queue == "memory":
+        raise SystemExit("distributed commands need --queue sqlite:///… or redis://… (or $WORK_QUEUE)")
+    return open_queue(args.queue)
+
+
+def cmd_coordinate(args) -> int:
+    import distributed
+    queue = _queue(args)
+
+    async def go():
+        run_id = await distributed.coordinate(queue, _selected(args))
+        print(run_id)
+        if args.wait:
+            await distributed.wait_for(queue, run_id)
+            await distributed.finish(queue, run_id, publish=not args.no_publish)
+    asyncio.run(go())
+    return 0
+
+
+def cmd_work(args) -> int:
+    from distributed import Worker
+    from metrics import metrics
+    from workqueue import VISIBILITY
+    worker = Worker(_queue(args), args.id, _selected(args) or None,
+                    visibility=args.visibility or VISIBILITY, drain=not args.forever)
+    try:
+        asyncio.run(worker.run())
+    finally:
+        metrics.write()
+    return 0
+
+
+def cmd_finish(args) -> int:
+    import distributed
+    queue = _queue(args)
+    run_id = args.run or next(reversed(queue.runs(active=False)), None)
+    if run_id is None:
+        raise SystemExit("no runs on the queue")
+    if queue.pending(run_id):
+        raise SystemExit(f"{run_id} still has {queue.pending(run_id)} units pending")
+    results = asyncio.run(distributed.finish(queue, run_id, publish=not args.no_publish))
+    for store, items in results.items():
+        logging.info(f"✅  {run_id} {store}: {len(items)} items")
+    return 0
+
+
+def cmd_status(args) -> int:
+    queue = _queue(args)
+    for run_id in queue.runs(active=False)[-5:]:
+        for store, counts in queue.stats(run_id).items():
+            print(f"{run_id}  {store:<12} " + "  ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s: %(message)s")
+    commands = {"run": cmd_run, "list": cmd_list, "serve": cmd_serve, "coordinate": cmd_coordinate,
+                "work": cmd_work, "finish": cmd_finish, "status": cmd_status}
+    return commands[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
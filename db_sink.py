@@ -0,0 +1,111 @@
+"""
+db_sink.py  –  writes finished items straight into the backend's database,
+for deployments where the scrapers and the backend share one.
+
+    DATABASE_URL=postgresql+asyncpg://user:pw@db/discounts PUBLISH_TO=db python cli.py run --all
+    DATABASE_URL=sqlite+aiosqlite:///discounts.db          PUBLISH_TO=http,db …
+
+    written = await write_items(items, "Migros")
+
+One store's batch is one transaction of bulk INSERT … ON CONFLICT (store,
+url) DO UPDATE statements, so a product's row is refreshed in place and a
+failed batch leaves the table as it was.  The upsert is built for the
+engine's dialect (PostgreSQL and SQLite; both support ON CONFLICT).  The
+table is created if it does not exist.  HTTP posting (sinks.post_items)
+stays the default; sinks.publish() picks the targets from PUBLISH_TO.
+"""
+import logging, os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import (Column, DateTime, Integer, MetaData, Numeric, String, Table,
+                        UniqueConstraint)
+from sqlalchemy.ext.asyncio import create_async_engine
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///discounts.db")
+BATCH_SIZE   = int(os.getenv("DB_BATCH_SIZE", "500"))
+
+metadata = MetaData()
+discounts = Table(
+    "discounts", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("store", String(64), nullable=False),
+    Column("url", String(1024), nullable=False),
+    Column("name", String(512), nullable=False),
+    Column("image", String(1024)),
+    Column("source", String(64)),
+    Column("category", String(128)),
+    Column("store_logo", String(256)),
+    Column("original_price", Numeric(12, 2)),
+    Column("price", Numeric(12, 2)),
+    Column("discount_percentage", Integer),
+    Column("scraped_at", DateTime),
+    Column("updated_at", DateTime),
+    UniqueConstraint("store", "url", name="discounts_store_url"),
+)
+
+def _decimal(value) -> Decimal | None:
+    try:
+        return Decimal(str(value)) if value not in (None, "") else None
+    except InvalidOperation:
+        return None
+
+
+def _row(item: dict, now: datetime) -> dict:
+    try:
+        scraped = datetime.fromisoformat(item.get("timestamp") or "")
+    except ValueError:
+        scraped = now
+    return {
+        "store"              : item["store"],
+        "url"                : item.get("url") or item["name"],
+        "name"               : item["name"],
+        "image"              : item.get("image"),
+        "source"             : item.get("source"),
+        "category"           : item.get("category"),
+        "store_logo"         : item.get("store_logo"),
+        "original_price"     : _decimal(item.get("original_price")),
+        "price"              : _decimal(item.get("price")),
+        "discount_percentage": item.get("discountPercentage"),
+        "scraped_at"         : scraped,
+        "updated_at"         : now,
+    }
+
+
+def _upsert(dialect: str, rows: list[dict]):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"no ON CONFLICT upsert for {dialect} – use PostgreSQL or SQLite")
+    stmt = insert(discounts).values(rows)
+    updated = {c.name: stmt.excluded[c.name] for c in discounts.columns
+               if c.name not in ("id", "store", "url")}
+    return stmt.on_conflict_do_update(index_elements=["store", "url"], set_=updated)
+
+
+async def write_items(items: list[dict], store: str, url: str | None = None,
+                      batch_size: int = BATCH_SIZE) -> int:
+    """Upserts the items in one transaction; returns how many were written
+    (all of them, or 0 when the transaction failed)."""
+    if not items:
+        return 0
+    now = datetime.now()
+    # ON CONFLICT may not touch one row twice in a statement: last one wins
+    rows = list({(r["store"], r["url"]): r for r in (_row(i, now) for i in items)}.values())
+    # an engine per call: runs are asyncio.run() apart and pools are bound to their loop
+    engine = create_async_engine(url or DATABASE_URL)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            for start in range(0, len(rows), batch_size):
+                await conn.execute(_upsert(engine.dialect.name, rows[start:start + batch_size]))
+    except Exception as e:
+        logging.warning(f"❌  DB write of {store} items failed: {e}")
+        return 0
+    finally:
+        await engine.dispose()
+    logging.info(f"🗄️  Upserted {len(rows)} {store} items into {engine.url.render_as_string(hide_password=True)}")
+    return len(items)
+
@@ -0,0 +1,124 @@
+"""
+debug_capture.py  –  sampled, non-blocking debug artifacts for the bots.
+
+Failing cards go into a bounded ring buffer per store (newest RING_SIZE kept,
+with a reason code); nothing touches the disk on the hot path.  Rings are
+written to DEBUG_DIR/<store>/cards.jsonl off the event loop when the run
+closes the capture.  Page dumps and screenshots are written by background
+tasks, screenshots only on demand or for DEBUG_SCREENSHOT_RATE of captures.
+
+    await debug_capture.card("A101", "missing_image", element)
+    await debug_capture.page("A101", "empty_listing", page)
+    await debug_capture.close()
+"""
+import asyncio, json, logging, os, random, time
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+
+import fileio
+from metrics import metrics
+
+DEBUG_DIR        = Path(os.getenv("DEBUG_DIR", "debug"))
+RING_SIZE        = int(os.getenv("DEBUG_RING_SIZE", "50"))
+CARD_SAMPLE_RATE = float(os.getenv("DEBUG_SAMPLE_RATE", "1.0"))    # share of failing cards kept
+SCREENSHOT_RATE  = float(os.getenv("DEBUG_SCREENSHOT_RATE", "0"))  # 0 = on demand only
+MAX_PAGE_DUMPS   = int(os.getenv("DEBUG_MAX_PAGE_DUMPS", "10"))     # per store
+
+
+def _slug(text: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in text.lower())
+
+
+class DebugCapture:
+    def __init__(self, directory: Path | str = DEBUG_DIR, ring_size: int = RING_SIZE,
+                 sample_rate: float = CARD_SAMPLE_RATE, screenshot_rate: float = SCREENSHOT_RATE):
+        self.directory       = Path(directory)
+        self.sample_rate     = sample_rate
+        self.screenshot_rate = screenshot_rate
+        self.rings: dict[str, deque] = defaultdict(lambda: deque(maxlen=ring_size))
+        self.counts: Counter = Counter()
+        self._tasks: set[asyncio.Task] = set()
+
+    # ------------------------------------------------------------------ #
+    #  Cards (ring buffer)
+    # ------------------------------------------------------------------ #
+    def should_sample(self, store: str, reason: str) -> bool:
+        self.counts[(store, reason)] += 1
+        metrics.inc("debug_events", store=store, reason=reason)
+        return random.random() < self.sample_rate
+
+    def record(self, store: str, reason: str, html: str, **context) -> None:
+        """Appends an already-fetched card snapshot to the store's ring."""
+        self.rings[store].append({
+            "ts"    : datetime.now().isoformat(timespec="seconds"),
+            "reason": reason,
+            "html"  : html,
+            **context,
+        })
+
+    async def card(self, store: str, reason: str, element, **context) -> None:
+        """Samples, then fetches the element's HTML (one round trip) into the ring."""
+        if not self.should_sample(store, reason):
+            return
+        try:
+            html = await element.inner_html()
+        except Exception as e:
+            html = f"<!-- inner_html failed: {e} -->"
+        self.record(store, reason, html, **context)
+
+    # ------------------------------------------------------------------ #
+    #  Pages (background writes)
+    # ------------------------------------------------------------------ #
+    async def page(self, store: str, reason: str, page, screenshot: bool = False) -> None:
+        """Dumps page HTML (and optionally a screenshot) without blocking the loop."""
+        if not self.should_sample(store, reason):
+            return
+        stem = f"{datetime.now():%Y%m%d-%H%M%S}-{_slug(reason)}"
+        target = self.directory / _slug(store)
+        try:
+            html = await page.content()
+            self._spawn(self._write(target / f"{stem}.html", html.encode("utf-8")))
+            if screenshot or random.random() < self.screenshot_rate:
+                png = await page.screenshot(full_page=True)
+                self._spawn(self._write(target / f"{stem}.png", png))
+        except Exception as e:
+            logging.warning(f"🧪  Debug capture failed for {store}/{reason}: {e}")
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, path: Path, data: bytes) -> None:
+        await asyncio.to_thread(self._write_sync, path, data)
+
+    @staticmethod
+    def _write_sync(path: Path, data: bytes) -> None:
+        fileio.atomic_write(path, data)
+        dumps = sorted(p for p in path.parent.iterdir() if p.suffix in (".html", ".png"))
+        for old in dumps[:-2 * MAX_PAGE_DUMPS]:
+            old.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------ #
+    #  Flush
+    # ------------------------------------------------------------------ #
+    def flush_sync(self) -> None:
+        for store, ring in self.rings.items():
+            if not ring:
+                continue
+            fileio.atomic_write(self.directory / _slug(store) / "cards.jsonl",
+                                "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in ring))
+        for (store, reason), n in sorted(self.counts.items()):
+            logging.info(f"🧪  {store}: {n} × {reason}")
+
+    async def close(self) -> None:
+        """Waits for background writes and writes the rings."""
+        started = time.perf_counter()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self.flush_sync)
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage="debug_flush")
+
+
+debug_capture = DebugCapture()
@@ -0,0 +1,166 @@
+"""
+distributed.py  –  sharded runs over a work queue (workqueue.py).
+
+    python cli.py coordinate --all --queue sqlite:///queue.db    # queue a run
+    python cli.py work --queue sqlite:///queue.db                # on every node
+    python cli.py finish --queue sqlite:///queue.db              # merge + publish
+    python cli.py run --all --workers 4                          # all in-process
+
+The coordinator runs each adapter's discover() (no browser needed) and
+queues the units: A101 listings, CarrefourSA categories, Migros page ranges,
+Şok category × store-id pages.  Workers lease units, run them through the
+same engine.process_unit() a local run uses and hand the items back;
+follow-up units (the next page) go back into the queue.  finish merges every
+store's results (deduplicated by URL, so re-run units never double up),
+writes discounts.json and posts what the backend has not had for this run.
+
+Worker processes on one host need separate BROWSER_PROFILE_DIRs.
+"""
+import asyncio, logging, os, socket, time
+from contextlib import AsyncExitStack
+from dataclasses import asdict
+
+import sinks
+import stores
+import validation
+from debug_capture import debug_capture
+from engine import StoreAdapter, WorkUnit, process_unit
+from images import ImageFetcher
+from metrics import metrics
+from workqueue import VISIBILITY, Lease, SQLiteQueue, WorkQueue, new_run_id
+
+POLL_SECONDS = 2.0
+
+
+async def coordinate(queue: WorkQueue, names: list[str], run_id: str | None = None) -> str:
+    """Queues every unit the stores' discover() returns; returns the run id."""
+    run_id = run_id or new_run_id()
+    for name in names:
+        adapter = stores.load_adapter(name)
+        with metrics.timer("discover", store=adapter.name):
+            units = await adapter.discover()
+        added = await asyncio.to_thread(queue.enqueue, run_id, adapter.name, [asdict(u) for u in units])
+        logging.info(f"📬  {run_id}: {added} {adapter.name} units queued")
+    return run_id
+
+
+class Worker:
+    """Leases units until the queue is drained (or forever with drain=False).
+
+    Adapters are opened on the first unit of their store and kept open, so a
+    browser is launched once per worker and store."""
+
+    def __init__(self, queue: WorkQueue, worker_id: str | None = None,
+                 stores_filter: list[str] | None = None, visibility: float = VISIBILITY,
+                 drain: bool = True, poll: float = POLL_SECONDS):
+        self.queue      = queue
+        self.id         = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.stores     = stores_filter
+        self.visibility = visibility
+        self.drain      = drain
+        self.poll       = poll
+        self._open: dict[str, tuple[StoreAdapter, ImageFetcher | None]] = {}
+        self._stack = AsyncExitStack()
+
+    async def run(self) -> int:
+        """Returns the number of units this worker completed."""
+        done = 0
+        async with self._stack:
+            while True:
+                lease = await asyncio.to_thread(self.queue.lease, self.id, self.stores, self.visibility)
+                if lease is None:
+                    if self.drain and not await asyncio.to_thread(self.queue.runs):
+                        break
+                    await asyncio.sleep(self.poll)
+                    continue
+                done += await self.handle(lease)
+        for store in self._open:
+            validation.report(store)
+        logging.info(f"👷  {self.id}: {done} units done")
+        return done
+
+    async def _adapter(self, store: str):
+        if store not in self._open:
+            adapter = stores.load_adapter(store)
+            await self._stack.enter_async_context(adapter)
+            images = None
+            if adapter.image_subdir:
+                images = await self._stack.enter_async_context(ImageFetcher(adapter.name, adapter.image_subdir))
+            self._open[store] = (adapter, images)
+        return self._open[store]
+
+    async def _heartbeat(self, lease: Lease) -> None:
+        while True:
+            await asyncio.sleep(self.visibility / 3)
+            if not await asyncio.to_thread(self.queue.extend, lease, self.visibility):
+                logging.warning(f"⌛  {self.id}: lease on {lease.store} {lease.key} lost")
+                return
+
+    async def handle(self, lease: Lease) -> int:
+        heartbeat = asyncio.create_task(self._heartbeat(lease))
+        try:
+            adapter, images = await self._adapter(lease.store)
+            result = await process_unit(adapter, images, WorkUnit(**lease.unit))
+        except Exception as e:
+            metrics.inc("units_failed", store=lease.store)
+            logging.warning(f"❌  {self.id}: {lease.store} {lease.key} failed (attempt {lease.attempts}): {e}")
+            await asyncio.to_thread(self.queue.fail, lease, str(e))
+            return 0
+        finally:
+            heartbeat.cancel()
+        valid = await asyncio.to_thread(self.queue.complete, lease, result.rows,
+                                        [asdict(u) for u in result.follow_up])
+        metrics.inc("units_done", store=lease.store)
+        logging.info(f"✅  {self.id}: {lease.store} {lease.key}: {len(result.rows)} items"
+                     + ("" if valid else " (lease had expired, result kept)"))
+        return 1
+
+
+async def finish(queue: WorkQueue, run_id: str, publish: bool = True) -> dict[str, list[dict]]:
+    """Merges each store's results into discounts.json and posts the rest.
+
+    Safe to repeat: results are replaced per unit and every target is only
+    sent the items past its own posted count."""
+    results = {}
+    stats = await asyncio.to_thread(queue.stats, run_id)
+    for store in await asyncio.to_thread(queue.stores, run_id):
+        if stats.get(store, {}).get("dead"):
+            logging.warning(f"⚠️  {run_id}: {stats[store]['dead']} {store} units gave up")
+        items = await asyncio.to_thread(queue.results, run_id, store)
+        results[store] = items
+        if not items:
+            logging.warning(f"⚠️  No {store} discounts in {run_id} – discounts.json left as is.")
+            continue
+        with metrics.timer("json_merge", store=store):
+            await asyncio.to_thread(sinks.save_local, store, items)
+        if publish:
+            posted = {t: await asyncio.to_thread(queue.posted, run_id, store, t) for t in sinks.PUBLISH_TO}
+            if min(posted.values(), default=len(items)) < len(items):
+                with metrics.timer("backend_post", store=store):
+                    sent = await sinks.publish(items, store, posted)
+                for target, count in sent.items():
+                    if count != posted[target]:
+                        await asyncio.to_thread(queue.mark_posted, run_id, store, count, target)
+    return results
+
+
+async def wait_for(queue: WorkQueue, run_id: str, poll: float = POLL_SECONDS) -> None:
+    while await asyncio.to_thread(queue.pending, run_id):
+        await asyncio.sleep(poll)
+
+
+async def run_local(names: list[str], workers: int = 2, publish: bool = True) -> dict[str, list[dict]]:
+    """The in-process fallback: private in-memory queue, `workers` workers."""
+    queue = SQLiteQueue(":memory:")
+    metrics.serve_from_env()
+    started = time.perf_counter()
+    try:
+        run_id = await coordinate(queue, names)
+        await asyncio.gather(*(Worker(queue, f"local-{n}", poll=0.2).run() for n in range(workers)))
+        results = await finish(queue, run_id, publish=publish)
+        logging.info(f"🏁  {run_id}: {sum(map(len, results.values()))} items "
+                     f"in {time.perf_counter() - started:.1f}s with {workers} workers")
+        return results
+    finally:
+        await debug_capture.close()
+        metrics.write()
@@ -0,0 +1,237 @@
+"""
+engine.py  –  the shared store runner.
+
+A store adapter only knows its site: which work units exist (listing URLs,
+API pages, categories) and how to turn one unit into raw product rows.  The
+engine does the rest the same way for every store:
+
+    discover → extract (adapter.concurrency units at a time) → normalise
+    prices / discount → validate → images → checkpoint → discounts.json → backend
+
+    items = await run_store("migros")
+
+Raw rows need "name", "url", "original_price" and "price" (any format
+pricing.parse_price understands) and may carry "image_url" / "category".
+Rows without a real discount are dropped, implausible ones quarantined
+(validation.py).  A unit may return follow-up units (the next page), so
+paginated stores are discovered as they go.
+"""
+import asyncio, hashlib, logging
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+import sinks
+import stores
+import validation
+from checkpoint import Checkpoint, CheckpointStore
+from debug_capture import debug_capture
+from images import ImageFetcher
+from metrics import metrics
+from pricing import calculate_discount, parse_price
+from product_index import product_id
+
+
+@dataclass
+class WorkUnit:
+    key: str                                      # unique per store, kept in the checkpoint
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class UnitResult:
+    rows: list[dict] = field(default_factory=list)
+    follow_up: list[WorkUnit] = field(default_factory=list)
+
+
+class StoreAdapter(ABC):
+    """Base class; subclasses live next to their scraping code (a101_bot.A101Adapter …)."""
+
+    name: str = ""                    # store label written into every item
+    image_subdir: str | None = None   # None = items keep the remote image URL
+    store_logo: str | None = None
+    category: str = "Market"
+    concurrency: int = 1              # units extracted at the same time
+
+    async def open(self) -> None:
+        """Starts browsers / sessions; called once per run."""
+
+    async def close(self) -> None:
+        """Releases whatever open() started, even after a failed run."""
+
+    @abstractmethod
+    async def discover(self) -> list[WorkUnit]:
+        """The run's first work units."""
+
+    @abstractmethod
+    async def extract(self, unit: WorkUnit) -> UnitResult:
+        """Raw rows of one unit (and units it led to); raise to fail it."""
+
+    def image_filename(self, item: dict) -> str:
+        return f"{hashlib.md5((item['name'] + item['image']).encode()).hexdigest()}.jpg"
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+# --------------------------------------------------------------------------- #
+#  Normalisation
+# --------------------------------------------------------------------------- #
+def normalise(adapter: StoreAdapter, row: dict) -> dict | None:
+    """Raw adapter row → the item shape the backend expects, None to drop it."""
+    name = " ".join((row.get("name") or "").split())
+    original, price = parse_price(row.get("original_price")), parse_price(row.get("price"))
+    discount = calculate_discount(original, price)
+    if not name or discount is None:
+        metrics.inc("rows_dropped", store=adapter.name)
+        return None
+    item = {
+        "name"              : name,
+        "url"               : row.get("url") or "",
+        "image"             : row.get("image_url") or "",
+        "store"             : adapter.name,
+        "source"            : adapter.name,
+        "category"          : row.get("category") or adapter.category,
+        "original_price"    : f"{original:.2f}",
+        "price"             : f"{price:.2f}",
+        "discountPercentage": discount,
+        "timestamp"         : datetime.now().isoformat(timespec="seconds"),
+    }
+    if adapter.store_logo:
+        item["store_logo"] = adapter.store_logo
+    return item
+
+
+def item_key(item: dict) -> str:
+    """Identity of an item within one store's run: the product id from its
+    URL (the same product on two listings, or with tracking parameters, is
+    one item), else its name."""
+    return product_id(item.get("url") or "") or item["name"]
+
+
+# --------------------------------------------------------------------------- #
+#  Extraction
+# --------------------------------------------------------------------------- #
+async def process_unit(adapter: StoreAdapter, images: ImageFetcher | None, unit: WorkUnit) -> UnitResult:
+    """extract → normalise → images for one unit (local runs and queue workers)."""
+    with metrics.timer("unit", store=adapter.name):
+        result = await adapter.extract(unit)
+    items = [item for item in (normalise(adapter, row) for row in result.rows) if item]
+    items = await asyncio.to_thread(validation.validate, adapter.name, items)
+    if images is not None:
+        with metrics.timer("images", store=adapter.name):
+            await images.fetch_all(items, adapter.image_filename)
+    return UnitResult(items, result.follow_up)
+
+
+async def collect(adapter: StoreAdapter, checkpoints: CheckpointStore, cp: Checkpoint) -> list[dict]:
+    """Runs every unit not yet in the checkpoint; returns all items of the run.
+
+    Units still queued, in flight or failed are kept as cursor["pending"], so
+    an interrupted run resumes exactly there."""
+    store = adapter.name
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(adapter)
+        images = None
+        if adapter.image_subdir:
+            images = await stack.enter_async_context(ImageFetcher(store, adapter.image_subdir))
+
+        pending = [WorkUnit(**u) for u in cp.cursor.get("pending", [])]
+        if not cp.done and not pending:
+            with metrics.timer("discover", store=store):
+                pending = await adapter.discover()
+        queue = deque(u for u in pending if not cp.is_done(u.key))
+        queued = {u.key for u in queue}
+        seen = {item_key(item) for item in cp.items}        # the same product on two listings
+        running: dict[asyncio.Task, WorkUnit] = {}
+        failed: list[WorkUnit] = []
+
+        def remaining() -> list[dict]:
+            return [asdict(u) for u in (*running.values(), *queue, *failed)]
+
+        try:
+            while queue or running:
+                while queue and len(running) < max(1, adapter.concurrency):
+                    unit = queue.popleft()
+                    running[asyncio.create_task(process_unit(adapter, images, unit))] = unit
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    unit = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        metrics.inc("units_failed", store=store)
+                        logging.warning(f"❌  {store} {unit.key} failed: {e}")
+                        failed.append(unit)
+                        continue
+                    for nxt in result.follow_up:
+                        if nxt.key not in queued and not cp.is_done(nxt.key):
+                            queued.add(nxt.key)
+                            queue.append(nxt)
+                    fresh = [item for item in result.rows if item_key(item) not in seen]
+                    seen.update(item_key(item) for item in fresh)
+                    # serialising every item so far is the slow part: not on the loop
+                    await asyncio.to_thread(checkpoints.complete_unit, cp, unit.key, fresh,
+                                            pending=remaining())
+                    metrics.inc("units_done", store=store)
+                    logging.info(f"✅  {store} {unit.key}: {len(fresh)} items "
+                                 f"({len(cp.items)} so far)")
+        finally:
+            for task in running:
+                task.cancel()
+        if failed:
+            cp.cursor["pending"] = remaining()
+            await asyncio.to_thread(checkpoints.save, cp)
+    return cp.items
+
+
+# --------------------------------------------------------------------------- #
+#  Run
+# --------------------------------------------------------------------------- #
+async def run_store(store: str | StoreAdapter, *, publish: bool = True, resume: bool = True,
+                    checkpoints: CheckpointStore | None = None) -> list[dict]:
+    """Scrapes one store end to end and returns its items."""
+    adapter = stores.load_adapter(store) if isinstance(store, str) else store
+    checkpoints = checkpoints or CheckpointStore()
+    cp = checkpoints.load(adapter.name) if resume else Checkpoint(store=adapter.name)
+    metrics.serve_from_env()
+    logging.info(f"🛒  {adapter.name} started")
+
+    try:
+        if cp.scraped():
+            # the last run finished scraping but not posting: send what it still
+            # owes, then scrape afresh instead of serving its items again
+            if publish and cp.unposted(sinks.PUBLISH_TO):
+                logging.info(f"📮  {adapter.name}: re-sending {len(cp.unposted(sinks.PUBLISH_TO))} "
+                             f"unposted items of the last run")
+                with metrics.timer("backend_post", store=adapter.name):
+                    sent = await sinks.publish(cp.items, adapter.name, cp.sent(sinks.PUBLISH_TO))
+                await asyncio.to_thread(checkpoints.mark_posted, cp, sent)
+            checkpoints.clear(adapter.name)
+            cp = Checkpoint(store=adapter.name)
+
+        with metrics.timer("run", store=adapter.name):
+            items = await collect(adapter, checkpoints, cp)
+            validation.report(adapter.name)
+            if items:
+                with metrics.timer("json_merge", store=adapter.name):
+                    await asyncio.to_thread(sinks.save_local, adapter.name, items)
+            else:
+                logging.warning(f"⚠️  No {adapter.name} discounts scraped – discounts.json left as is.")
+            if publish and cp.unposted(sinks.PUBLISH_TO):
+                with metrics.timer("backend_post", store=adapter.name):
+                    sent = await sinks.publish(cp.items, adapter.name, cp.sent(sinks.PUBLISH_TO))
+                await asyncio.to_thread(checkpoints.mark_posted, cp, sent)
+
+        if not cp.cursor.get("pending") and not (publish and cp.unposted(sinks.PUBLISH_TO)):
+            checkpoints.clear(adapter.name)
+    finally:
+        await debug_capture.close()
+        metrics.write()
+    return items
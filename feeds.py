@@ -0,0 +1,213 @@
+"""
+feeds.py  –  streamed, precompressed JSON feeds for the frontend and backend.
+
+    write_shard("feeds", "Migros", items)          # feeds/migros.ndjson (+ .gz / .br)
+    write_combined("discounts.json", "feeds")      # compact JSON array of every shard
+    for item in read_shard("feeds", "Migros"): ...
+
+Every store lives in its own NDJSON shard (one item per line), so a consumer
+loads only the stores it needs and a merge never parses other stores' rows:
+the combined discounts.json is stitched together line by line from the
+shards, never held in memory as one list.  index.json lists the shards with
+item counts and sha256 digests.
+
+Each file is written to a temp file next to its target and replaced into
+place (fileio.replace) together with its .gz copy (and .br, when the
+brotli package is installed), so a reader never sees half a feed.  A
+shard and its index.json entry are written under the index's file lock,
+so processes saving different stores never drop each other's entries.
+
+FEED_COMPRESSION ("gzip,br" by default, "" for none) picks the copies.
+Shards are rewritten on every save, so their .br uses a fast brotli level
+(FEED_SHARD_BROTLI_QUALITY, 5); the combined feed, the one clients download
+whole, gets the densest (FEED_COMBINED_BROTLI_QUALITY, 11).
+"""
+import gzip, hashlib, json, logging, os, time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import fileio
+
+COMPRESSION = [c.strip() for c in os.getenv("FEED_COMPRESSION", "gzip,br").split(",") if c.strip()]
+INDEX_FILE  = "index.json"
+SHARD_BROTLI_QUALITY    = int(os.getenv("FEED_SHARD_BROTLI_QUALITY", "5"))
+COMBINED_BROTLI_QUALITY = int(os.getenv("FEED_COMBINED_BROTLI_QUALITY", "11"))
+
+_ASCII = str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosuCGIOSU")
+
+
+def shard_name(store: str) -> str:
+    """"Şok" → "sok", "CarrefourSA" → "carrefoursa"."""
+    return "".join(c if c.isalnum() else "_" for c in store.translate(_ASCII).lower())
+
+
+def _dumps(item: dict) -> str:
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class FeedWriter:
+    """Writes `path` and its compressed copies through temp files.
+
+    All of them replace their targets together when the block exits
+    cleanly; on an error the temp files are removed and the old feed stays."""
+
+    def __init__(self, path: Path | str, compression: list[str] = COMPRESSION,
+                 brotli_quality: int = COMBINED_BROTLI_QUALITY):
+        self.path = Path(path)
+        self.compression = compression
+        self.brotli_quality = brotli_quality
+        self.bytes = 0
+        self._sha = hashlib.sha256()
+        self._outputs = []          # (target, tmp, raw file, stream, finish)
+
+    def _open(self, target: Path, stream=None, finish=None):
+        tmp = fileio.temp_path(target)
+        raw = open(tmp, "wb")
+        self._outputs.append((target, tmp, raw, stream(raw) if stream else raw, finish))
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open(self.path)
+        if "gzip" in self.compression:
+            self._open(self.path.with_name(self.path.name + ".gz"),
+                       lambda raw: gzip.GzipFile(filename="", fileobj=raw, mode="wb", mtime=0))
+        brotli = _brotli() if "br" in self.compression else None
+        if brotli:
+            compressor = brotli.Compressor(quality=self.brotli_quality, mode=brotli.MODE_TEXT)
+            self._open(self.path.with_name(self.path.name + ".br"),
+                       lambda raw: _BrotliStream(raw, compressor))
+        elif "br" in self.compression:
+            logging.debug("brotli not installed – no .br feeds")
+        return self
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.bytes += len(data)
+        self._sha.update(data)
+        for _, _, _, stream, _ in self._outputs:
+            stream.write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            for _, _, raw, stream, _ in self._outputs:
+                if stream is not raw:
+                    stream.close()
+                raw.flush()
+                if exc_type is None:
+                    os.fsync(raw.fileno())
+                raw.close()
+        finally:
+            written = set()
+            for target, tmp, *_ in reversed(self._outputs):     # plain file last
+                if exc_type is None:
+                    fileio.replace(tmp, target)
+                    written.add(target.name)
+                else:
+                    tmp.unlink(missing_ok=True)
+        if exc_type is None:
+            # a copy that is no longer produced must not outlive its source
+            for suffix in (".gz", ".br"):
+                stale = self.path.with_name(self.path.name + suffix)
+                if stale.name not in written:
+                    stale.unlink(missing_ok=True)
+        return False
+
+
+class _BrotliStream:
+    def __init__(self, raw, compressor):
+        self.raw, self.compressor = raw, compressor
+
+    def write(self, data: bytes) -> None:
+        self.raw.write(self.compressor.process(data))
+
+    def close(self) -> None:
+        self.raw.write(self.compressor.finish())
+
+
+# --------------------------------------------------------------------------- #
+#  Shards
+# --------------------------------------------------------------------------- #
+def shard_path(directory: Path | str, store: str) -> Path:
+    return Path(directory) / f"{shard_name(store)}.ndjson"
+
+
+def shards(directory: Path | str) -> list[Path]:
+    directory = Path(directory)
+    return sorted(directory.glob("*.ndjson")) if directory.is_dir() else []
+
+
+def write_shard(directory: Path | str, store: str, items: Iterable[dict]) -> dict:
+    """Replaces the store's shard with `items`; returns its index entry."""
+    path = shard_path(directory, store)
+    count = 0
+    with fileio.file_lock(path.parent / INDEX_FILE):
+        with FeedWriter(path, brotli_quality=SHARD_BROTLI_QUALITY) as feed:
+            for item in items:
+                feed.write(_dumps(item) + "\n")
+                count += 1
+        entry = {"store": store, "file": path.name, "items": count, "bytes": feed.bytes,
+                 "sha256": feed.sha256, "updated": time.time()}
+        _update_index(path.parent, shard_name(store), entry)
+    return entry
+
+
+def read_shard(directory: Path | str, store: str) -> Iterator[dict]:
+    """Yields the store's items one at a time (nothing if there is no shard)."""
+    try:
+        with open(shard_path(directory, store), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except FileNotFoundError:
+        return
+
+
+def read_index(directory: Path | str) -> dict:
+    try:
+        return json.loads((Path(directory) / INDEX_FILE).read_text("utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"stores": {}}
+
+
+def _update_index(directory: Path, name: str, entry: dict) -> None:
+    """Read-modify-write of index.json; the caller holds its file lock."""
+    index = read_index(directory)
+    index["stores"][name] = entry
+    index["updated"] = entry["updated"]
+    with FeedWriter(directory / INDEX_FILE, compression=[]) as feed:
+        feed.write(json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+
+
+# --------------------------------------------------------------------------- #
+#  Combined feed
+# --------------------------------------------------------------------------- #
+def write_combined(path: Path | str, directory: Path | str, stores: Iterable[str] | None = None) -> int:
+    """Writes the shards (all, or only `stores`) as one compact JSON array,
+    one item per line; returns the item count.  Lines are copied, not parsed."""
+    wanted = None if stores is None else {shard_name(s) for s in stores}
+    count = 0
+    with FeedWriter(path) as feed:
+        feed.write("[")
+        for shard in shards(directory):
+            if wanted is not None and shard.stem not in wanted:
+                continue
+            with open(shard, encoding="utf-8") as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    if line:
+                        feed.write(("\n" if count == 0 else ",\n") + line)
+                        count += 1
+        feed.write("\n]\n")
+    return count
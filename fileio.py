@@ -0,0 +1,110 @@
+"""
+fileio.py  –  crash- and concurrency-safe local writes, shared by every
+module that writes a file something else reads.
+
+    atomic_write("discounts.json", text)            # temp + fsync + rename
+    with file_lock("discounts.json"):               # other processes wait
+        ...read, merge, write...
+    await write_async(path, data)                   # same, off the event loop
+
+atomic_write() writes a temp file unique to the process and thread next to
+the target, fsyncs it, os.replace()s it over the target and fsyncs the
+directory, so a reader (or the next run after a crash) sees the old file
+or the new one, never a truncated one.  temp_path() / replace() are the
+two halves for writers that stream (feeds.FeedWriter).
+
+file_lock() is an advisory lock on "<path>.lock" (fcntl.flock, msvcrt on
+Windows), held for read-modify-write cycles on files several processes
+share: the feed shards and their index, the listing cache, quarantine
+files.  It also excludes other threads of the same process, since every
+holder opens its own lock file handle.
+"""
+import asyncio, os, threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:                     # Windows
+    fcntl = None
+    import msvcrt
+
+
+def temp_path(path: Path | str) -> Path:
+    """A temp file name next to `path`, unique to this process and thread."""
+    path = Path(path)
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _fsync_dir(directory: Path) -> None:
+    if os.name == "nt":                 # directories cannot be opened there
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replace(tmp: Path | str, path: Path | str) -> None:
+    """Moves a finished (fsynced) temp file over `path` durably."""
+    os.replace(tmp, path)
+    _fsync_dir(Path(path).parent)
+
+
+def atomic_write(path: Path | str, data: bytes | str, encoding: str = "utf-8") -> None:
+    """Replaces `path` with `data` all at once; on an error the old file stays."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data.encode(encoding) if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def file_lock(path: Path | str):
+    """Exclusive advisory lock for `path`, across processes and threads."""
+    lock = Path(path)
+    lock = lock.with_name(lock.name + ".lock")
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:         # LK_LOCK gives up after ~10 s
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append_lines(path: Path | str, lines: list[str], encoding: str = "utf-8") -> None:
+    """Appends whole lines under the file's lock, in one write."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(path), open(path, "a", encoding=encoding) as f:
+        f.write("".join(line + "\n" for line in lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def write_async(path: Path | str, data: bytes | str) -> None:
+    """atomic_write() in a worker thread."""
+    await asyncio.to_thread(atomic_write, path, data)
@@ -0,0 +1,85 @@
+"""
+images.py  –  product image downloads shared by every store.
+
+Files land in FRONTEND_IMAGE_DIR/<subdir>/<filename> and items reference them
+as /images/<subdir>/<filename>.  Files already on disk are reused – they
+are only ever renamed into place complete (fileio.atomic_write) – one
+governed client per store is shared by all downloads and at most
+IMAGE_CONCURRENCY run at once.
+
+    async with ImageFetcher("Migros", "migros") as images:
+        await images.fetch_all(items, filename_for)
+"""
+import asyncio, logging, os
+from pathlib import Path
+
+import httpx
+
+import fileio
+from metrics import BYTE_BUCKETS, metrics
+from ratelimit import governed_client
+
+FRONTEND_IMAGE_DIR = Path(os.getenv("FRONTEND_IMAGE_DIR", "../discount-frontend/public/images"))
+IMAGE_CONCURRENCY  = int(os.getenv("IMAGE_CONCURRENCY", "8"))
+RETRIES            = 2        # transport errors only; 429/503 are retried by the governor
+
+
+class ImageFetcher:
+    def __init__(self, store: str, subdir: str, concurrency: int = IMAGE_CONCURRENCY):
+        self.store     = store
+        self.subdir    = subdir
+        self.directory = FRONTEND_IMAGE_DIR / subdir
+        self._sem      = asyncio.Semaphore(concurrency)
+        self._client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._client = governed_client(self.store, timeout=20, follow_redirects=True)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def fetch(self, url: str, filename: str) -> str:
+        """Returns the public path, or "" if the image could not be saved."""
+        if not url or not url.startswith("http"):
+            metrics.inc("images_missing", store=self.store)
+            return ""
+        public, path = f"/images/{self.subdir}/{filename}", self.directory / filename
+        if path.exists():
+            metrics.inc("images_cached", store=self.store)
+            return public
+
+        async with self._sem:
+            for attempt in range(RETRIES + 1):
+                try:
+                    with metrics.timer("image_download", store=self.store):
+                        response = await self._client.get(url)
+                    response.raise_for_status()
+                    break
+                except httpx.TransportError as e:
+                    if attempt == RETRIES:
+                        return self._failed(url, e)
+                    await asyncio.sleep(attempt + 1)
+                except httpx.HTTPStatusError as e:
+                    return self._failed(url, e)
+
+        try:
+            await fileio.write_async(path, response.content)
+        except OSError as e:
+            return self._failed(url, e)
+        metrics.inc("images_fetched", store=self.store)
+        metrics.inc("image_bytes", len(response.content), store=self.store)
+        metrics.observe("image_size_bytes", len(response.content), BYTE_BUCKETS, store=self.store)
+        return public
+
+    def _failed(self, url: str, error: Exception) -> str:
+        metrics.inc("images_failed", store=self.store)
+        logging.warning(f"❌  Image download failed ({url}): {error}")
+        return ""
+
+    async def fetch_all(self, items: list[dict], filename_for) -> None:
+        """Replaces each item's remote "image" URL with the local public path."""
+        paths = await asyncio.gather(*(self.fetch(item["image"], filename_for(item)) for item in items))
+        for item, path in zip(items, paths):
+            item["image"] = path
@@ -0,0 +1,106 @@
+"""
+listing_cache.py  –  per-listing card records, so the cards of a listing
+that have not changed since the last run are not extracted again.
+
+    cache = ListingCache("A101")
+    plan = cache.plan(url)
+    for card in await read_cards(page):        # one batched DOM read
+        row = plan.row(card) if plan.known(card) else ...extract...
+    cache.save(url, cards, rows_by_id)          # every card of the listing
+
+A card is {"id": product id / URL, "sig": the price texts as scraped}.  Only
+the cards whose own (id, sig) is new are extracted again, the others keep
+their stored row; the listing itself is always read in full, so a change
+anywhere on it – below the fold too – is seen.  save() fingerprints the
+whole listing (the ordered (id, sig) pairs) and counts it as unchanged or
+changed in metrics.  Entries older than LISTING_CACHE_HOURS are ignored,
+which forces a full extraction at least that often (LISTING_CACHE_HOURS=0
+turns the cache off).
+"""
+import hashlib, json, logging, os, threading, time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import fileio
+from metrics import metrics
+
+LISTING_DIR = Path(os.getenv("LISTING_CACHE_DIR", ".listings"))
+MAX_AGE_HOURS = float(os.getenv("LISTING_CACHE_HOURS", "24"))
+
+
+def fingerprint(cards: list[dict]) -> str:
+    digest = hashlib.sha1()
+    for card in cards:
+        digest.update(f"{card['id']}\x1f{card['sig']}\x1e".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class Plan:
+    stored: dict[str, dict] = field(default_factory=dict)    # id → {"sig", "row"} from the last run
+
+    def known(self, card: dict) -> bool:
+        """Same product with the same price texts as last time."""
+        entry = self.stored.get(card["id"])
+        return entry is not None and entry["sig"] == card["sig"]
+
+    def row(self, card: dict) -> dict | None:
+        return self.stored[card["id"]]["row"]
+
+
+class ListingCache:
+    """JSON file per store under LISTING_DIR: listing key → fingerprint + card rows."""
+
+    def __init__(self, store: str, directory: Path | str = LISTING_DIR, max_age_hours: float = MAX_AGE_HOURS):
+        self.store = store
+        safe = "".join(c if c.isalnum() else "_" for c in store.lower())
+        self.path = Path(directory) / f"{safe}.json"
+        self.max_age = max_age_hours * 3600
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text("utf-8"))
+            except FileNotFoundError:
+                self._entries = {}
+            except json.JSONDecodeError:
+                logging.warning(f"⚠️  Listing cache for {self.store} unreadable – starting fresh")
+                self._entries = {}
+        return self._entries
+
+    def _fresh(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._load().get(key)
+        if not entry or time.time() - entry["updated"] > self.max_age:
+            return None
+        return entry
+
+    def plan(self, key: str) -> Plan:
+        """The cards of the listing `key` that can keep last run's row."""
+        entry = self._fresh(key) if self.max_age else None
+        return Plan(stored=entry["cards"]) if entry else Plan()
+
+    def save(self, key: str, cards: list[dict], rows: dict[str, dict | None]) -> None:
+        """Stores every card of the whole listing with its row; a card
+        without a row is remembered as such, so an unchanged card that was
+        skipped stays skipped."""
+        if not self.max_age:
+            return
+        previous = self._fresh(key)
+        digest = fingerprint(cards)
+        unchanged = previous is not None and previous["fingerprint"] == digest
+        metrics.inc("listings_unchanged" if unchanged else "listings_changed", store=self.store)
+        entry = {
+            "fingerprint": digest,
+            "updated": time.time(),
+            "cards": {c["id"]: {"sig": c["sig"], "row": rows.get(c["id"])} for c in cards},
+        }
+        # re-read under the file lock: another process (a distributed worker)
+        # may have saved other listings of this store since _load()
+        with self._lock, fileio.file_lock(self.path):
+            self._entries = None
+            entries = self._load()
+            entries[key] = entry
+            fileio.atomic_write(self.path, json.dumps(entries, ensure_ascii=False))
@@ -1,22 +1,25 @@
 # bots/main.py
 
 import asyncio
+import logging
 
-from a101_bot import scrape_a101
-from carrefoursa_bot import scrape_carrefour
-from migros_bot import scrape_migros
-from sok_bot import scrape_sok
+import stores
+from engine import run_store
 
 
 async def run_all_bots():
     print("🚀 Running all bots...")
-    await asyncio.gather(
-        scrape_a101(),
-        scrape_carrefour(),
-        scrape_migros(),
-        scrape_sok(),
+    results = await asyncio.gather(
+        *(run_store(name) for name in stores.names()),
+        return_exceptions=True,
     )
+    for name, result in zip(stores.names(), results):
+        if isinstance(result, Exception):
+            print(f"❌ {name} failed: {result}")
+        else:
+            print(f"✅ {name}: {len(result)} items")
     print("✅ All bots finished.")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     asyncio.run(run_all_bots())
@@ -0,0 +1,190 @@
+"""
+metrics.py  –  in-process counters, stage timers and histograms for the bots.
+
+    with metrics.timer("navigation", store="A101"):
+        await page.goto(url)
+    metrics.inc("cards_seen", store="A101")
+
+metrics.write() dumps a Prometheus text file (textfile-collector format) and
+a JSON run summary into METRICS_DIR; metrics.serve(port) exposes the same text
+on http://0.0.0.0:<port>/metrics (serve_from_env() does so when METRICS_PORT
+is set).
+"""
+import bisect, json, logging, os, threading, time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import fileio
+
+METRICS_DIR = Path(os.getenv("METRICS_DIR", "metrics"))
+PREFIX = "discount_bot_"
+
+# seconds – covers a single DOM read up to a full category scroll
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTE_BUCKETS = (1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"'.replace("\n", " ") for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count", "max")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts  = [0] * (len(buckets) + 1)
+        self.total   = 0.0
+        self.count   = 0
+        self.max     = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self.counters:   dict[tuple[str, tuple], float] = {}
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+        self.started_at  = time.time()
+        self._server     = None
+
+    # ------------------------------------------------------------------ #
+    #  Recording
+    # ------------------------------------------------------------------ #
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple = TIME_BUCKETS, **labels) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, stage: str, **labels):
+        """Observes the block's wall time in stage_seconds{stage=...}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    # ------------------------------------------------------------------ #
+    #  Export
+    # ------------------------------------------------------------------ #
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}{name}_total counter")
+                for (n, key), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}{name}_total{_fmt_labels(key)} {value:g}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (n, key), hist in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{PREFIX}{name}_bucket"
+                                     f"{_fmt_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{PREFIX}{name}_sum{_fmt_labels(key)} {hist.total:.6f}")
+                    lines.append(f"{PREFIX}{name}_count{_fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Per-store view: counters, stage timings and other histograms (count/total/mean/max)."""
+        stores: dict[str, dict] = {}
+        with self._lock:
+            for (name, key), value in self.counters.items():
+                labels = dict(key)
+                entry = stores.setdefault(labels.pop("store", "_all"),
+                                          {"counters": {}, "stages": {}, "histograms": {}})
+                suffix = "".join(f"[{k}={v}]" for k, v in labels.items())
+                entry["counters"][name + suffix] = value
+            for (name, key), hist in self.histograms.items():
+                labels = dict(key)
+                entry = stores.setdefault(labels.pop("store", "_all"),
+                                          {"counters": {}, "stages": {}, "histograms": {}})
+                if name == "stage_seconds":
+                    bucket, label = entry["stages"], labels.pop("stage", name)
+                else:
+                    bucket, label = entry["histograms"], name
+                bucket[label] = {
+                    "count": hist.count,
+                    "total": round(hist.total, 4),
+                    "mean" : round(hist.total / hist.count, 4) if hist.count else 0,
+                    "max"  : round(hist.max, 4),
+                }
+        return {
+            "started_at" : datetime.fromtimestamp(self.started_at).isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "wall_seconds": round(time.time() - self.started_at, 3),
+            "stores"     : stores,
+        }
+
+    def write(self, directory: Path | str = METRICS_DIR) -> Path:
+        """Writes metrics.prom and run_summary.json; returns the summary path."""
+        directory = Path(directory)
+        fileio.atomic_write(directory / "metrics.prom", self.render_prometheus())
+        path = directory / "run_summary.json"
+        fileio.atomic_write(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+        logging.info(f"📊  Metrics written to {directory}")
+        return path
+
+    # ------------------------------------------------------------------ #
+    #  HTTP endpoint
+    # ------------------------------------------------------------------ #
+    def serve(self, port: int, host: str = "0.0.0.0") -> None:
+        if self._server is not None:
+            return
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"📊  Metrics endpoint on :{port}/metrics")
+
+    def serve_from_env(self) -> None:
+        port = os.getenv("METRICS_PORT")
+        if port:
+            self.serve(int(port))
+
+
+metrics = Metrics()
@@ -1,36 +1,30 @@
 """
-migros_bot.py  –  saves discount images to
-E:/web/discount-frontend/public/images/migros          (2025-07-25)
+migros_bot.py  –  Migros "tüm indirimli ürünler" listing, one page per unit.
+Images are saved under FRONTEND_IMAGE_DIR/migros (see images.py).
 """
-import asyncio, json, logging, hashlib, httpx
-from pathlib import Path
-from playwright.async_api import async_playwright, Page
-import os  
+import asyncio, logging, hashlib, os
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError, async_playwright
+
+from browser_profile import first_page, launch_context
+from debug_capture import debug_capture
+from engine import StoreAdapter, UnitResult, WorkUnit, run_store
+from metrics import metrics
+from ratelimit import governed_goto
 # --------------------------------------------------------------------------- #
-#  Config & paths
+#  Config
 # --------------------------------------------------------------------------- #
-OUTPUT_JSON = Path(__file__).resolve().parent.parent / "discounts.json"
-IMAGE_DIR   = Path(r"E:/web/discount-frontend/public/images/migros")
-IMAGE_DIR.mkdir(parents=True, exist_ok=True)
-
-API_ENDPOINT = os.getenv(
-    "DISCOUNTS_API",             # environment variable name
-    "http://localhost:10000/api/discounts"   # fallback if the var isn’t set
-)
-
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 BASE_URL = "https://www.migros.com.tr/tum-indirimli-urunler-dt-0"
-
-def normalize_price(price_str: str) -> float:
-    return float(price_str.replace(".", "")
-                          .replace(",", ".")
-                          .replace("TL", "")
-                          .strip())
+PAGES_PER_UNIT = int(os.getenv("MIGROS_PAGES_PER_UNIT", "10"))
+PAGE_RANGES    = int(os.getenv("MIGROS_PAGE_RANGES", "10"))   # ranges queued up front
 
 # --------------------------------------------------------------------------- #
 #  Helpers
 # --------------------------------------------------------------------------- #
 async def scroll_slowly(page: Page) -> None:
+    with metrics.timer("scroll", store="Migros"):
+        await _scroll_slowly(page)
+
+async def _scroll_slowly(page: Page) -> None:
     last_h, same = 0, 0
     for _ in range(50):                       # max ~50*0.6 s ≈ 30 s
         await page.mouse.wheel(0, 300)
@@ -44,173 +38,140 @@ async def scroll_slowly(page: Page) -> None:
             same = 0
             last_h = h
 
-async def download_image(url: str, title: str) -> str:
-    """
-    Downloads an image to IMAGE_DIR and returns **/images/migros/filename**.
-    If the URL is invalid or the request fails, returns "" so the caller
-    can decide what to do.
-    """
-    if not url or not url.startswith("http") or "data:image" in url:
-        logging.warning(f"⚠️  Skipping invalid image URL: {url}")
-        return ""
-
-    # deterministic filename = md5(title+url).ext
-    ext = url.split(".")[-1].split("?")[0].lower()
-    if len(ext) > 5:                          # junk like "webp?param=x"
-        ext = "jpg"
-    filename = f"{hashlib.md5((title+url).encode()).hexdigest()}.{ext}"
-    filepath = IMAGE_DIR / filename
-
-    # Already on disk?
-    if filepath.exists():
-        return f"/images/migros/{filename}"
-
-    try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            filepath.write_bytes(r.content)
-            logging.info(f"📥 Saved image → {filepath}")
-            return f"/images/migros/{filename}"
-    except Exception as e:
-        logging.warning(f"❌ Image download failed ({url}): {e}")
-        return ""
+async def parse_card(card) -> dict | None:
+    """One mat-card → raw row, None if it is not a discounted product."""
+    if not await card.query_selector(".money-discount"):
+        metrics.inc("cards_skipped", store="Migros")
+        return None
+
+    title_el = await card.query_selector("#product-name")
+    if not title_el:
+        return None
+    title = (await title_el.inner_text()).strip()
+    href  = await title_el.get_attribute("href") or ""
+
+    img_tag = await card.query_selector("img.product-image")
+    img_url = ""
+    if img_tag:
+        img_url = await img_tag.get_attribute("data-src") or ""
+        if not img_url or "data:image" in img_url:
+            img_url = await img_tag.get_attribute("src") or ""
+
+    orig_el = await card.query_selector(".single-price-amount")
+    sale_el = await card.query_selector(".sale-price")
+    if not (orig_el and sale_el):
+        return None
+
+    return {
+        "name"          : title,
+        "url"           : f"https://www.migros.com.tr{href}",
+        "image_url"     : "" if "data:image" in img_url else img_url,
+        "original_price": await orig_el.inner_text(),
+        "price"         : await sale_el.inner_text(),
+    }
 
 # --------------------------------------------------------------------------- #
-#  Scraper core
+#  Adapter
 # --------------------------------------------------------------------------- #
-async def scrape_migros_discounts() -> list[dict]:
-    products, page_no = [], 1
-
-    async with async_playwright() as p:
-        browser  = await p.chromium.launch(headless=True)
-        context  = await browser.new_context()
-        page     = await context.new_page()
-
-        while True:
-            url = f"{BASE_URL}?sayfa={page_no}"
-            logging.info(f"🌐  {url}")
-            await page.goto(url, wait_until="domcontentloaded")
+def page_range(index: int, last: bool = False) -> WorkUnit:
+    start = index * PAGES_PER_UNIT + 1
+    end = start + PAGES_PER_UNIT - 1
+    return WorkUnit(f"pages:{start}-{end}", {"index": index, "start": start, "end": end, "last": last})
+
+class MigrosAdapter(StoreAdapter):
+    """Units are page ranges ("pages:11-20").  PAGE_RANGES of them are queued
+    up front so workers can take them in parallel; a range stops at the first
+    page without product cards, and only the last range queues the next one."""
+
+    name = "Migros"
+    image_subdir = "migros"
+    store_logo = "migros.png"
+
+    def __init__(self, base_url: str | None = None):
+        self.base_url = base_url or BASE_URL
+        self.end_page = None            # first page found empty; later ranges are skipped
+        self._playwright = self.context = self.page = None
+
+    async def open(self) -> None:
+        self._playwright = await async_playwright().start()
+        self.context = await launch_context(self._playwright, "Migros")
+        self.page = await first_page(self.context)
+
+    async def close(self) -> None:
+        if self.context is not None:
+            await self.context.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    async def discover(self) -> list[WorkUnit]:
+        return [page_range(n, last=(n == PAGE_RANGES - 1)) for n in range(PAGE_RANGES)]
+
+    async def extract(self, unit: WorkUnit) -> UnitResult:
+        rows = []
+        for page_no in range(unit.params["start"], unit.params["end"] + 1):
+            if self.end_page is not None and page_no >= self.end_page:
+                return UnitResult(rows)
+            page_rows = await self.scrape_page(page_no)
+            if page_rows is None:                 # past the last page
+                self.end_page = page_no if self.end_page is None else min(self.end_page, page_no)
+                return UnitResult(rows)
+            rows += page_rows
+        follow_up = [page_range(unit.params["index"] + 1, last=True)] if unit.params["last"] else []
+        return UnitResult(rows, follow_up)
+
+    async def scrape_page(self, page_no: int) -> list[dict] | None:
+        """Raw rows of one listing page, None if the page has no product cards."""
+        page = self.page
+        url = f"{self.base_url}?sayfa={page_no}"
+        logging.info(f"🌐  {url}")
+        # a navigation error fails the unit, so it stays pending; only a
+        # page without product cards ends the pagination
+        with metrics.timer("navigation", store="Migros"):
+            await governed_goto(page, url, wait_until="domcontentloaded")
             try:
                 await page.wait_for_selector("mat-card", timeout=10_000)
-            except:
+            except PlaywrightTimeoutError:
                 logging.info("🛑  No product cards found, pagination ends.")
-                break
-
-            await scroll_slowly(page)
-            cards = await page.query_selector_all("mat-card")
-            if not cards:
-                break
-
-            for card in cards:
-                try:
-                    if not await card.query_selector(".money-discount"):
-                        continue
-
-                    title_el = await card.query_selector("#product-name")
-                    if not title_el:
-                        continue
-                    title = (await title_el.inner_text()).strip()
-
-                    href  = await title_el.get_attribute("href") or ""
-                    full_url = f"https://www.migros.com.tr{href}"
-
-                    img_tag = await card.query_selector("img.product-image")
-                    img_url = ""
-                    if img_tag:
-                        img_url = await img_tag.get_attribute("data-src") or ""
-                        if not img_url or "data:image" in img_url:
-                            img_url = await img_tag.get_attribute("src") or ""
-
-                    orig_el = await card.query_selector(".single-price-amount")
-                    sale_el = await card.query_selector(".sale-price")
-                    if not (orig_el and sale_el):
-                        continue
-
-                    orig = normalize_price(await orig_el.inner_text())
-                    sale = normalize_price(await sale_el.inner_text())
-                    pct  = round((orig - sale) / orig * 100)
-
-                    local_img = await download_image(img_url, title)
-
-                    products.append({
-                        "title"            : title,
-                        "url"              : full_url,
-                        "image"            : local_img,
-                        "store"            : "Migros",
-                        "store_logo"       : "migros.png",
-                        "category"         : "Market",
-                        "original_price"   : f"{orig:.2f}",
-                        "price"            : f"{sale:.2f}",
-                        "discountPercentage": pct
-                    })
-                except Exception as e:
-                    logging.warning(f"❌  Error parsing product: {e}")
-
-            logging.info(f"✅  Page {page_no}: {len(products)} total so far.")
-            page_no += 1
-
-        await browser.close()
-    return products
-
-# -------------------------------------------------------------------- #
-#  BACKEND PUSH  (new)
-# -------------------------------------------------------------------- #
-async def push_to_api(items: list[dict]) -> None:
-    """POST scraped items to FastAPI backend."""
-    if not items:
-        return
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(API_ENDPOINT, json=items)
-        r.raise_for_status()
-        logging.info(f"🚀  Uploaded {len(items)} items for {items[0]['store']}")
-
-# -------------------------------------------------------------------- #
-#  LOCAL BACKUP  (optional)
-# -------------------------------------------------------------------- #
-def update_discounts_json(new_items: list[dict], store="Migros") -> None:
-    logging.info(f"📦  Writing local backup to {OUTPUT_JSON}")
-    try:
-        existing = json.loads(OUTPUT_JSON.read_text("utf-8"))
-    except Exception:
-        existing = []
-    existing = [p for p in existing if (p.get("store") != store)]
-    existing.extend(new_items)
-    OUTPUT_JSON.write_text(json.dumps(existing, ensure_ascii=False, indent=2), encoding="utf-8")
-    logging.info(f"✅  {len(existing)} total items in local discounts.json")
-# --------------------------------------------------------------------------- #
-#  JSON update utility
-# --------------------------------------------------------------------------- #
-def update_discounts_json(new_items: list[dict], store="Migros") -> None:
-    logging.info(f"📦  Merging {len(new_items)} {store} items into {OUTPUT_JSON}")
-
-    existing = []
-    if OUTPUT_JSON.exists():
-        try:
-            existing = json.loads(OUTPUT_JSON.read_text("utf-8"))
-        except json.JSONDecodeError:
-            logging.warning("⚠️  discounts.json corrupted – starting fresh")
-
-    # Drop older Migros entries
-    existing = [p for p in existing if p.get("store") != store]
-    existing.extend(new_items)
-    OUTPUT_JSON.write_text(
-    json.dumps(existing, ensure_ascii=False, indent=2),
-    encoding="utf-8"
-    )
-
-    logging.info(f"✅  {len(existing)} total items now in discounts.json")
+                if page_no == 1:
+                    await debug_capture.page("Migros", "empty_listing", page)
+                return None
+
+        await scroll_slowly(page)
+        cards = await page.query_selector_all("mat-card")
+        if not cards:
+            return None
+        metrics.inc("cards_seen", len(cards), store="Migros")
+
+        rows = []
+        for card in cards:
+            try:
+                row = await parse_card(card)
+            except Exception as e:
+                metrics.inc("cards_failed", store="Migros")
+                logging.warning(f"❌  Error parsing product: {e}")
+                await debug_capture.card("Migros", "parse_error", card,
+                                         error=str(e), listing=url)
+                continue
+            if row:
+                rows.append(row)
+                metrics.inc("cards_parsed", store="Migros")
+        return rows
+
+    def image_filename(self, item: dict) -> str:
+        # deterministic filename = md5(title+url).ext
+        url = item["image"]
+        ext = url.split(".")[-1].split("?")[0].lower()
+        if len(ext) > 5:                          # junk like "webp?param=x"
+            ext = "jpg"
+        return f"{hashlib.md5((item['name'] + url).encode()).hexdigest()}.{ext}"
 
 # --------------------------------------------------------------------------- #
 #  Main
 # --------------------------------------------------------------------------- #
 async def main():
-    items = await scrape_migros_discounts()
-    if items:
-        await push_to_api(items)          # ← primary path
-        update_discounts_json(items)      # ← optional flat-file backup
-    else:
-        logging.warning("⚠️  No Migros discounts scraped.")
+    return await run_store(MigrosAdapter())
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import sys
+    from cli import main as cli_main
+    sys.exit(cli_main(["run", "--store", "migros", *sys.argv[1:]]))
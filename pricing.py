@@ -0,0 +1,39 @@
+"""
+pricing.py  –  one price parser / discount calculation for every store.
+
+Handles the formats the sites actually show:
+    "₺1.299,00"  "1.299.00"  "69,95 TL"  "232.00 "  "19,90₺"  154.95
+"""
+import re
+
+_NOISE = re.compile(r"[^\d.,]")
+
+
+def parse_price(value) -> float | None:
+    """Turkish / English formatted price → float, None if it is not a price."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = _NOISE.sub("", str(value))
+    if not text:
+        return None
+    last_sep = max(text.rfind(","), text.rfind("."))
+    # the last separator is decimal only when followed by 1-2 digits
+    if last_sep != -1 and 0 < len(text) - last_sep - 1 <= 2:
+        whole, frac = text[:last_sep], text[last_sep + 1:]
+    else:
+        whole, frac = text, ""
+    whole = whole.replace(",", "").replace(".", "")
+    try:
+        return float(f"{whole or 0}.{frac or 0}")
+    except ValueError:
+        return None
+
+
+def calculate_discount(original, price) -> int | None:
+    """Rounded discount percentage; None unless 0 < price < original."""
+    o, p = parse_price(original), parse_price(price)
+    if not o or p is None or p <= 0 or p >= o:
+        return None
+    return round(100 * (o - p) / o)
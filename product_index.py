@@ -0,0 +1,123 @@
+"""
+product_index.py  –  persistent store + product-id index, shared by every
+listing and every run.
+
+    product_id("https://www.a101.com.tr/kapida/icecek/caykur-..._p-13000056")   # "13000056"
+    index = ProductIndex()
+    found, row = index.reuse("A101", pid, sig)      # same price texts as last time?
+    index.put("A101", [(pid, sig, row), ...])       # rows just extracted
+
+The product id comes from the URL (A101 "_p-<id>", Migros / Şok "-p-<id>",
+CarrefourSA "/p/<id>"; otherwise the URL without query string; "" for a
+link with no product in it, such as a bare host or "/urun/"), so the
+same product reached from two campaign listings, with or without tracking
+parameters, is one key.  engine.item_key() uses it to deduplicate a run
+for every store; the A101 bot also uses the index to skip the per-card
+extraction of a product already extracted with the same price texts – in
+an earlier listing of this run or in an earlier run.  Migros, Şok and
+CarrefourSA do not: Şok rows come whole from one API response and
+CarrefourSA's from one DOM read, so there is no per-item work to skip, and
+a Migros card's price texts are only known after the same DOM reads that
+build its row.
+
+A stored row is reused for LISTING_CACHE_HOURS after it was extracted, the
+same limit as the listing cache, so every product still gets a full
+extraction at least that often (LISTING_CACHE_HOURS=0 turns reuse off).
+A row without an image is never reused: the lazy image gets another try.
+
+One SQLite table (PRODUCT_INDEX_DB), WITHOUT ROWID on (store, pid); each
+store's keys are read into memory once per process, so lookups are dict
+hits.  Expired entries are pruned when the file is opened.
+"""
+import json, os, re, sqlite3, threading, time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from listing_cache import MAX_AGE_HOURS
+
+INDEX_DB = Path(os.getenv("PRODUCT_INDEX_DB", ".history/products.db"))
+
+_ID_PATTERNS = (
+    re.compile(r"[-_]p-([0-9A-Za-z]+)/?$"),     # A101 _p-13000056, Migros / Şok -p-13134f2
+    re.compile(r"/p/([0-9A-Za-z]+)/?$"),        # CarrefourSA …/p/30010045
+)
+# link prefixes the bots put in front of a product path, never a product themselves
+_SECTIONS = {"urun", "kapida", "p"}
+
+
+def product_id(url: str) -> str:
+    """The product's id from its URL; "" for no URL or one without a product
+    segment, so callers fall back to the item's name."""
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/")
+    for pattern in _ID_PATTERNS:
+        match = pattern.search(path)
+        if match:
+            return match.group(1)
+    segments = [s for s in path.split("/") if s]
+    if not segments or segments[-1].lower() in _SECTIONS:
+        return ""
+    return f"{parts.netloc.lower().removeprefix('www.')}{path}"
+
+
+class ProductIndex:
+    def __init__(self, path: Path | str = INDEX_DB, max_age_hours: float = MAX_AGE_HOURS):
+        self.path = Path(path)
+        self.max_age = max_age_hours * 3600
+        self._db = None
+        self._stores: dict[str, dict[str, tuple[str, dict | None, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS products (
+                                    store TEXT, pid TEXT, sig TEXT, row TEXT, seen REAL,
+                                    PRIMARY KEY (store, pid)) WITHOUT ROWID""")
+            # "seen" is when the row was extracted
+            self._db.execute("DELETE FROM products WHERE seen < ?", (time.time() - self.max_age,))
+            self._db.commit()
+        return self._db
+
+    def _entries(self, store: str) -> dict[str, tuple[str, dict | None, float]]:
+        if store not in self._stores:
+            rows = self._conn().execute("SELECT pid, sig, row, seen FROM products WHERE store = ?", (store,))
+            self._stores[store] = {pid: (sig, json.loads(row), seen) for pid, sig, row, seen in rows}
+        return self._stores[store]
+
+    def reuse(self, store: str, pid: str, sig: str) -> tuple[bool, dict | None]:
+        """(True, stored row) when `pid` was extracted with the same `sig`
+        within the max age; the row may be None (the card gave no row then
+        either).  Rows without an image are not reused."""
+        if not self.max_age:
+            return False, None
+        with self._lock:
+            entry = self._entries(store).get(pid)
+        if entry is None:
+            return False, None
+        entry_sig, row, extracted = entry
+        if entry_sig != sig or time.time() - extracted > self.max_age or (row and not row.get("image_url")):
+            return False, None
+        return True, row
+
+    def put(self, store: str, entries: list[tuple[str, str, dict | None]]) -> None:
+        """Records freshly extracted (pid, sig, row) triples."""
+        if not entries or not self.max_age:
+            return
+        now = time.time()
+        with self._lock:
+            known = self._entries(store)
+            db = self._conn()
+            db.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?)",
+                           [(store, pid, sig, json.dumps(row, ensure_ascii=False), now)
+                            for pid, sig, row in entries])
+            db.commit()
+            for pid, sig, row in entries:
+                known[pid] = (sig, row, now)
+
+
+index = ProductIndex()
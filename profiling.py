@@ -0,0 +1,328 @@
+"""
+profiling.py  –  opt-in resource and CPU profiling of a run.
+
+    python cli.py run --all --profile                 # resources + sampled flamegraph
+    python cli.py run --store a101 --profile cprofile
+    python cli.py run --store migros --profile pyinstrument   # needs pyinstrument
+    python cli.py run --all --profile resources       # timeline only, no CPU profiler
+
+    with profiling.session("sample"):
+        asyncio.run(...)
+
+While a session is open a background thread samples, every
+PROFILE_INTERVAL seconds, CPU and RSS of this Python process and of every
+child process (Playwright's Chromium, chromedriver + Chrome), attributed
+to the store that launched it: browser_profile labels each persistent
+profile directory, CarrefourSA labels its chromedriver, and a process
+inherits its parent's label.  Peaks also go to metrics as rss_mb /
+cpu_percent histograms (the run summary shows their max).
+
+Written next to run_summary.json (METRICS_DIR) when the session ends:
+
+    resource_timeline.json      every sample, per store
+    flamegraph.svg, stacks.folded   "sample": all Python threads' stacks
+                                    every PROFILE_STACK_INTERVAL seconds
+    profile.prof, profile.txt       "cprofile"
+    profile.html, profile.speedscope.json   "pyinstrument"
+
+Child processes are read from /proc (Linux, i.e. the container); elsewhere
+only the Python process itself is sampled.
+"""
+import html, json, logging, os, sys, threading, time, zlib
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import fileio
+from metrics import METRICS_DIR, metrics
+
+INTERVAL       = float(os.getenv("PROFILE_INTERVAL", "0.5"))
+STACK_INTERVAL = float(os.getenv("PROFILE_STACK_INTERVAL", "0.01"))
+PROFILERS      = ("sample", "cprofile", "pyinstrument")
+MB_BUCKETS     = (25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 4000)
+PCT_BUCKETS    = (5, 10, 25, 50, 75, 100, 150, 200, 400)
+
+_PROC = Path("/proc")
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# store labels: set by the code that starts a browser, read by the sampler
+_pid_labels: dict[int, str] = {}
+_dir_labels: dict[str, str] = {}
+
+
+def label(store: str, pid: int | None = None, path: Path | str | None = None) -> None:
+    """Attributes a process (and its children), or every browser started on
+    the user-data dir `path`, to `store`.  Cheap; called whether or not a
+    session is open."""
+    if pid is not None:
+        _pid_labels[pid] = store
+    if path is not None:
+        _dir_labels[str(Path(path).resolve())] = store
+
+
+# --------------------------------------------------------------------------- #
+#  Resource sampling
+# --------------------------------------------------------------------------- #
+def _read_proc(pid: int) -> tuple[int, int, int, str] | None:
+    """(ppid, cpu ticks, rss bytes, cmdline) from /proc, None if it is gone."""
+    try:
+        stat = (_PROC / str(pid) / "stat").read_text()
+        cmdline = (_PROC / str(pid) / "cmdline").read_bytes().replace(b"\0", b" ").decode(errors="replace")
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+    fields = stat[stat.rindex(")") + 2:].split()
+    return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21]) * _PAGE, cmdline
+
+
+def _store_of_cmdline(cmdline: str) -> str | None:
+    for part in cmdline.split():
+        if part.startswith("--user-data-dir="):
+            return _dir_labels.get(str(Path(part.split("=", 1)[1]).resolve()))
+    return None
+
+
+class ResourceSampler:
+    """Background thread: CPU % and RSS of this process and its children."""
+
+    def __init__(self, interval: float = INTERVAL):
+        self.interval = interval
+        self.samples: list[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._last: dict[int, int] = {}
+        self._started = self._last_wall = 0.0
+
+    def start(self) -> None:
+        self._started = self._last_wall = time.monotonic()
+        self._thread.start()
+
+    def stop(self) -> list[dict]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.samples.append(self.sample())
+            except Exception as e:                      # never take the run down
+                logging.debug(f"resource sample failed: {e}")
+
+    def _tree(self) -> dict[int, tuple]:
+        if not _PROC.is_dir():
+            return {}
+        procs = {}
+        for entry in _PROC.iterdir():
+            if entry.name.isdigit() and (info := _read_proc(int(entry.name))):
+                procs[int(entry.name)] = info
+        children: dict[int, list[int]] = {}
+        for pid, info in procs.items():
+            children.setdefault(info[0], []).append(pid)
+        tree, todo = {}, [os.getpid()]
+        while todo:
+            pid = todo.pop()
+            if pid in procs:
+                tree[pid] = procs[pid]
+            todo.extend(children.get(pid, []))
+        return tree
+
+    def _cpu(self, pid: int, ticks: int, wall: float) -> float:
+        previous = self._last.get(pid)
+        self._last[pid] = ticks
+        if previous is None or wall <= 0:
+            return 0.0
+        return 100.0 * (ticks - previous) / _TICKS / wall
+
+    def sample(self) -> dict:
+        now = time.monotonic()
+        wall, self._last_wall = now - self._last_wall, now
+        me = os.getpid()
+        tree = self._tree()
+        if me in tree:
+            python = {"cpu": round(self._cpu(me, tree[me][1], wall), 1), "rss_mb": round(tree[me][2] / 2**20, 1)}
+        else:                                           # no /proc: this process only
+            ticks = int(time.process_time() * _TICKS)
+            python = {"cpu": round(self._cpu(me, ticks, wall), 1), "rss_mb": round(_own_rss() / 2**20, 1)}
+
+        owner: dict[int, str] = {}
+
+        def store_of(pid: int) -> str:
+            if pid not in owner:
+                info = tree.get(pid)
+                found = _pid_labels.get(pid) or (info and _store_of_cmdline(info[3]))
+                if not found:
+                    parent = info[0] if info else None
+                    found = store_of(parent) if parent in tree and parent != me else "other"
+                owner[pid] = found
+            return owner[pid]
+
+        stores: dict[str, dict] = {}
+        for pid, (_, ticks, rss, _) in tree.items():
+            if pid == me:
+                continue
+            entry = stores.setdefault(store_of(pid), {"cpu": 0.0, "rss_mb": 0.0, "processes": 0})
+            entry["cpu"] += self._cpu(pid, ticks, wall)
+            entry["rss_mb"] += rss / 2**20
+            entry["processes"] += 1
+        for pid in set(self._last) - set(tree) - {me}:
+            del self._last[pid]
+
+        metrics.observe("rss_mb", python["rss_mb"], buckets=MB_BUCKETS, process="python")
+        metrics.observe("cpu_percent", python["cpu"], buckets=PCT_BUCKETS, process="python")
+        for store, entry in stores.items():
+            entry["cpu"], entry["rss_mb"] = round(entry["cpu"], 1), round(entry["rss_mb"], 1)
+            metrics.observe("rss_mb", entry["rss_mb"], buckets=MB_BUCKETS, store=store, process="browser")
+            metrics.observe("cpu_percent", entry["cpu"], buckets=PCT_BUCKETS, store=store, process="browser")
+        return {"t": round(now - self._started, 3), "python": python, "stores": stores}
+
+
+def _own_rss() -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024      # peak, not current
+
+
+# --------------------------------------------------------------------------- #
+#  Stack sampling → flamegraph
+# --------------------------------------------------------------------------- #
+class StackSampler:
+    """Samples every Python thread's stack; folded stacks feed the flamegraph."""
+
+    def __init__(self, interval: float = STACK_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                if names.get(ident) == "resource-sampler":
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def write_flamegraph(stacks: Counter, path: Path, width: int = 1200, row: int = 16) -> None:
+    """A self-contained SVG flamegraph (root at the bottom) of folded stacks."""
+    root = {"n": 0, "c": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["n"] += count
+        for frame in stack.split(";"):
+            node = node["c"].setdefault(frame, {"n": 0, "c": {}})
+            node["n"] += count
+    total = root["n"] or 1
+
+    depth = 0
+    rects = []
+
+    def walk(node, x, level):
+        nonlocal depth
+        depth = max(depth, level)
+        for name, child in sorted(node["c"].items()):
+            w = child["n"] / total * width
+            if w >= 0.5:
+                rects.append((x, level, w, name, child["n"]))
+                walk(child, x, level + 1)
+            x += w
+
+    walk(root, 0.0, 0)
+    height = (depth + 2) * row
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'font-family="monospace" font-size="11">',
+           f'<text x="4" y="12">{total} samples – hover a frame for its share</text>']
+    for x, level, w, name, count in rects:
+        y = height - (level + 1) * row
+        hue = 20 + zlib.crc32(name.split(" ")[0].encode()) % 40
+        label_text = html.escape(name[: max(0, int(w / 7))])
+        out.append(f'<g><title>{html.escape(name)} – {count} ({100 * count / total:.1f}%)</title>'
+                   f'<rect x="{x:.1f}" y="{y}" width="{max(w - 0.5, 0.5):.1f}" height="{row - 1}" '
+                   f'fill="hsl({hue},85%,60%)"/>'
+                   f'<text x="{x + 2:.1f}" y="{y + row - 4}">{label_text}</text></g>')
+    out.append("</svg>")
+    fileio.atomic_write(path, "\n".join(out))
+
+
+# --------------------------------------------------------------------------- #
+#  Session
+# --------------------------------------------------------------------------- #
+@contextmanager
+def session(profiler: str | None = "sample", directory: Path | str = METRICS_DIR):
+    """Profiles the block; profiler None samples resources only (cli: "resources")."""
+    if profiler not in (None, *PROFILERS):
+        raise ValueError(f"unknown profiler {profiler!r} ({', '.join(PROFILERS)})")
+    directory = Path(directory)
+    resources = ResourceSampler()
+    stacks = StackSampler() if profiler == "sample" else None
+    cpu = None
+    if profiler == "cprofile":
+        import cProfile
+        cpu = cProfile.Profile()
+    elif profiler == "pyinstrument":
+        from pyinstrument import Profiler
+        cpu = Profiler(async_mode="enabled")
+
+    resources.start()
+    if stacks:
+        stacks.start()
+    if profiler == "cprofile":
+        cpu.enable()
+    elif profiler == "pyinstrument":
+        cpu.start()
+    try:
+        yield
+    finally:
+        if profiler == "cprofile":
+            cpu.disable()
+        elif profiler == "pyinstrument":
+            cpu.stop()
+        samples = resources.stop()
+        fileio.atomic_write(directory / "resource_timeline.json",
+                            json.dumps({"interval": resources.interval, "samples": samples}))
+        written = ["resource_timeline.json"]
+        if stacks:
+            folded = stacks.stop()
+            fileio.atomic_write(directory / "stacks.folded",
+                                "".join(f"{s} {n}\n" for s, n in folded.most_common()))
+            write_flamegraph(folded, directory / "flamegraph.svg")
+            written += ["stacks.folded", "flamegraph.svg"]
+        if profiler == "cprofile":
+            import io, pstats
+            import marshal
+            cpu.create_stats()                  # what dump_stats() writes, but atomically
+            fileio.atomic_write(directory / "profile.prof", marshal.dumps(cpu.stats))
+            text = io.StringIO()
+            pstats.Stats(cpu, stream=text).sort_stats("cumulative").print_stats(60)
+            fileio.atomic_write(directory / "profile.txt", text.getvalue())
+            written += ["profile.prof", "profile.txt"]
+        elif profiler == "pyinstrument":
+            from pyinstrument.renderers import SpeedscopeRenderer
+            fileio.atomic_write(directory / "profile.html", cpu.output_html())
+            fileio.atomic_write(directory / "profile.speedscope.json", cpu.output(SpeedscopeRenderer()))
+            written += ["profile.html", "profile.speedscope.json"]
+        metrics.write(directory)
+        logging.info(f"🔬  Profile written to {directory}: {', '.join(written)}")
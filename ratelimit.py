@@ -0,0 +1,235 @@
+"""
+ratelimit.py  –  per-host token bucket + AIMD concurrency governor shared by
+httpx clients, Playwright navigations and Selenium page loads.
+
+Every request to a retailer takes a token from its host bucket and a slot
+from its concurrency window.  429/503 halve both (and honour Retry-After,
+clamped to MAX_RETRY_AFTER); a run of successes grows them back
+additively.
+"""
+import asyncio, logging, threading, time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+import recorder
+
+BACKOFF_STATUSES = {429, 503}
+MAX_RETRY_AFTER  = 60.0                         # seconds; a longer Retry-After is clamped
+RETRY_METHODS    = {"GET", "HEAD", "OPTIONS"}   # idempotent and body-less, safe to re-send
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    rate: float = 2.0          # requests / second at full speed
+    burst: int = 4             # bucket size
+    concurrency: int = 4       # max requests in flight
+    min_rate: float = 0.2      # floor after repeated back-offs
+
+
+DEFAULT_LIMIT = HostLimit()
+
+# keys are matched against the host and its parent domains ("www." stripped)
+HOST_LIMITS = {
+    "a101.com.tr"              : HostLimit(rate=1.0, burst=2, concurrency=3),
+    "cdn2.a101.com.tr"         : HostLimit(rate=8.0, burst=16, concurrency=8),
+    "migros.com.tr"            : HostLimit(rate=1.0, burst=2, concurrency=2),
+    "images.migrosone.com"     : HostLimit(rate=8.0, burst=16, concurrency=8),
+    "sokmarket.com.tr"         : HostLimit(rate=2.0, burst=4, concurrency=4),
+    "images.ceptesok.com"      : HostLimit(rate=8.0, burst=16, concurrency=8),
+    "carrefoursa.com"          : HostLimit(rate=0.5, burst=1, concurrency=1),
+    "reimg-carrefour.mncdn.com": HostLimit(rate=8.0, burst=16, concurrency=8),
+}
+
+
+def host_key(url: str) -> str:
+    """Bucket key for a URL: the most specific configured domain, else the host."""
+    host = (urlsplit(url).hostname or "").lower().removeprefix("www.")
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        candidate = ".".join(parts[i:])
+        if candidate in HOST_LIMITS:
+            return candidate
+    return host
+
+
+class _HostState:
+    def __init__(self, limit: HostLimit):
+        self.limit       = limit
+        self.rate        = limit.rate
+        self.tokens      = float(limit.burst)
+        self.window      = limit.concurrency
+        self.in_flight   = 0
+        self.successes   = 0
+        self.stamp       = time.monotonic()
+        self.cooldown    = 0.0
+
+    def try_acquire(self, now: float) -> float:
+        """Returns 0 if a slot was taken, otherwise seconds to wait."""
+        if now < self.cooldown:
+            return self.cooldown - now
+        self.tokens = min(self.limit.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.in_flight >= self.window:
+            return 0.05
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def release(self, status: int | None, retry_after: float | None, now: float) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        if status in BACKOFF_STATUSES:
+            self.window = max(1, self.window // 2)
+            self.rate = max(self.limit.min_rate, self.rate / 2)
+            self.successes = 0
+            self.cooldown = max(self.cooldown, now + (retry_after or 1 / self.rate))
+        elif status is not None and status < 400:
+            self.successes += 1
+            if self.successes >= self.window:
+                self.successes = 0
+                self.window = min(self.limit.concurrency, self.window + 1)
+                self.rate = min(self.limit.rate, self.rate + self.limit.rate / 10)
+
+
+class Slot:
+    """Handed out by Governor.slot(); set .status (and .retry_after) before exit."""
+    __slots__ = ("status", "retry_after")
+
+    def __init__(self):
+        self.status: int | None = None
+        self.retry_after: float | None = None
+
+
+class Governor:
+    def __init__(self, limits: dict[str, HostLimit] | None = None):
+        self.limits = HOST_LIMITS if limits is None else limits
+        self._hosts: dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key: str) -> _HostState:
+        state = self._hosts.get(key)
+        if state is None:
+            state = self._hosts[key] = _HostState(self.limits.get(key, DEFAULT_LIMIT))
+        return state
+
+    def _try(self, key: str) -> float:
+        with self._lock:
+            return self._state(key).try_acquire(time.monotonic())
+
+    def _release(self, key: str, slot: Slot) -> None:
+        with self._lock:
+            state = self._state(key)
+            state.release(slot.status, slot.retry_after, time.monotonic())
+            if slot.status in BACKOFF_STATUSES:
+                logging.warning(f"🐢  {key} answered {slot.status} – window {state.window}, "
+                                f"{state.rate:.2f} req/s")
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        key = host_key(url)
+        while (wait := self._try(key)) > 0:
+            await asyncio.sleep(wait)
+        slot = Slot()
+        try:
+            yield slot
+        finally:
+            self._release(key, slot)
+
+    @contextmanager
+    def slot_sync(self, url: str):
+        """Blocking variant for Selenium / requests code paths."""
+        key = host_key(url)
+        while (wait := self._try(key)) > 0:
+            time.sleep(wait)
+        slot = Slot()
+        try:
+            yield slot
+        finally:
+            self._release(key, slot)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {k: {"window": s.window, "rate": round(s.rate, 3), "in_flight": s.in_flight}
+                    for k, s in self._hosts.items()}
+
+
+governor = Governor()
+
+
+def _retry_after(headers) -> float | None:
+    """Retry-After in seconds (delta or HTTP date), clamped to 0…MAX_RETRY_AFTER."""
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+# --------------------------------------------------------------------------- #
+#  httpx
+# --------------------------------------------------------------------------- #
+class GovernedTransport(httpx.AsyncBaseTransport):
+    """Wraps another transport; retries 429/503 of GET/HEAD/OPTIONS requests
+    after the governor backs off (other methods are not idempotent, or their
+    body may be a stream that cannot be sent twice)."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport | None = None,
+                 gov: Governor | None = None, retries: int = 2):
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.gov = gov or governor
+        self.retries = retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            async with self.gov.slot(str(request.url)) as slot:
+                response = await self.inner.handle_async_request(request)
+                slot.status = response.status_code
+                slot.retry_after = _retry_after(response.headers)
+            if (response.status_code not in BACKOFF_STATUSES or attempt == self.retries
+                    or request.method not in RETRY_METHODS):
+                return response
+            await response.aclose()
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def governed_client(store: str | None = None, **kwargs) -> httpx.AsyncClient:
+    """httpx.AsyncClient whose requests go through the shared governor.
+
+    In replay mode requests are answered from the store's recording instead."""
+    if recorder.mode() == "replay":
+        transport = recorder.ReplayTransport(store)
+    else:
+        transport = GovernedTransport(recorder.wrap_transport(httpx.AsyncHTTPTransport(), store))
+    return httpx.AsyncClient(transport=transport, **kwargs)
+
+
+# --------------------------------------------------------------------------- #
+#  Playwright
+# --------------------------------------------------------------------------- #
+async def governed_goto(page, url: str, retries: int = 2, **kwargs):
+    """page.goto() through the governor; returns the navigation response."""
+    if recorder.mode() == "replay":
+        return await page.goto(url, **kwargs)
+    for attempt in range(retries + 1):
+        async with governor.slot(url) as slot:
+            response = await page.goto(url, **kwargs)
+            if response is not None:
+                slot.status = response.status
+                slot.retry_after = _retry_after(response.headers)
+        if slot.status not in BACKOFF_STATUSES or attempt == retries:
+            return response
+    return response
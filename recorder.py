@@ -0,0 +1,208 @@
+"""
+recorder.py  –  HAR-style record / replay of everything the bots fetch.
+
+    python a101_bot.py --record                  # live run, saves responses
+    python a101_bot.py --replay                  # serves them back, no network
+    python migros_bot.py --replay --recordings /tmp/rec
+
+Playwright contexts record to recordings/<store>.har.zip (page.route / HAR,
+bodies attached in the zip) and replay through context.route_from_har().
+httpx traffic goes through RecordingTransport / ReplayTransport into
+recordings/<store>.httpx.jsonl.gz.  Selenium cannot be intercepted, so the
+CarrefourSA bot stores the rendered page source per category instead and
+loads it from a local file on replay.
+
+BOT_NET_MODE=live|record|replay and RECORDINGS_DIR do the same via env.
+"""
+import argparse, base64, gzip, hashlib, json, logging, os, sys, tempfile, threading, unicodedata
+from pathlib import Path
+
+import httpx
+
+import fileio
+
+MODES = ("live", "record", "replay")
+
+_mode = os.getenv("BOT_NET_MODE", "live")
+_directory = Path(os.getenv("RECORDINGS_DIR", "recordings"))
+_lock = threading.Lock()
+
+
+def mode() -> str:
+    return _mode
+
+
+def recordings_dir() -> Path:
+    return _directory
+
+
+def set_mode(new_mode: str, directory: Path | str | None = None) -> None:
+    global _mode, _directory
+    if new_mode not in MODES:
+        raise ValueError(f"unknown network mode {new_mode!r}")
+    _mode = new_mode
+    if directory is not None:
+        _directory = Path(directory)
+    if new_mode != "live":
+        logging.info(f"📼  Network mode: {new_mode} ({_directory})")
+
+
+def configure_from_argv(argv: list[str] | None = None) -> list[str]:
+    """Consumes --record / --replay / --recordings DIR; returns the other args."""
+    ap = argparse.ArgumentParser(add_help=False)
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument("--record", action="store_true")
+    group.add_argument("--replay", action="store_true")
+    ap.add_argument("--recordings", type=Path)
+    args, rest = ap.parse_known_args(sys.argv[1:] if argv is None else argv)
+    if args.record or args.replay:
+        set_mode("record" if args.record else "replay", args.recordings)
+    elif args.recordings:
+        set_mode(_mode, args.recordings)
+    return rest
+
+
+def store_slug(store: str | None) -> str:
+    ascii_name = unicodedata.normalize("NFKD", store or "default").encode("ascii", "ignore").decode()
+    return "".join(c if c.isalnum() else "_" for c in ascii_name.lower())
+
+
+def har_path(store: str | None) -> Path:
+    return _directory / f"{store_slug(store)}.har.zip"
+
+
+def archive_path(store: str | None) -> Path:
+    return _directory / f"{store_slug(store)}.httpx.jsonl.gz"
+
+
+# --------------------------------------------------------------------------- #
+#  Playwright
+# --------------------------------------------------------------------------- #
+def context_options(store: str | None) -> dict:
+    """Extra new_context()/launch_persistent_context() kwargs for record mode."""
+    if _mode != "record":
+        return {}
+    path = har_path(store)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return {"record_har_path": str(path), "record_har_content": "attach", "record_har_mode": "full"}
+
+
+async def prepare_context(context, store: str | None) -> None:
+    """Routes the context from the recorded HAR in replay mode."""
+    if _mode == "replay":
+        await context.route_from_har(str(har_path(store)), not_found="abort")
+
+
+async def new_context(browser, store: str | None, **kwargs):
+    """browser.new_context() that records or replays according to the mode.
+
+    Close the context (not only the browser) so the HAR gets written."""
+    context = await browser.new_context(**kwargs, **context_options(store))
+    await prepare_context(context, store)
+    return context
+
+
+# --------------------------------------------------------------------------- #
+#  httpx
+# --------------------------------------------------------------------------- #
+def _entry_key(method: str, url: str) -> str:
+    return f"{method.upper()} {url}"
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests through and appends every response to the archive."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, store: str | None):
+        self.inner = inner
+        self.path = archive_path(store)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        entry = {
+            "key"    : _entry_key(request.method, str(request.url)),
+            "status" : response.status_code,
+            "headers": [(k, v) for k, v in response.headers.items()
+                        if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")],
+            "body"   : base64.b64encode(content).decode(),
+        }
+        with _lock, fileio.file_lock(self.path):
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return httpx.Response(response.status_code, headers=entry["headers"],
+                              content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves recorded responses; repeated requests cycle through recordings."""
+
+    _cache: dict[Path, dict[str, list[dict]]] = {}
+
+    def __init__(self, store: str | None):
+        self.path = archive_path(store)
+        self.entries = self._load(self.path)
+        self.served: dict[str, int] = {}
+
+    @classmethod
+    def _load(cls, path: Path) -> dict[str, list[dict]]:
+        with _lock:
+            if path not in cls._cache:
+                entries: dict[str, list[dict]] = {}
+                if path.exists():
+                    with gzip.open(path, "rt", encoding="utf-8") as f:
+                        for line in f:
+                            entry = json.loads(line)
+                            entries.setdefault(entry["key"], []).append(entry)
+                else:
+                    logging.warning(f"📼  No recording at {path} – every request will 404")
+                cls._cache[path] = entries
+            return cls._cache[path]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = _entry_key(request.method, str(request.url))
+        recorded = self.entries.get(key)
+        if not recorded:
+            return httpx.Response(404, content=b"not recorded", request=request)
+        n = self.served.get(key, 0)
+        self.served[key] = n + 1
+        entry = recorded[min(n, len(recorded) - 1)]
+        return httpx.Response(entry["status"], headers=entry["headers"],
+                              content=base64.b64decode(entry["body"]), request=request)
+
+
+def wrap_transport(inner: httpx.AsyncBaseTransport, store: str | None) -> httpx.AsyncBaseTransport:
+    return RecordingTransport(inner, store) if _mode == "record" else inner
+
+
+# --------------------------------------------------------------------------- #
+#  Selenium (page source snapshots)
+# --------------------------------------------------------------------------- #
+def _pages_path(store: str | None) -> Path:
+    return _directory / f"{store_slug(store)}.pages.jsonl.gz"
+
+
+def save_page(store: str | None, url: str, html: str) -> None:
+    path = _pages_path(store)
+    with _lock, fileio.file_lock(path):
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            f.write(json.dumps({"url": url, "html": html}, ensure_ascii=False) + "\n")
+
+
+def page_file(store: str | None, url: str) -> Path:
+    """Writes the recorded page for `url` to a temp file and returns its path."""
+    path = _pages_path(store)
+    html = "<html><body></body></html>"
+    if path.exists():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["url"] == url:
+                    html = entry["html"]              # last recording wins
+    target = Path(tempfile.gettempdir()) / "bot-replay" / store_slug(store) / \
+        f"{hashlib.md5(url.encode()).hexdigest()}.html"
+    fileio.atomic_write(target, html)
+    return target
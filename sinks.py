@@ -0,0 +1,115 @@
+"""
+sinks.py  –  where finished items go: the local discounts.json and the backend.
+
+    save_local("Migros", items)                 # replaces Migros rows only
+    sent = await post_items(items, "Migros")    # chunked POST, returns count
+    done = await publish(items, "Migros", done) # every PUBLISH_TO target, {target: count}
+
+Each store's rows are kept in their own shard under feeds/ (see feeds.py);
+discounts.json is rebuilt from the shards after every save, so a merge only
+ever rewrites one store's rows.  A save holds discounts.json's file lock
+(fileio.file_lock), so stores saved at the same time – by main.run_all_bots
+or by separate processes – are applied one after the other, none is lost.
+
+DISCOUNTS_FILE, DISCOUNTS_FEED_DIR and DISCOUNTS_API override the defaults
+for every store.  PUBLISH_TO picks where publish() sends items: "http"
+(the backend's POST endpoint, default), "db" (its database directly, see
+db_sink.py) or "http,db".  Progress is kept per target, so a retry only
+sends a target what it does not have yet – a failed DB write never makes
+the (not idempotent) HTTP endpoint receive the same items twice.
+"""
+import json, logging, os, threading
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+import feeds
+import fileio
+
+DATA_FILE    = Path(os.getenv("DISCOUNTS_FILE", "discounts.json"))
+FEED_DIR     = os.getenv("DISCOUNTS_FEED_DIR")             # default: feeds/ next to DATA_FILE
+API_ENDPOINT = os.getenv("DISCOUNTS_API", "http://localhost:8000/api/discounts")
+POST_CHUNK   = int(os.getenv("POST_CHUNK_SIZE", "100"))
+PUBLISH_TO   = [t.strip() for t in os.getenv("PUBLISH_TO", "http").split(",") if t.strip()]
+
+
+_save_lock = threading.Lock()
+
+
+def feed_dir(path: Path | str | None = None) -> Path:
+    """Where the per-store shards of `path` (default DATA_FILE) live."""
+    return Path(FEED_DIR) if FEED_DIR else Path(path or DATA_FILE).parent / "feeds"
+
+
+def _split_legacy(path: Path, directory: Path) -> None:
+    """One-off: turns a discounts.json from before the shards into shards."""
+    try:
+        existing = json.loads(path.read_text("utf-8"))
+    except FileNotFoundError:
+        return
+    except json.JSONDecodeError:
+        logging.warning(f"⚠️  {path} corrupted – starting fresh")
+        return
+    by_store = defaultdict(list)
+    for item in existing:
+        by_store[item.get("store") or "unknown"].append(item)
+    for store, items in by_store.items():
+        feeds.write_shard(directory, store, items)
+    logging.info(f"📦  Split {path} into {len(by_store)} store shards under {directory}")
+
+
+def save_local(store: str, items: list[dict], path: Path | str | None = None) -> int:
+    """Swaps the store's rows in discounts.json for `items`; returns the file total."""
+    path = Path(path or DATA_FILE)
+    directory = feed_dir(path)
+    with _save_lock, fileio.file_lock(path):
+        if not feeds.shards(directory):
+            _split_legacy(path, directory)
+        feeds.write_shard(directory, store, items)
+        total = feeds.write_combined(path, directory)
+    logging.info(f"📁  Saved {len(items)} {store} items. Total in file: {total}")
+    return total
+
+
+async def post_items(items: list[dict], store: str, endpoint: str | None = None,
+                     chunk_size: int = POST_CHUNK) -> int:
+    """POSTs items in chunks; stops at the first failed chunk and returns how
+    many items the backend accepted (always a prefix of `items`)."""
+    endpoint = endpoint or API_ENDPOINT
+    sent = 0
+    async with httpx.AsyncClient(timeout=30) as client:
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                response = await client.post(endpoint, json=chunk)
+            except httpx.HTTPError as e:
+                logging.warning(f"❌  POST to {endpoint} failed: {e}")
+                break
+            if response.status_code != 200:
+                logging.warning(f"⚠️  Backend error {response.status_code}: {response.text[:200]}")
+                break
+            sent += len(chunk)
+    logging.info(f"🚀  Posted {sent}/{len(items)} {store} items")
+    return sent
+
+
+async def publish(items: list[dict], store: str, done: dict[str, int] | None = None,
+                  targets: list[str] | None = None) -> dict[str, int]:
+    """Sends every target the items past its count in `done`; returns the
+    new counts (each target always has a prefix of `items`)."""
+    done = dict(done or {})
+    for target in targets or PUBLISH_TO:
+        start = done.get(target, 0)
+        rest = items[start:]
+        if not rest:
+            continue
+        if target == "http":
+            sent = await post_items(rest, store)
+        elif target == "db":
+            import db_sink
+            sent = await db_sink.write_items(rest, store)
+        else:
+            raise ValueError(f"unknown PUBLISH_TO target {target!r} (http, db)")
+        done[target] = start + sent
+    return done
@@ -1,13 +1,17 @@
 # sok_bot_api.py
 
+import asyncio
 import os
-import json
 import httpx
 from pathlib import Path
 
+import fileio
+import recorder
+import sinks
+from ratelimit import governed_client
+
 API_URL = "https://www.sokmarket.com.tr/api/v1/search"
 IMAGE_DIR = Path("../discount-frontend/public/images/sok/")
-DATA_FILE = Path("discounts.json")
 FASTAPI_ENDPOINT = "http://localhost:8000/api/discounts"
 
 HEADERS = {
@@ -34,7 +38,7 @@ async def fetch_products():
     page = 1
     all_products = []
 
-    async with httpx.AsyncClient() as client:
+    async with governed_client("Şok") as client:
         while True:
             print(f"🔄 Fetching page {page}...")
             params = PARAMS_TEMPLATE.copy()
@@ -67,8 +71,7 @@ async def fetch_products():
 
                 try:
                     img_data = await client.get(image_url)
-                    with open(image_path, "wb") as f:
-                        f.write(img_data.content)
+                    await fileio.write_async(image_path, img_data.content)
                 except:
                     print(f"❌ Failed to download image for: {name}")
                     continue
@@ -93,18 +96,8 @@ async def fetch_products():
         print("⚠️ No discounted products found.")
         return
 
-    # Merge into discounts.json
-    if DATA_FILE.exists():
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    else:
-        existing = []
-
-    others = [p for p in existing if p["store"] != "Şok"]
-    merged = others + all_products
-
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(merged, f, ensure_ascii=False, indent=2)
+    # Merge into discounts.json (the Şok shard, under the file lock)
+    await asyncio.to_thread(sinks.save_local, "Şok", all_products)
 
     print("💾 discounts.json updated.")
 
@@ -120,5 +113,5 @@ async def fetch_products():
         print("❌ Error posting to backend:", e)
 
 if __name__ == "__main__":
-    import asyncio
+    recorder.configure_from_argv()
     asyncio.run(fetch_products())
@@ -1,13 +1,12 @@
 import os
-import json
-import asyncio
-import httpx
-from pathlib import Path
 from playwright.async_api import async_playwright
 
-IMAGE_DIR = Path("../discount-frontend/public/images/sok/")
-DATA_FILE = Path("discounts.json")
-FASTAPI_ENDPOINT = "http://localhost:8000/api/discounts"
+from browser_profile import first_page, launch_context
+from engine import StoreAdapter, UnitResult, WorkUnit, run_store
+from metrics import metrics
+from ratelimit import governed_client, governed_goto
+
+STORE_NAME = "Şok"
 
 API_URL = "https://www.sokmarket.com.tr/api/v1/search"
 PARAMS_TEMPLATE = {
@@ -17,41 +16,19 @@ PARAMS_TEMPLATE = {
     "size": 20,
     "pgt": "CATEGORY_LISTING"
 }
-
-def calculate_discount(old, new):
-    try:
-        return round((1 - (new / old)) * 100)
-    except:
-        return 0
-
-def safe_float(value):
-    try:
-        return float(str(value).replace(",", ".").replace("₺", "").strip())
-    except:
-        return None
-
-async def download_image_with_retry(client, url, image_path, name, retries=3):
-    for attempt in range(1, retries + 1):
-        try:
-            res = await client.get(url, timeout=10)
-            if res.status_code == 200:
-                with open(image_path, "wb") as f:
-                    f.write(res.content)
-                return True
-        except:
-            await asyncio.sleep(1)
-    print(f"⚠️ Failed to download image for: {name}")
-    return False
+# category × store-id matrix; each pair is paginated on its own (no store id = the session's store)
+CATEGORIES = [c for c in os.getenv("SOK_CATEGORIES", "10").split(",") if c]
+STORE_IDS = [s for s in os.getenv("SOK_STORE_IDS", "").split(",") if s]
 
 async def get_session_headers_from_browser():
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
+        context = await launch_context(p, STORE_NAME)
+        page = await first_page(context)
 
         print("🧭 Launching browser and visiting Şok Market...")
-        await page.goto("https://www.sokmarket.com.tr/market-c-10", timeout=60000)
-        await page.wait_for_timeout(3000)
+        with metrics.timer("session_bootstrap", store=STORE_NAME):
+            await governed_goto(page, "https://www.sokmarket.com.tr/market-c-10", timeout=60000)
+            await page.wait_for_timeout(3000)
 
         cookies = await context.cookies()
         cookie_header = "; ".join([f"{c['name']}={c['value']}" for c in cookies])
@@ -71,111 +48,90 @@ async def get_session_headers_from_browser():
             "cookie": cookie_header
         }
 
-        await browser.close()
+        await context.close()
         print("✅ Session headers built.")
         return headers
 
-async def fetch_discounted_products(headers):
-    os.makedirs(IMAGE_DIR, exist_ok=True)
-    page = 1
-    all_products = []
-
-    async with httpx.AsyncClient() as client:
-        while True:
-            print(f"🔄 Fetching page {page}...")
-            params = PARAMS_TEMPLATE.copy()
-            params["page"] = page
-
-            res = await client.get(API_URL, headers=headers, params=params)
-            if res.status_code != 200:
-                print(f"❌ API error {res.status_code}")
-                break
-
-            data = res.json()
-            items = data.get("results", [])
-            if not items:
-                print("✅ No more products.")
-                break
-
-            for item in items:
-                name = item.get("product", {}).get("name", "").strip()
-                url_path = item.get("product", {}).get("path", "")
-                url = f"https://www.sokmarket.com.tr/urun/{url_path}"
-
-                image_obj = item.get("product", {}).get("images", [])
-                image_url = None
-                if image_obj:
-                    host = image_obj[0].get("host", "")
-                    path = image_obj[0].get("path", "")
-                    if host and path:
-                        image_url = f"{host}/{path}"
-
-                new_price = safe_float(item.get("prices", {}).get("discounted", {}).get("value"))
-                old_price = safe_float(item.get("prices", {}).get("original", {}).get("value"))
-
-                if old_price is None or new_price is None or new_price >= old_price:
-                    continue
-
-                discount_percent = calculate_discount(old_price, new_price)
-                image_name = f"{name[:40].replace(' ', '_')}.jpg"
-                image_path = IMAGE_DIR / image_name
-
-                if not await download_image_with_retry(client, image_url, image_path, name):
-                    continue
-
-                all_products.append({
-                    "name": name,
-                    "url": url,
-                    "image": f"/images/sok/{image_name}",
-                    "store": "Şok",
-                    "store_logo": "sokmarket.png",
-                    "source": "Şok",
-                    "category": "Market",
-                    "price": f"{new_price:.2f}",
-                    "original_price": f"{old_price:.2f}",
-                    "discountPercentage": discount_percent
-                })
-
-            page += 1
-
-    print(f"✅ Collected {len(all_products)} discounted products from Şok.")
-    return all_products
-
-async def update_json_and_post(products):
-    if not products:
-        print("⚠️ No products to save/post.")
-        return
-
-    if DATA_FILE.exists():
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    else:
-        existing = []
-
-    others = [p for p in existing if p["store"] != "Şok"]
-    merged = others + products
-
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(merged, f, ensure_ascii=False, indent=2)
-    print("💾 discounts.json updated.")
-
-    try:
-        async with httpx.AsyncClient() as client:
-            res = await client.post(FASTAPI_ENDPOINT, json=products)
-            if res.status_code == 200:
-                print("📡 Data successfully posted to backend.")
-            else:
-                print(f"⚠️ Backend POST failed: {res.status_code} - {res.text}")
-    except Exception as e:
-        print("❌ Error posting to backend:", e)
+def parse_item(item):
+    """One search API result → raw row (see engine.py)."""
+    product = item.get("product", {})
+    image_url = ""
+    images = product.get("images", [])
+    if images and images[0].get("host") and images[0].get("path"):
+        image_url = f"{images[0]['host']}/{images[0]['path']}"
+    prices = item.get("prices", {})
+    return {
+        "name": product.get("name", "").strip(),
+        "url": f"https://www.sokmarket.com.tr/urun/{product.get('path', '')}",
+        "image_url": image_url,
+        "original_price": prices.get("original", {}).get("value"),
+        "price": prices.get("discounted", {}).get("value"),
+    }
+
+def page_unit(cat, store_id, page):
+    key = f"cat:{cat}/page:{page}" if store_id is None else f"cat:{cat}/store:{store_id}/page:{page}"
+    return WorkUnit(key, {"cat": cat, "store_id": store_id, "page": page})
+
+class SokAdapter(StoreAdapter):
+    """Search API pages per category × store id; a browser visit only
+    bootstraps the session headers."""
+
+    name = STORE_NAME
+    image_subdir = "sok"
+    store_logo = "sokmarket.png"
+
+    def __init__(self, api_url=None, bootstrap=True, categories=None, store_ids=None):
+        self.api_url = api_url or API_URL
+        self.categories = list(categories or CATEGORIES)
+        self.store_ids = list(store_ids or STORE_IDS)
+        self.bootstrap = bootstrap
+        self.headers = {}
+        self.client = None
+
+    async def open(self):
+        if self.bootstrap:
+            self.headers = await get_session_headers_from_browser()
+        self.client = governed_client(STORE_NAME)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def discover(self):
+        return [page_unit(cat, store_id, 1)
+                for cat in self.categories for store_id in (self.store_ids or [None])]
+
+    async def extract(self, unit):
+        cat, store_id, page = unit.params["cat"], unit.params["store_id"], unit.params["page"]
+        print(f"🔄 Fetching {unit.key}...")
+        params = dict(PARAMS_TEMPLATE, cat=cat, page=page)
+        headers = self.headers if store_id is None else {**self.headers, "x-store-id": store_id}
+
+        with metrics.timer("api_page", store=STORE_NAME):
+            res = await self.client.get(self.api_url, headers=headers, params=params)
+        if res.status_code != 200:
+            raise RuntimeError(f"API error {res.status_code}")
+
+        items = res.json().get("results", [])
+        if not items:
+            print("✅ No more products.")
+            return UnitResult()
+
+        metrics.inc("cards_seen", len(items), store=STORE_NAME)
+        rows = [parse_item(item) for item in items]
+        metrics.inc("cards_parsed", len(rows), store=STORE_NAME)
+        return UnitResult(rows, [page_unit(cat, store_id, page + 1)])
+
+    def image_filename(self, item):
+        return f"{item['name'][:40].replace(' ', '_').replace('/', '_')}.jpg"
 
 async def main():
     try:
-        headers = await get_session_headers_from_browser()
-        products = await fetch_discounted_products(headers)
-        await update_json_and_post(products)
+        await run_store(SokAdapter())
     except Exception as e:
         print("❌ Unexpected error:", e)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import sys
+    from cli import main as cli_main
+    sys.exit(cli_main(["run", "--store", "sok", *sys.argv[1:]]))
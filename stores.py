@@ -0,0 +1,41 @@
+"""
+stores.py  –  registry of store adapters, imported lazily.
+
+    adapter = load_adapter("migros")      # imports migros_bot only now
+
+Entries are "module:Class" strings, so listing or choosing a store never
+imports Playwright, Selenium or BeautifulSoup for the others.  A new store is
+one adapter class plus one line here (or a register() call).
+"""
+import importlib
+
+ADAPTERS = {
+    "a101"       : "a101_bot:A101Adapter",
+    "migros"     : "migros_bot:MigrosAdapter",
+    "sok"        : "sok_bot_api:SokAdapter",
+    "carrefoursa": "carrefoursa_bot:CarrefourSAAdapter",
+}
+ALIASES = {"şok": "sok", "sokmarket": "sok", "carrefour": "carrefoursa"}
+
+
+def names() -> list[str]:
+    return list(ADAPTERS)
+
+
+def register(name: str, target: str) -> None:
+    """Adds or replaces an adapter; target is "module:Class"."""
+    ADAPTERS[name.lower()] = target
+
+
+def resolve(name: str) -> str:
+    key = name.strip().lower()
+    key = ALIASES.get(key, key)
+    if key not in ADAPTERS:
+        raise KeyError(f"unknown store {name!r} – choose from {', '.join(ADAPTERS)}")
+    return key
+
+
+def load_adapter(name: str, **kwargs):
+    """Imports the store's module on first use and returns a new adapter."""
+    module_name, _, class_name = ADAPTERS[resolve(name)].partition(":")
+    return getattr(importlib.import_module(module_name), class_name)(**kwargs)
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# the bots are flat top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def local_outputs(tmp_path, monkeypatch):
+    """Points every local output (discounts.json, feeds, history, quarantine,
+    metrics) into tmp_path."""
+    import sinks, validation
+    from metrics import metrics
+
+    monkeypatch.setattr(sinks, "DATA_FILE", tmp_path / "discounts.json")
+    monkeypatch.setattr(sinks, "FEED_DIR", str(tmp_path / "feeds"))
+    monkeypatch.setattr(validation, "QUARANTINE_DIR", tmp_path / "quarantine")
+    monkeypatch.setattr(validation, "history", validation.PriceHistory(tmp_path / "prices.db"))
+    monkeypatch.setattr(metrics, "write", lambda *args, **kwargs: None)
+    return tmp_path
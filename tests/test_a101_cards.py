@@ -0,0 +1,45 @@
+import asyncio
+
+import a101_bot
+from product_index import ProductIndex
+
+
+class FakeCard:
+    def __init__(self, title, href):
+        self.text = {"title": title, "href": href, "price": "10,00 TL", "original": "12,00 TL"}
+
+
+class FakePage:
+    """A listing that re-rendered between the card read and the handle query."""
+    url = "https://www.a101.com.tr/kapida/aldin-aldin/"
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    async def eval_on_selector_all(self, selector, script, arg):
+        return [dict(c.text) for c in self.cards]
+
+    async def query_selector_all(self, selector):
+        return list(reversed(self.cards))
+
+    async def evaluate(self, script, arg=None):
+        if arg is not None:
+            return [dict(h.text) for h in arg[0]]
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+
+def test_cards_are_extracted_from_their_own_element(monkeypatch, tmp_path):
+    monkeypatch.setattr(a101_bot, "product_index", ProductIndex(tmp_path / "p.db", max_age_hours=0))
+    extracted = []
+
+    async def extract_card(page, item, card):
+        extracted.append((card["title"], item.text["title"]))
+        return {"name": card["title"], "url": card["href"]}
+
+    monkeypatch.setattr(a101_bot, "extract_card", extract_card)
+    page = FakePage([FakeCard("Ayran", "/kapida/ayran_p-1"), FakeCard("Süt", "/kapida/sut_p-2")])
+    rows, cards, _ = asyncio.run(a101_bot.parse_products_smooth_scroll(page))
+    assert extracted == [("Ayran", "Ayran"), ("Süt", "Süt")]
+    assert [r["name"] for r in rows] == ["Ayran", "Süt"]
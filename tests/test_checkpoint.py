@@ -0,0 +1,88 @@
+import asyncio, json, time
+
+import engine
+import sinks
+from checkpoint import Checkpoint, CheckpointStore
+from engine import StoreAdapter, UnitResult, WorkUnit
+
+
+class FakeAdapter(StoreAdapter):
+    name = "Fake"
+
+    def __init__(self, price="80"):
+        self.price = price
+        self.extracted = []
+
+    async def discover(self):
+        return [WorkUnit("page-1"), WorkUnit("page-2")]
+
+    async def extract(self, unit):
+        self.extracted.append(unit.key)
+        return UnitResult([{"name": f"Ürün {unit.key}", "url": f"https://x.test/urun-p-{unit.key[-1]}",
+                            "price": self.price, "original_price": "100"}])
+
+
+def _publish_with(monkeypatch, accepted):
+    """sinks.publish where every target accepts `accepted(items)` of the items it is sent."""
+    calls = []
+
+    async def publish(items, store, done=None, targets=None):
+        done = dict(done or {})
+        for target in targets or sinks.PUBLISH_TO:
+            rest = items[done.get(target, 0):]
+            calls.append((target, len(rest)))
+            done[target] = done.get(target, 0) + accepted(rest)
+        return done
+
+    monkeypatch.setattr(sinks, "publish", publish)
+    return calls
+
+
+def test_failed_post_keeps_checkpoint_then_rescrapes(local_outputs, monkeypatch):
+    checkpoints = CheckpointStore(local_outputs / "checkpoints")
+    _publish_with(monkeypatch, lambda rest: 0)                  # backend unreachable
+
+    first = FakeAdapter()
+    asyncio.run(engine.run_store(first, checkpoints=checkpoints))
+    assert first.extracted == ["page-1", "page-2"]
+    cp = checkpoints.load("Fake")
+    assert cp.scraped() and len(cp.unposted(sinks.PUBLISH_TO)) == 2
+
+    # the next run re-sends the leftovers once, then scrapes again
+    calls = _publish_with(monkeypatch, lambda rest: len(rest))
+    second = FakeAdapter(price="70")
+    items = asyncio.run(engine.run_store(second, checkpoints=checkpoints))
+    assert second.extracted == ["page-1", "page-2"]
+    assert calls == [("http", 2), ("http", 2)]                  # leftovers, then this run's items
+    assert {i["price"] for i in items} == {"70.00"}
+    assert not (local_outputs / "checkpoints" / "fake.json").exists()
+
+
+def test_stale_by_start_time_even_after_recent_saves(tmp_path):
+    checkpoints = CheckpointStore(tmp_path)
+    cp = Checkpoint(store="Fake", started_at=time.time() - 13 * 3600)
+    checkpoints.complete_unit(cp, "page-1", [{"name": "a"}])
+    checkpoints.mark_posted(cp, {"http": 0})                    # a save that only records posting
+    assert json.loads((tmp_path / "fake.json").read_text())["updated_at"] > time.time() - 60
+    assert checkpoints.load("Fake").done == []
+
+
+def test_interrupted_run_resumes_pending_units(local_outputs, monkeypatch):
+    checkpoints = CheckpointStore(local_outputs / "checkpoints")
+    _publish_with(monkeypatch, lambda rest: len(rest))
+    cp = Checkpoint(store="Fake")
+    checkpoints.complete_unit(cp, "page-1", [], pending=[{"key": "page-2", "params": {}}])
+
+    adapter = FakeAdapter()
+    asyncio.run(engine.run_store(adapter, checkpoints=checkpoints))
+    assert adapter.extracted == ["page-2"]
+
+
+def test_mark_posted_tracks_targets_separately(tmp_path):
+    checkpoints = CheckpointStore(tmp_path)
+    cp = Checkpoint(store="Fake", items=[{"name": str(i)} for i in range(5)])
+    checkpoints.mark_posted(cp, {"http": 5, "db": 2})
+    assert cp.posted == 2
+    assert cp.sent(["http", "db"]) == {"http": 5, "db": 2}
+    assert len(cp.unposted(["http"])) == 0
+    assert len(cp.unposted(["http", "db"])) == 3
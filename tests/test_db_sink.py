@@ -0,0 +1,43 @@
+import asyncio
+from decimal import Decimal
+
+from sqlalchemy import create_engine, select
+
+import db_sink
+
+
+def _item(url, price, original="100.00", name="Süt 1 L"):
+    return {"store": "Migros", "url": url, "name": name, "price": price,
+            "original_price": original, "discountPercentage": 10,
+            "timestamp": "2025-01-01T10:00:00"}
+
+
+def _rows(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        rows = conn.execute(select(db_sink.discounts).order_by(db_sink.discounts.c.url)).mappings().all()
+    engine.dispose()
+    return rows
+
+
+def test_insert_reupsert_and_duplicate_collapse(tmp_path):
+    path = tmp_path / "discounts.db"
+    url = f"sqlite+aiosqlite:///{path}"
+
+    written = asyncio.run(db_sink.write_items([_item("u/1", "90.00"), _item("u/2", "80.00")], "Migros", url))
+    assert written == 2
+    rows = _rows(path)
+    assert [r["url"] for r in rows] == ["u/1", "u/2"]
+    assert rows[0]["price"] == Decimal("90.00")
+    first_id = rows[0]["id"]
+
+    # same (store, url) again: updated in place, the duplicate in the batch collapses (last wins)
+    batch = [_item("u/1", "85.00"), _item("u/1", "75.00", name="Süt 1 L yeni")]
+    assert asyncio.run(db_sink.write_items(batch, "Migros", url, batch_size=1)) == 2
+    rows = _rows(path)
+    assert len(rows) == 2
+    assert rows[0]["id"] == first_id
+    assert rows[0]["price"] == Decimal("75.00")
+    assert rows[0]["name"] == "Süt 1 L yeni"
+    assert rows[1]["price"] == Decimal("80.00")
+
@@ -0,0 +1,32 @@
+import engine
+from product_index import ProductIndex, product_id
+
+
+def test_product_id_from_store_urls():
+    assert product_id("https://www.a101.com.tr/kapida/icecek/caykur-rize_p-13000056") == "13000056"
+    assert product_id("https://www.migros.com.tr/sut-1-l-p-13134f2?utm_source=x") == "13134f2"
+    assert product_id("https://www.carrefoursa.com/sut/p/30010045") == "30010045"
+    assert product_id("https://www.sokmarket.com.tr/urun/ayran-p-123/") == "123"
+    assert product_id("https://shop.test/urunler/ayran?ref=1") == "shop.test/urunler/ayran"
+
+
+def test_links_without_a_product_have_no_id():
+    assert product_id("") == ""
+    assert product_id("https://www.a101.com.tr") == ""               # empty href
+    assert product_id("https://www.sokmarket.com.tr/urun/") == ""    # empty path
+    assert product_id("https://www.migros.com.tr/") == ""
+
+
+def test_items_without_links_keep_their_own_keys():
+    bare = [{"name": "Ayran", "url": "https://www.sokmarket.com.tr/urun/"},
+            {"name": "Süt", "url": "https://www.sokmarket.com.tr/urun/"}]
+    assert [engine.item_key(i) for i in bare] == ["Ayran", "Süt"]
+
+
+def test_reuse_needs_same_sig_and_an_image(tmp_path):
+    index = ProductIndex(tmp_path / "products.db", max_age_hours=24)
+    index.put("A101", [("1", "a|10", {"image_url": "x.jpg"}), ("2", "b|10", {"image_url": ""})])
+    assert index.reuse("A101", "1", "a|10") == (True, {"image_url": "x.jpg"})
+    assert index.reuse("A101", "1", "a|9") == (False, None)
+    assert index.reuse("A101", "2", "b|10") == (False, None)
+    assert ProductIndex(tmp_path / "off.db", max_age_hours=0).reuse("A101", "1", "a|10") == (False, None)
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import validation
+
+
+@pytest.fixture(autouse=True)
+def fresh_totals(local_outputs, monkeypatch):
+    monkeypatch.setattr(validation, "_totals", {})
+
+
+def _item(price="80.00", original="100.00", discount=20, pid=1):
+    return {"name": f"Ürün {pid}", "url": f"https://x.test/urun-p-{pid}",
+            "price": price, "original_price": original, "discountPercentage": discount}
+
+
+def _new_run(path):
+    validation.history = validation.PriceHistory(path)
+
+
+def test_each_check_flags_its_own_rows():
+    items = [_item(),
+             _item(price="0.10", original="0.20", discount=50),
+             _item(price="100.00", original="100.00", discount=0),
+             _item(price="5.00", original="100.00", discount=95),
+             _item(discount=35)]
+    assert validation.check("A101", items) == [
+        [],
+        ["price_range"],
+        ["original_not_above", "discount_bounds"],
+        ["discount_bounds"],
+        ["discount_mismatch"],
+    ]
+
+
+def test_repricing_is_an_outlier_once_then_accepted(local_outputs):
+    db = local_outputs / "prices.db"
+    for _ in range(3):
+        _new_run(db)
+        assert validation.validate("A101", [_item()]) == [_item()]
+    cheap = _item(price="20.00", original="25.00")
+    _new_run(db)
+    assert validation.check("A101", [cheap]) == [["price_outlier"]]
+    assert validation.validate("A101", [cheap]) == []
+    _new_run(db)
+    assert validation.validate("A101", [cheap]) == [cheap]
+
+
+def test_quarantine_file_and_report(local_outputs):
+    good, bad = _item(), _item(discount=35, pid=2)
+    assert validation.validate("Şok", [good, bad]) == [good]
+    lines = (local_outputs / "quarantine" / "sok.ndjson").read_text("utf-8").splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [(r["name"], r["reasons"]) for r in rows] == [("Ürün 2", ["discount_mismatch"])]
+    totals = validation.report("Şok")
+    assert (totals["validated"], totals["quarantined"], totals["rate"]) == (2, 1, 0.5)
@@ -0,0 +1,54 @@
+import workqueue
+from workqueue import SQLiteQueue
+
+UNITS = [{"key": "page-1", "params": {"n": 1}}, {"key": "page-2"}]
+
+
+def _item(name, pid):
+    return {"name": name, "url": f"https://x.test/urun-p-{pid}"}
+
+
+def test_enqueue_lease_complete():
+    q = SQLiteQueue()
+    assert q.enqueue("r1", "A101", UNITS) == 2
+    assert q.enqueue("r1", "A101", UNITS) == 0                    # already in the run
+    lease = q.lease("w1")
+    assert (lease.key, lease.params, lease.attempts) == ("page-1", {"n": 1}, 1)
+    assert q.complete(lease, [_item("Ayran", 1)], follow_up=[{"key": "page-3"}])
+    assert [q.lease("w1").key, q.lease("w1").key] == ["page-2", "page-3"]
+    assert q.lease("w1") is None
+    assert q.pending("r1") == 2 and q.stats("r1") == {"A101": {"done": 1, "leased": 2}}
+
+
+def test_expired_lease_is_handed_out_again():
+    q = SQLiteQueue()
+    q.enqueue("r1", "A101", UNITS[:1])
+    stale = q.lease("w1", visibility=-1)                          # already past its deadline
+    fresh = q.lease("w2")
+    assert fresh.key == stale.key and fresh.attempts == 2
+    assert not q.extend(stale)
+    assert q.extend(fresh)
+    assert q.complete(fresh, [_item("Ayran", 1)])
+    assert not q.complete(stale, [_item("Süt", 2)])               # the unit is already done
+    assert q.results("r1", "A101") == [_item("Ayran", 1)]
+
+
+def test_failed_unit_dies_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(workqueue, "MAX_ATTEMPTS", 2)
+    q = SQLiteQueue()
+    q.enqueue("r1", "A101", UNITS[:1])
+    q.fail(q.lease("w1"), "timeout")
+    q.fail(q.lease("w1"), "timeout")
+    assert q.lease("w1") is None
+    assert q.stats("r1") == {"A101": {"dead": 1}} and q.runs() == []
+
+
+def test_results_dedupe_and_posted_per_target():
+    q = SQLiteQueue()
+    q.enqueue("r1", "A101", UNITS)
+    q.complete(q.lease("w1"), [_item("Ayran", 1), _item("Süt", 2)])
+    q.complete(q.lease("w1"), [_item("Ayran 1L", 1)])             # same product on another page
+    assert [i["name"] for i in q.results("r1", "A101")] == ["Ayran 1L", "Süt"]
+    q.mark_posted("r1", "A101", 2, target="http")
+    q.mark_posted("r1", "A101", 1, target="db")
+    assert (q.posted("r1", "A101"), q.posted("r1", "A101", "db"), q.posted("r1", "Migros")) == (2, 1, 0)
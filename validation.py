@@ -0,0 +1,209 @@
+"""
+validation.py  –  sanity checks on normalised items before they are saved,
+posted or have their images fetched.
+
+    good = validate("Migros", items)        # the rest goes to quarantine/
+
+Every batch (one work unit's items) is checked in one vectorised pass:
+
+    price_range         price outside VALIDATION_MIN_PRICE … VALIDATION_MAX_PRICE
+    original_not_above  original price missing or not above the sale price
+    discount_bounds     discount outside 1 … VALIDATION_MAX_DISCOUNT (%)
+    discount_mismatch   discountPercentage disagrees with the two prices
+    price_outlier       sale or original price more than VALIDATION_MAX_Z
+                        deviations away from the product's recent prices
+
+Price history lives in a small SQLite file (PRICE_HISTORY_DB), one
+observation per product and run; rows older than PRICE_HISTORY_DAYS are
+dropped.  Rows quarantined only as price_outlier are recorded too, and the
+deviation is measured against the last VALIDATION_WINDOW observations from
+earlier runs, so a real repricing is accepted once it shows up again in
+the next run instead of until the old prices age out.  A product needs
+VALIDATION_MIN_HISTORY earlier prices before the outlier check applies,
+and the deviation never counts as smaller than VALIDATION_STD_FLOOR of its
+mean, so a price that never moved can still change by a normal campaign
+amount.
+
+Quarantined rows are appended to quarantine/<store>.ndjson with their
+reasons; counts per store and reason go to metrics (rows_validated,
+rows_quarantined) and report() logs the store's quarantine rate.
+"""
+import json, logging, math, os, sqlite3, threading, time, uuid
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+import feeds
+import fileio
+from metrics import metrics
+from pricing import parse_price
+
+MIN_PRICE     = float(os.getenv("VALIDATION_MIN_PRICE", "0.5"))
+MAX_PRICE     = float(os.getenv("VALIDATION_MAX_PRICE", "250000"))
+MAX_DISCOUNT  = int(os.getenv("VALIDATION_MAX_DISCOUNT", "90"))
+MAX_Z         = float(os.getenv("VALIDATION_MAX_Z", "4"))
+MIN_HISTORY   = int(os.getenv("VALIDATION_MIN_HISTORY", "3"))
+STD_FLOOR     = float(os.getenv("VALIDATION_STD_FLOOR", "0.15"))
+WINDOW        = int(os.getenv("VALIDATION_WINDOW", "10"))
+HISTORY_DB    = Path(os.getenv("PRICE_HISTORY_DB", ".history/prices.db"))
+HISTORY_DAYS  = float(os.getenv("PRICE_HISTORY_DAYS", "90"))
+QUARANTINE_DIR = Path(os.getenv("QUARANTINE_DIR", "quarantine"))
+
+_SQL_CHUNK = 500                # keys per IN (...) query
+
+
+class PriceHistory:
+    """(store, product key) → sale / original prices seen in earlier runs."""
+
+    def __init__(self, path: Path | str = HISTORY_DB, window: int = WINDOW):
+        self.path = Path(path)
+        self.window = window
+        self.run = uuid.uuid4().hex            # this process's observations
+        self._db = None
+        self._lock = threading.Lock()
+        self._added: set[tuple[str, str]] = set()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS prices (
+                                    store TEXT, key TEXT, price REAL, original REAL, seen REAL,
+                                    run TEXT)""")
+            if "run" not in {row[1] for row in self._db.execute("PRAGMA table_info(prices)")}:
+                self._db.execute("ALTER TABLE prices ADD COLUMN run TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS prices_key ON prices (store, key)")
+            self._db.execute("DELETE FROM prices WHERE seen < ?", (time.time() - HISTORY_DAYS * 86400,))
+            self._db.commit()
+        return self._db
+
+    def stats(self, store: str, keys: list[str]) -> dict[str, tuple]:
+        """key → (count, mean price, mean price², mean original, mean original²)
+        over the key's last `window` observations from earlier runs."""
+        found = {}
+        with self._lock:
+            db = self._conn()
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[start:start + _SQL_CHUNK]
+                rows = db.execute(
+                    f"SELECT key, COUNT(*), AVG(price), AVG(price * price), AVG(original), AVG(original * original) "
+                    f"FROM (SELECT key, price, original, "
+                    f"      ROW_NUMBER() OVER (PARTITION BY key ORDER BY seen DESC) AS recent "
+                    f"      FROM prices WHERE store = ? AND run IS NOT ? "
+                    f"      AND key IN ({','.join('?' * len(chunk))})) "
+                    f"WHERE recent <= ? GROUP BY key",
+                    (store, self.run, *chunk, self.window))
+                found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def add(self, store: str, rows: list[tuple[str, float, float]]) -> None:
+        """Records one observation per key and run (a product on two listings counts once)."""
+        now = time.time()
+        with self._lock:
+            fresh = []
+            for key, price, original in rows:
+                if (store, key) not in self._added:
+                    self._added.add((store, key))
+                    fresh.append((store, key, price, original, now, self.run))
+            db = self._conn()
+            db.executemany("INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?)", fresh)
+            db.commit()
+
+
+history = PriceHistory()
+_totals: dict[str, Counter] = {}
+
+
+def _key(item: dict) -> str:
+    return item.get("url") or item.get("name") or ""
+
+
+def _deviation(values, count, mean, mean_sq):
+    """|value - mean| in standard deviations (floored), 0 without enough history."""
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+    std = np.maximum(std, mean * STD_FLOOR)
+    z = np.zeros_like(values)
+    usable = (count >= MIN_HISTORY) & (std > 0) & ~np.isnan(values)
+    z[usable] = np.abs(values[usable] - mean[usable]) / std[usable]
+    return z
+
+
+def check(store: str, items: list[dict]) -> list[list[str]]:
+    """The failed checks for every item (empty list = fine), in item order."""
+    n = len(items)
+    if not n:
+        return []
+    nan = math.nan
+    price = np.array([parse_price(i.get("price")) or nan for i in items], dtype=float)
+    original = np.array([parse_price(i.get("original_price")) or nan for i in items], dtype=float)
+    discount = np.array([i.get("discountPercentage") if i.get("discountPercentage") is not None else nan
+                         for i in items], dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = np.floor((original - price) / original * 100 + 0.5)
+        failed = {
+            "price_range"       : ~((price >= MIN_PRICE) & (price <= MAX_PRICE)),
+            "original_not_above": ~(original > price),
+            "discount_bounds"   : ~((discount >= 1) & (discount <= MAX_DISCOUNT)),
+            "discount_mismatch" : ~(np.abs(expected - discount) <= 1),
+        }
+
+        stats = history.stats(store, [_key(i) for i in items])
+        known = np.array([stats.get(_key(i), (0, nan, nan, nan, nan)) for i in items], dtype=float)
+        known = np.nan_to_num(known, nan=0.0)
+        count = known[:, 0]
+        failed["price_outlier"] = ((_deviation(price, count, known[:, 1], known[:, 2]) > MAX_Z)
+                                   | (_deviation(original, count, known[:, 3], known[:, 4]) > MAX_Z))
+
+    names = list(failed)
+    matrix = np.column_stack([failed[name] for name in names])
+    return [[names[c] for c in np.flatnonzero(row)] for row in matrix]
+
+
+def _quarantine(store: str, rows: list[dict]) -> None:
+    fileio.append_lines(QUARANTINE_DIR / f"{feeds.shard_name(store)}.ndjson",
+                        [json.dumps(row, ensure_ascii=False, separators=(",", ":")) for row in rows])
+
+
+def validate(store: str, items: list[dict]) -> list[dict]:
+    """Returns the items that passed; the others are quarantined, not dropped silently."""
+    if not items:
+        return items
+    reasons = check(store, items)
+    good, bad = [], []
+    totals = _totals.setdefault(store, Counter())
+    totals["validated"] += len(items)
+    metrics.inc("rows_validated", len(items), store=store)
+    now = time.time()
+    for item, failed in zip(items, reasons):
+        if not failed:
+            good.append(item)
+            continue
+        bad.append({**item, "reasons": failed, "quarantined_at": now})
+        totals["quarantined"] += 1
+        for reason in failed:
+            totals[reason] += 1
+            metrics.inc("rows_quarantined", store=store, reason=reason)
+    if bad:
+        _quarantine(store, bad)
+        logging.warning(f"🧪  {store}: quarantined {len(bad)}/{len(items)} rows "
+                        f"({', '.join(sorted({r for row in bad for r in row['reasons']}))})")
+    # a price that is only unusual for this product is still an observation:
+    # seen again in the next run, it becomes the product's new level
+    observed = good + [row for row in bad if row["reasons"] == ["price_outlier"]]
+    history.add(store, [(_key(i), parse_price(i["price"]), parse_price(i["original_price"])) for i in observed])
+    return good
+
+
+def report(store: str) -> dict:
+    """Logs and returns the store's validation totals for this process."""
+    totals = dict(_totals.get(store, Counter()))
+    validated = totals.get("validated", 0)
+    if validated:
+        rate = totals.get("quarantined", 0) / validated
+        logging.info(f"🧪  {store}: {totals.get('quarantined', 0)}/{validated} rows quarantined ({rate:.1%})")
+        totals["rate"] = round(rate, 4)
+    return totals
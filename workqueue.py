@@ -0,0 +1,473 @@
+"""
+workqueue.py  –  leased work units for distributed runs (see distributed.py).
+
+A coordinator enqueues (store, unit) pairs for a run; workers lease one unit
+at a time for `visibility` seconds, extend the lease while they work and
+complete it with the unit's items.  A lease that is not completed in time
+becomes visible again, so a crashed worker's unit is picked up elsewhere.
+
+Results are stored per (run, store, unit key) and replaced on re-run, so a
+unit processed twice never duplicates items.
+
+    queue = open_queue("sqlite:///queue.db")     # one host / shared volume
+    queue = open_queue("redis://redis:6379/0")   # several nodes (needs redis-py)
+    queue = open_queue("memory")                 # in-process fallback
+
+WORK_QUEUE sets the default URL.
+"""
+import json, logging, os, sqlite3, threading, time, uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from product_index import product_id
+
+WORK_QUEUE   = os.getenv("WORK_QUEUE", "memory")
+VISIBILITY   = float(os.getenv("WORK_VISIBILITY_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("WORK_MAX_ATTEMPTS", "3"))
+
+
+@dataclass
+class Lease:
+    run_id: str
+    store: str
+    key: str
+    params: dict = field(default_factory=dict)
+    token: str = ""
+    attempts: int = 0
+
+    @property
+    def unit(self) -> dict:
+        return {"key": self.key, "params": self.params}
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+class WorkQueue(ABC):
+    """Interface shared by the backends; every method is blocking and cheap."""
+
+    @abstractmethod
+    def enqueue(self, run_id: str, store: str, units: list[dict]) -> int:
+        """Adds units ({"key", "params"}) not yet in the run; returns how many were new."""
+
+    @abstractmethod
+    def lease(self, worker: str, stores: list[str] | None = None,
+              visibility: float = VISIBILITY) -> Lease | None:
+        """The next ready unit (of `stores`, if given) for `visibility` seconds, or None."""
+
+    @abstractmethod
+    def extend(self, lease: Lease, visibility: float = VISIBILITY) -> bool:
+        """Pushes the lease's deadline out; False if it is no longer held."""
+
+    @abstractmethod
+    def complete(self, lease: Lease, items: list[dict], follow_up: list[dict] = ()) -> bool:
+        """Stores the unit's items (replacing earlier ones) and enqueues follow-ups.
+
+        Returns False if the lease had expired meanwhile.  The items are still
+        kept unless another worker already completed the unit."""
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str) -> None:
+        """Makes the unit visible again, or dead after MAX_ATTEMPTS."""
+
+    @abstractmethod
+    def pending(self, run_id: str) -> int:
+        """Units of the run that are ready or leased."""
+
+    @abstractmethod
+    def runs(self, active: bool = True) -> list[str]:
+        """Runs oldest first; only those with units still ready or leased if `active`."""
+
+    @abstractmethod
+    def stores(self, run_id: str) -> list[str]:
+        """Stores with units in the run."""
+
+    @abstractmethod
+    def stats(self, run_id: str) -> dict[str, dict[str, int]]:
+        """store → state → unit count."""
+
+    @abstractmethod
+    def results(self, run_id: str, store: str) -> list[dict]:
+        """All items of the store's run, deduplicated by product (last unit wins)."""
+
+    @abstractmethod
+    def posted(self, run_id: str, store: str, target: str = "http") -> int:
+        """How many of results() the publish target (sinks.PUBLISH_TO) already has."""
+
+    @abstractmethod
+    def mark_posted(self, run_id: str, store: str, count: int, target: str = "http") -> None:
+        """Records that the target has the first `count` of results()."""
+
+
+def _dedupe(chunks: list[list[dict]]) -> list[dict]:
+    merged: dict[str, dict] = {}
+    for items in chunks:
+        for item in items:
+            merged[product_id(item.get("url") or "") or item["name"]] = item      # engine.item_key
+    return list(merged.values())
+
+
+# --------------------------------------------------------------------------- #
+#  SQLite (file or :memory:)
+# --------------------------------------------------------------------------- #
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    run_id TEXT, store TEXT, key TEXT, params TEXT,
+    state TEXT NOT NULL DEFAULT 'ready',           -- ready | leased | done | dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    token TEXT, lease_until REAL, worker TEXT, error TEXT,
+    seq INTEGER,
+    PRIMARY KEY (run_id, store, key)
+);
+CREATE INDEX IF NOT EXISTS units_ready ON units (state, lease_until);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT, store TEXT, key TEXT, items TEXT, seq INTEGER, finished_at REAL,
+    PRIMARY KEY (run_id, store, key)
+);
+CREATE TABLE IF NOT EXISTS published (
+    run_id TEXT, store TEXT, target TEXT, count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, store, target)
+);
+"""
+
+
+class SQLiteQueue(WorkQueue):
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _tx(self):
+        return _Transaction(self)
+
+    def enqueue(self, run_id, store, units):
+        with self._tx() as db:
+            return self._insert(db, run_id, store, units)
+
+    @staticmethod
+    def _insert(db, run_id, store, units) -> int:
+        seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM units WHERE run_id = ?", (run_id,)).fetchone()[0]
+        added = 0
+        for unit in units:
+            seq += 1
+            added += db.execute(
+                "INSERT OR IGNORE INTO units (run_id, store, key, params, seq) VALUES (?, ?, ?, ?, ?)",
+                (run_id, store, unit["key"], json.dumps(unit.get("params", {})), seq)).rowcount
+        return added
+
+    def lease(self, worker, stores=None, visibility=VISIBILITY):
+        now = time.time()
+        with self._tx() as db:
+            db.execute("UPDATE units SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'ready' END, "
+                       "error = 'lease expired' WHERE state = 'leased' AND lease_until < ?",
+                       (MAX_ATTEMPTS, now))
+            sql, args = "SELECT run_id, store, key, params, attempts FROM units WHERE state = 'ready'", []
+            if stores:
+                sql += f" AND store IN ({','.join('?' * len(stores))})"
+                args += stores
+            row = db.execute(sql + " ORDER BY run_id, seq LIMIT 1", args).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            db.execute("UPDATE units SET state = 'leased', token = ?, lease_until = ?, worker = ?, "
+                       "attempts = attempts + 1 WHERE run_id = ? AND store = ? AND key = ?",
+                       (token, now + visibility, worker, *row[:3]))
+        return Lease(row[0], row[1], row[2], json.loads(row[3]), token, row[4] + 1)
+
+    def extend(self, lease, visibility=VISIBILITY):
+        with self._tx() as db:
+            return db.execute("UPDATE units SET lease_until = ? WHERE run_id = ? AND store = ? AND key = ? "
+                              "AND token = ? AND state = 'leased'",
+                              (time.time() + visibility, lease.run_id, lease.store, lease.key,
+                               lease.token)).rowcount == 1
+
+    def complete(self, lease, items, follow_up=()):
+        with self._tx() as db:
+            row = db.execute("SELECT token IS ? AND state = 'leased', state, seq FROM units "
+                             "WHERE run_id = ? AND store = ? AND key = ?",
+                             (lease.token, lease.run_id, lease.store, lease.key)).fetchone()
+            valid = bool(row and row[0])
+            if not valid and row and row[1] == "done":
+                return False
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                       (lease.run_id, lease.store, lease.key, json.dumps(items, ensure_ascii=False),
+                        row[2] if row else 0, time.time()))
+            db.execute("UPDATE units SET state = 'done', token = NULL, error = NULL "
+                       "WHERE run_id = ? AND store = ? AND key = ?", (lease.run_id, lease.store, lease.key))
+            self._insert(db, lease.run_id, lease.store, list(follow_up))
+        return valid
+
+    def fail(self, lease, error):
+        with self._tx() as db:
+            db.execute("UPDATE units SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'ready' END, "
+                       "error = ?, token = NULL WHERE run_id = ? AND store = ? AND key = ? AND token = ?",
+                       (MAX_ATTEMPTS, error[:500], lease.run_id, lease.store, lease.key, lease.token))
+
+    def pending(self, run_id):
+        with self._tx() as db:
+            return db.execute("SELECT COUNT(*) FROM units WHERE run_id = ? AND state IN ('ready', 'leased')",
+                              (run_id,)).fetchone()[0]
+
+    def runs(self, active=True):
+        where = "WHERE state IN ('ready', 'leased')" if active else ""
+        with self._tx() as db:
+            return [r[0] for r in db.execute(f"SELECT DISTINCT run_id FROM units {where} ORDER BY run_id")]
+
+    def stores(self, run_id):
+        with self._tx() as db:
+            return [r[0] for r in db.execute("SELECT DISTINCT store FROM units WHERE run_id = ? "
+                                             "ORDER BY store", (run_id,))]
+
+    def stats(self, run_id):
+        out: dict[str, dict[str, int]] = {}
+        with self._tx() as db:
+            for store, state, n in db.execute("SELECT store, state, COUNT(*) FROM units WHERE run_id = ? "
+                                              "GROUP BY store, state", (run_id,)):
+                out.setdefault(store, {})[state] = n
+        return out
+
+    def results(self, run_id, store):
+        with self._tx() as db:
+            rows = db.execute("SELECT items FROM results WHERE run_id = ? AND store = ? ORDER BY seq",
+                              (run_id, store)).fetchall()
+        return _dedupe([json.loads(r[0]) for r in rows])
+
+    def posted(self, run_id, store, target="http"):
+        with self._tx() as db:
+            row = db.execute("SELECT count FROM published WHERE run_id = ? AND store = ? AND target = ?",
+                             (run_id, store, target)).fetchone()
+        return row[0] if row else 0
+
+    def mark_posted(self, run_id, store, count, target="http"):
+        with self._tx() as db:
+            db.execute("INSERT INTO published VALUES (?, ?, ?, ?) ON CONFLICT (run_id, store, target) "
+                       "DO UPDATE SET count = excluded.count", (run_id, store, target, count))
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE … COMMIT under the connection lock (ROLLBACK on error)."""
+
+    def __init__(self, queue: SQLiteQueue):
+        self.queue = queue
+
+    def __enter__(self):
+        self.queue._lock.acquire()
+        self.queue._db.execute("BEGIN IMMEDIATE")
+        return self.queue._db
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.queue._db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.queue._lock.release()
+
+
+# --------------------------------------------------------------------------- #
+#  Redis
+# --------------------------------------------------------------------------- #
+class RedisQueue(WorkQueue):
+    """Same semantics on Redis; lease transitions are Lua scripts, so atomic.
+
+    Keys (prefix p, run r):  p:runs (zset)  p:r:units (hash id → unit json)
+    p:r:ready (list)  p:r:leased (zset id → deadline)  p:r:state (hash)
+    p:r:results:<store> (hash key → items json)  p:r:posted (hash store\x1ftarget → count)"""
+
+    _LEASE = """
+    local ready, leased, state, units = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+    local now, deadline, token, max_attempts = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+    for _, id in ipairs(redis.call('ZRANGEBYSCORE', leased, '-inf', now)) do
+        redis.call('ZREM', leased, id)
+        local unit = cjson.decode(redis.call('HGET', units, id))
+        if unit.attempts >= max_attempts then
+            redis.call('HSET', state, id, 'dead')
+        else
+            redis.call('HSET', state, id, 'ready')
+            redis.call('RPUSH', ready, id)
+        end
+    end
+    local id = redis.call('LPOP', ready)
+    if not id then return nil end
+    local unit = cjson.decode(redis.call('HGET', units, id))
+    unit.attempts = unit.attempts + 1
+    unit.token = token
+    redis.call('HSET', units, id, cjson.encode(unit))
+    redis.call('HSET', state, id, 'leased')
+    redis.call('ZADD', leased, deadline, id)
+    return cjson.encode(unit)
+    """
+
+    # the holder's token is checked in the same script that acts on it, so a
+    # lease that expired and went to another worker is never touched
+    _RELEASE = """
+    local units, leased, state, ready = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+    local id, token, count_attempt, err, max_attempts = ARGV[1], ARGV[2], ARGV[3] == '1', ARGV[4], tonumber(ARGV[5])
+    local unit = cjson.decode(redis.call('HGET', units, id))
+    if unit.token ~= token or not redis.call('ZSCORE', leased, id) then return 0 end
+    if not count_attempt then unit.attempts = unit.attempts - 1 end
+    unit.token = ''
+    unit.error = err
+    local dead = count_attempt and unit.attempts >= max_attempts
+    redis.call('HSET', units, id, cjson.encode(unit))
+    redis.call('ZREM', leased, id)
+    if dead then
+        redis.call('HSET', state, id, 'dead')
+    else
+        redis.call('HSET', state, id, 'ready')
+        redis.call('RPUSH', ready, id)
+    end
+    return 1
+    """
+
+    _EXTEND = """
+    local units, leased = KEYS[1], KEYS[2]
+    local id, token, deadline = ARGV[1], ARGV[2], tonumber(ARGV[3])
+    local unit = cjson.decode(redis.call('HGET', units, id))
+    if unit.token ~= token or not redis.call('ZSCORE', leased, id) then return 0 end
+    redis.call('ZADD', leased, 'XX', deadline, id)
+    return 1
+    """
+
+    _COMPLETE = """
+    -- 1: completed, 0: lease had expired (result kept), -1: another worker completed it
+    local units, leased, state, results = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+    local id, token, key, items = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+    local unit = cjson.decode(redis.call('HGET', units, id))
+    local valid = unit.token == token
+    if not valid and redis.call('HGET', state, id) == 'done' then return -1 end
+    redis.call('HSET', results, key, items)
+    redis.call('ZREM', leased, id)
+    redis.call('HSET', state, id, 'done')
+    if valid then return 1 end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "discount-bots"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("redis:// work queues need the redis package (pip install redis)")
+        self.r = redis.Redis.from_url(url, decode_responses=True)
+        self.p = prefix
+        self._lease = self.r.register_script(self._LEASE)
+        self._release_script = self.r.register_script(self._RELEASE)
+        self._extend = self.r.register_script(self._EXTEND)
+        self._complete = self.r.register_script(self._COMPLETE)
+
+    def _k(self, run_id: str, *parts: str) -> str:
+        return ":".join([self.p, run_id, *parts])
+
+    @staticmethod
+    def _id(store: str, key: str) -> str:
+        return f"{store}\x1f{key}"
+
+    def enqueue(self, run_id, store, units):
+        self.r.zadd(f"{self.p}:runs", {run_id: time.time()}, nx=True)
+        added = 0
+        for unit in units:
+            uid = self._id(store, unit["key"])
+            if self.r.hexists(self._k(run_id, "units"), uid):
+                continue
+            body = json.dumps({"store": store, "key": unit["key"], "params": unit.get("params", {}),
+                               "attempts": 0, "token": "", "seq": self.r.incr(self._k(run_id, "seq"))})
+            if self.r.hsetnx(self._k(run_id, "units"), uid, body):
+                self.r.hset(self._k(run_id, "state"), uid, "ready")
+                self.r.rpush(self._k(run_id, "ready"), uid)
+                added += 1
+        return added
+
+    def lease(self, worker, stores=None, visibility=VISIBILITY):
+        for run_id in self.runs():
+            # store filters are applied by re-queueing foreign units at the back
+            for _ in range(self.r.llen(self._k(run_id, "ready")) + 1):
+                now = time.time()
+                raw = self._lease(keys=[self._k(run_id, "ready"), self._k(run_id, "leased"),
+                                        self._k(run_id, "state"), self._k(run_id, "units")],
+                                  args=[now, now + visibility, uuid.uuid4().hex, MAX_ATTEMPTS])
+                if raw is None:
+                    break
+                unit = json.loads(raw)
+                lease = Lease(run_id, unit["store"], unit["key"], unit["params"], unit["token"],
+                              unit["attempts"])
+                if not stores or lease.store in stores:
+                    return lease
+                self._release(lease, count_attempt=False)
+        return None
+
+    def _release(self, lease: Lease, count_attempt: bool = True, error: str = "") -> None:
+        run = lease.run_id
+        self._release_script(keys=[self._k(run, "units"), self._k(run, "leased"),
+                                   self._k(run, "state"), self._k(run, "ready")],
+                             args=[self._id(lease.store, lease.key), lease.token,
+                                   int(count_attempt), error, MAX_ATTEMPTS])
+
+    def extend(self, lease, visibility=VISIBILITY):
+        run = lease.run_id
+        return bool(self._extend(keys=[self._k(run, "units"), self._k(run, "leased")],
+                                 args=[self._id(lease.store, lease.key), lease.token,
+                                       time.time() + visibility]))
+
+    def complete(self, lease, items, follow_up=()):
+        run = lease.run_id
+        outcome = self._complete(keys=[self._k(run, "units"), self._k(run, "leased"),
+                                       self._k(run, "state"), self._k(run, "results", lease.store)],
+                                 args=[self._id(lease.store, lease.key), lease.token, lease.key,
+                                       json.dumps(items, ensure_ascii=False)])
+        if outcome < 0:
+            return False
+        self.enqueue(run, lease.store, list(follow_up))
+        return outcome == 1
+
+    def fail(self, lease, error):
+        self._release(lease, error=error[:500])
+
+    def pending(self, run_id):
+        return sum(1 for s in self.r.hvals(self._k(run_id, "state")) if s in ("ready", "leased"))
+
+    def runs(self, active=True):
+        return [r for r in self.r.zrange(f"{self.p}:runs", 0, -1) if not active or self.pending(r)]
+
+    def stores(self, run_id):
+        return sorted({uid.split("\x1f")[0] for uid in self.r.hkeys(self._k(run_id, "state"))})
+
+    def stats(self, run_id):
+        out: dict[str, dict[str, int]] = {}
+        for uid, state in self.r.hgetall(self._k(run_id, "state")).items():
+            counts = out.setdefault(uid.split("\x1f")[0], {})
+            counts[state] = counts.get(state, 0) + 1
+        return out
+
+    def results(self, run_id, store):
+        order = {json.loads(v)["key"]: json.loads(v)["seq"]
+                 for uid, v in self.r.hgetall(self._k(run_id, "units")).items()
+                 if uid.split("\x1f")[0] == store}
+        stored = self.r.hgetall(self._k(run_id, "results", store))
+        return _dedupe([json.loads(stored[k]) for k in sorted(stored, key=lambda k: order.get(k, 0))])
+
+    def posted(self, run_id, store, target="http"):
+        return int(self.r.hget(self._k(run_id, "posted"), f"{store}\x1f{target}") or 0)
+
+    def mark_posted(self, run_id, store, count, target="http"):
+        self.r.hset(self._k(run_id, "posted"), f"{store}\x1f{target}", count)
+
+
+# --------------------------------------------------------------------------- #
+#  Factory
+# --------------------------------------------------------------------------- #
+_memory: SQLiteQueue | None = None
+
+
+def open_queue(url: str | None = None) -> WorkQueue:
+    global _memory
+    url = url or WORK_QUEUE
+    if url == "memory":
+        _memory = _memory or SQLiteQueue(":memory:")
+        return _memory
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisQueue(url)
+    path = url.removeprefix("sqlite:///")
+    logging.debug(f"📬  Work queue at {path}")
+    return SQLiteQueue(path)